@@ -6,12 +6,14 @@ Charts: http://localhost:5000/dashboard
 """
 from flask import Flask, request, jsonify, send_from_directory
 from pathlib import Path
-from bot.db import Database
+from bot.db import ReaderPool
 from bot.config import DAILY_BUDGET_QUOTE, PNL_THRESHOLD, ZAR_PER_USDT
 import logging
 
 logging.basicConfig(level=logging.INFO)
 app = Flask(__name__, static_folder="static")
+# Read-only connections reused across requests (no per-request open + PRAGMAs)
+reader_pool = ReaderPool()
 
 @app.route('/ohlcv')
 def get_ohlcv():
@@ -23,7 +25,7 @@ def get_ohlcv():
         return jsonify({"error": "symbol parameter required"}), 400
 
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             if timeframe:
                 rows = db.conn.execute(
                     "SELECT * FROM ohlcv WHERE symbol=? AND timeframe=? ORDER BY timestamp DESC LIMIT ?",
@@ -48,7 +50,7 @@ def get_tickers():
         return jsonify({"error": "symbol parameter required"}), 400
     
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             rows = db.conn.execute(
                 "SELECT * FROM tickers WHERE symbol=? ORDER BY timestamp DESC LIMIT ?",
                 (symbol, limit)
@@ -62,7 +64,7 @@ def get_tickers():
 def chart_symbols():
     """Distinct symbols from ohlcv (for dropdowns)."""
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             rows = db.conn.execute(
                 "SELECT DISTINCT symbol FROM ohlcv ORDER BY symbol"
             ).fetchall()
@@ -76,7 +78,7 @@ def chart_timeframes():
     """Distinct timeframes for a symbol (or all if no symbol). Query param: symbol (optional)."""
     symbol = request.args.get('symbol')
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             if symbol:
                 rows = db.conn.execute(
                     "SELECT DISTINCT timeframe FROM ohlcv WHERE symbol=? ORDER BY timeframe",
@@ -95,7 +97,7 @@ def chart_timeframes():
 def chart_candle_counts():
     """Chart-ready data: candle counts per symbol/timeframe (SQL → JSON for charts)."""
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             rows = db.conn.execute(
                 "SELECT symbol, timeframe, COUNT(*) AS candle_count "
                 "FROM ohlcv GROUP BY symbol, timeframe ORDER BY symbol, timeframe"
@@ -110,7 +112,7 @@ def chart_orders():
     """Recent orders (paper or live). Query param: limit (default 15)."""
     limit = min(int(request.args.get("limit", 15)), 100)
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             rows = db.conn.execute(
                 "SELECT id, mode, symbol, side, type, status, amount, price, filled, ts, created_at "
                 "FROM orders ORDER BY ts DESC LIMIT ?",
@@ -126,7 +128,7 @@ def chart_fills():
     """Recent fills with order link. Query param: limit (default 10)."""
     limit = min(int(request.args.get("limit", 10)), 100)
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             rows = db.conn.execute(
                 "SELECT f.id, f.symbol, f.side, f.price, f.amount, f.cost, f.ts, f.order_id "
                 "FROM fills f ORDER BY f.ts DESC LIMIT ?",
@@ -141,7 +143,7 @@ def chart_fills():
 def chart_positions():
     """Current positions (paper or live)."""
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             rows = db.conn.execute(
                 "SELECT mode, exchange, symbol, base_qty, avg_entry_price, realized_pnl, updated_at "
                 "FROM positions ORDER BY symbol"
@@ -157,7 +159,7 @@ def chart_trade_analytics():
     mode = request.args.get("mode", "paper")
     limit = min(int(request.args.get("limit", 100)), 500)
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             trades = db.get_trade_round_trips(mode=mode, limit=limit)
             total_trades = len(trades)
             win_count = sum(1 for t in trades if t.get("is_win"))
@@ -182,7 +184,7 @@ def chart_trade_analytics():
 def chart_pnl_summary():
     """Paper trading: realized PnL, spent today, daily budget, and vs threshold."""
     try:
-        with Database() as db:
+        with reader_pool.connection() as db:
             realized_pnl = db.get_paper_realized_pnl_total()
             spent_today = db.get_paper_spent_today()
         above_threshold = None
@@ -206,6 +208,12 @@ def chart_pnl_summary():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/stats/db_pool")
+def db_pool_stats():
+    """Reader connection pool metrics: hits, misses, idle/in-use connections."""
+    return jsonify(reader_pool.stats())
+
+
 @app.route("/dashboard")
 def dashboard():
     """Serve the chart dashboard (SQL queries → charts)."""
@@ -228,6 +236,7 @@ def index():
             "/chart/positions": "Current positions",
             "/chart/pnl_summary": "Paper PnL, spent today, budget, threshold",
             "/chart/trade_analytics?mode=paper&limit=100": "Trade analytics: win rate, total trades, PnL",
+            "/stats/db_pool": "Reader connection pool hit/miss metrics",
             "/dashboard": "Web dashboard with charts"
         }
     })
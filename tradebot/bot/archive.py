@@ -0,0 +1,234 @@
+"""
+Cold-data archive for old OHLCV candles.
+
+Candles older than ARCHIVE_AFTER_DAYS are moved out of SQLite into one
+compressed columnar segment file per (symbol, timeframe, UTC month):
+
+    <archive_dir>/<BASE-QUOTE>/<timeframe>/<YYYY-MM>.seg
+
+Segment layout: magic, little-endian u32 header length, JSON header, then one
+compressed block per column. Timestamps are stored as the first value plus
+int64 deltas (nearly constant, so they compress to almost nothing); float
+columns are byte-shuffled before compression. Segments are indexed in the
+`archive_segments` table and read back transparently by Database.get_ohlcv,
+get_ohlcv_arrays and the iter_* helpers built on them.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import lzma
+import os
+import struct
+import time
+import zlib
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .config import ARCHIVE_AFTER_DAYS, ARCHIVE_CODEC
+from .db import OHLCV_DTYPE, Database
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b"TBOHLCV1"
+FLOAT_COLUMNS = ("open", "high", "low", "close", "volume")
+
+_CODECS = {
+    "zlib": (lambda b: zlib.compress(b, 6), zlib.decompress),
+    "lzma": (lambda b: lzma.compress(b, preset=6), lzma.decompress),
+}
+
+
+def encode_segment(arr: np.ndarray, codec: str = "zlib") -> bytes:
+    """Encode a structured OHLCV array (ascending timestamps) into segment bytes"""
+    if codec not in _CODECS:
+        raise ValueError(f"Unknown archive codec: {codec}")
+    compress = _CODECS[codec][0]
+    n = len(arr)
+    ts = arr["timestamp"].astype(np.int64)
+    blocks = [compress(np.diff(ts).astype("<i8").tobytes())]
+    for col in FLOAT_COLUMNS:
+        raw = np.ascontiguousarray(arr[col], dtype="<f8").view(np.uint8)
+        # Byte shuffle: group the k-th byte of every value together
+        blocks.append(compress(raw.reshape(n, 8).T.tobytes()))
+    header = json.dumps({
+        "version": 1,
+        "codec": codec,
+        "rows": n,
+        "first_ts": int(ts[0]) if n else None,
+        "blocks": [len(b) for b in blocks],
+    }).encode()
+    return SEGMENT_MAGIC + struct.pack("<I", len(header)) + header + b"".join(blocks)
+
+
+def decode_segment(blob: bytes) -> np.ndarray:
+    """Decode segment bytes back into a structured OHLCV array"""
+    if not blob.startswith(SEGMENT_MAGIC):
+        raise ValueError("Not an OHLCV archive segment")
+    pos = len(SEGMENT_MAGIC)
+    (header_len,) = struct.unpack_from("<I", blob, pos)
+    pos += 4
+    header = json.loads(blob[pos:pos + header_len])
+    pos += header_len
+    decompress = _CODECS[header["codec"]][1]
+    n = header["rows"]
+    blocks = []
+    for size in header["blocks"]:
+        blocks.append(decompress(blob[pos:pos + size]))
+        pos += size
+
+    arr = np.empty(n, dtype=OHLCV_DTYPE)
+    if n == 0:
+        return arr
+    ts = np.empty(n, dtype=np.int64)
+    ts[0] = header["first_ts"]
+    ts[1:] = header["first_ts"] + np.cumsum(np.frombuffer(blocks[0], dtype="<i8"))
+    arr["timestamp"] = ts
+    for col, block in zip(FLOAT_COLUMNS, blocks[1:]):
+        shuffled = np.frombuffer(block, dtype=np.uint8).reshape(8, n)
+        arr[col] = np.ascontiguousarray(shuffled.T).view("<f8").ravel()
+    return arr
+
+
+def segment_relpath(symbol: str, timeframe: str, period_start: int) -> str:
+    """Relative file path of a segment inside the archive directory"""
+    month = datetime.fromtimestamp(period_start / 1000, tz=timezone.utc).strftime("%Y-%m")
+    return f"{symbol.replace('/', '-')}/{timeframe}/{month}.seg"
+
+
+def write_segment(path: Path, arr: np.ndarray, codec: str) -> int:
+    """Atomically write a segment file (tmp + fsync + rename). Returns its size in bytes"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    blob = encode_segment(arr, codec)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(blob)
+
+
+@lru_cache(maxsize=8)
+def _read_segment_cached(path: str, mtime_ns: int) -> np.ndarray:
+    arr = decode_segment(Path(path).read_bytes())
+    arr.flags.writeable = False
+    return arr
+
+
+def read_segment(path: Path) -> np.ndarray:
+    """Read a segment file; recently used segments are kept decoded in memory"""
+    return _read_segment_cached(str(path), path.stat().st_mtime_ns)
+
+
+def read_archived(db: Database, symbol: str, timeframe: str, start_time: Optional[int] = None,
+                  end_time: Optional[int] = None, limit: Optional[int] = None,
+                  latest: bool = False) -> np.ndarray:
+    """
+    Read archived candles in [start_time, end_time], ascending
+
+    With `limit`, segments are read oldest-first (newest-first if `latest`)
+    only until at least `limit` rows are collected; the caller trims.
+    """
+    segments = db.get_archive_segments(symbol, timeframe, start_time, end_time)
+    if latest:
+        segments = segments[::-1]
+    parts: List[np.ndarray] = []
+    count = 0
+    for seg in segments:
+        path = db.archive_dir / seg["path"]
+        try:
+            arr = read_segment(path)
+        except FileNotFoundError:
+            logger.error(f"[ARCHIVE] missing segment file {path}")
+            continue
+        ts = arr["timestamp"]
+        lo = np.searchsorted(ts, start_time, side="left") if start_time else 0
+        hi = np.searchsorted(ts, end_time, side="right") if end_time else len(arr)
+        if hi > lo:
+            parts.append(arr[lo:hi])
+            count += hi - lo
+        if limit and count >= limit:
+            break
+    if not parts:
+        return np.empty(0, dtype=OHLCV_DTYPE)
+    if latest:
+        parts.reverse()
+    return np.concatenate(parts)
+
+
+def _month_bounds(ts_ms: int) -> tuple[int, int]:
+    """[start, end] (inclusive, ms) of the UTC month containing ts_ms"""
+    dt = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
+    start = datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+    nxt = datetime(dt.year + (dt.month == 12), dt.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp() * 1000), int(nxt.timestamp() * 1000) - 1
+
+
+def archive_series(db: Database, symbol: str, timeframe: str, cutoff_ms: int,
+                   codec: str = ARCHIVE_CODEC) -> Dict[str, int]:
+    """
+    Move every complete UTC month of (symbol, timeframe) ending before cutoff_ms to the archive
+
+    Per month: write the segment (merging with an existing one, hot rows win),
+    record it in archive_segments, then delete the hot rows in small batches.
+    A crash between steps leaves rows in both places, which reads de-duplicate.
+    """
+    moved = segments = nbytes = 0
+    oldest = db.get_oldest_timestamp(symbol, timeframe)
+    while oldest is not None:
+        period_start, period_end = _month_bounds(oldest)
+        if period_end >= cutoff_ms:
+            break
+        hot = db.get_ohlcv_arrays(symbol, timeframe, start_time=period_start, end_time=period_end,
+                                  include_archive=False)
+        relpath = segment_relpath(symbol, timeframe, period_start)
+        path = db.archive_dir / relpath
+        if path.exists():
+            old = read_segment(path)
+            old = old[~np.isin(old["timestamp"], hot["timestamp"])]
+            merged = np.concatenate([old, hot])
+            merged = merged[np.argsort(merged["timestamp"], kind="stable")]
+        else:
+            merged = hot
+
+        size = write_segment(path, merged, codec)
+        db.upsert_archive_segment(
+            symbol=symbol, timeframe=timeframe, period_start=period_start, period_end=period_end,
+            path=relpath, first_ts=int(merged["timestamp"][0]), last_ts=int(merged["timestamp"][-1]),
+            rows=len(merged), size_bytes=size, codec=codec,
+        )
+        deleted = db.delete_ohlcv_range(symbol, timeframe, period_start, period_end)
+        moved += deleted
+        segments += 1
+        nbytes += size
+        logger.info(
+            f"[ARCHIVE] symbol={symbol} timeframe={timeframe} segment={relpath} "
+            f"rows={len(merged)} moved={deleted} bytes={size}"
+        )
+        oldest = db.get_oldest_timestamp(symbol, timeframe)
+    return {"moved": moved, "segments": segments, "bytes": nbytes}
+
+
+def archive_old_candles(db: Database, older_than_days: int = ARCHIVE_AFTER_DAYS,
+                        timeframes: Sequence[str] = ("1m",), codec: str = ARCHIVE_CODEC) -> Dict[str, int]:
+    """Archive every series in `timeframes` whose candles are older than `older_than_days`"""
+    start = time.time()
+    cutoff_ms = int((time.time() - older_than_days * 86400) * 1000)
+    totals = {"moved": 0, "segments": 0, "bytes": 0}
+    for symbol, timeframe in db.list_ohlcv_series():
+        if timeframe not in timeframes:
+            continue
+        result = archive_series(db, symbol, timeframe, cutoff_ms, codec)
+        for key in totals:
+            totals[key] += result[key]
+    logger.info(
+        f"[ARCHIVE] done moved={totals['moved']} segments={totals['segments']} "
+        f"bytes={totals['bytes']} elapsed_s={time.time() - start:.1f}"
+    )
+    return totals
@@ -3,14 +3,30 @@ One-shot backfill utility.
 
 This is useful after the collector has been stopped for some time: it will fetch
 any missing OHLCV candles and write them into the SQLite DB, then exit.
+
+The range [since, now] of every symbol is split into epoch-aligned time shards
+of BACKFILL_SHARD_PAGES full pages each. Shards are fetched concurrently by a
+thread pool (paced by the shared rate limiter) and written by the main thread,
+each in one transaction that also checkpoints the shard in `backfill_shards`.
+Shards finish out of order, so the stored latest candle says nothing about
+what is missing: each run's planned start is persisted in `backfill_runs`
+first, and a killed run is resumed from there, skipping checkpointed shards.
+
+--repair instead fetches only the holes inside the stored history: gaps are
+found with one LAG() query per series, neighbouring gaps are merged into
+page-sized windows, and the resampled timeframes are rebuilt over just the
+repaired buckets. Windows are checkpointed too, so holes the exchange itself
+has (maintenance) are not requested again.
 """
 
 import argparse
 import logging
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-from .config import SYMBOLS, TIMEFRAME, EXCHANGE_NAME
+from .config import SYMBOLS, TIMEFRAME, EXCHANGE_NAME, BACKFILL_WORKERS, BACKFILL_SHARD_PAGES, RESAMPLE_TO
 from .db import Database
 from .exchange import Exchange
 
@@ -27,47 +43,200 @@ def _now_ms() -> int:
     return int(datetime.now().timestamp() * 1000)
 
 
-def _backfill_symbol(exchange: Exchange, db: Database, symbol: str, timeframe: str, since: int | None) -> tuple[int, int, int]:
+def plan_shards(start_ms: int, end_ms: int, shard_ms: int) -> list[tuple[int, int]]:
+    """Epoch-aligned [shard_start, shard_end] windows covering [start_ms, end_ms]"""
+    first = start_ms // shard_ms * shard_ms
+    return [(t, t + shard_ms - 1) for t in range(first, end_ms + 1, shard_ms)]
+
+
+def _fetch_shard(exchange: Exchange, symbol: str, timeframe: str, start: int, end: int,
+                 page_limit: int) -> list[list]:
+    """Page through [start, end] (network only, runs in a worker thread)"""
+    candles: list[list] = []
+    since = start
+    while since <= end:
+        ohlcv_batch = exchange.fetch_ohlcv(symbol, timeframe, limit=page_limit, since=since)
+        if not ohlcv_batch:
+            break
+        candles.extend(c for c in ohlcv_batch if start <= c[0] <= end)
+        latest_open_time = ohlcv_batch[-1][0]
+        # A short page means the exchange has nothing newer
+        if latest_open_time >= end or len(ohlcv_batch) < page_limit:
+            break
+        since = latest_open_time + 1
+    return candles
+
+
+def _series_start(db: Database, symbol: str, timeframe: str, since: int | None, page_ms: int) -> int:
+    """Where a series' backfill begins: --since/--hours, else the stored latest candle, else one page back"""
+    if since is not None:
+        return since
+    latest_ts = db.get_latest_timestamp(symbol, timeframe)
+    if latest_ts:
+        # Re-fetch the latest stored candle: it may have been stored while still forming
+        return latest_ts
+    return _now_ms() - page_ms
+
+
+def backfill(exchange: Exchange, db: Database, symbols: list[str], timeframe: str, since: int | None,
+             workers: int = BACKFILL_WORKERS, shard_pages: int = BACKFILL_SHARD_PAGES) -> dict[str, int]:
     """
-    Backfill OHLCV for a symbol until caught up.
+    Backfill every symbol from `since` (or its latest stored candle) to now
 
     Returns:
-        (total_fetched, total_inserted, total_updated)
+        Totals: fetched, inserted, updated, shards, skipped (already checkpointed)
     """
-    latest_ts = db.get_latest_timestamp(symbol, timeframe)
-    effective_since = since
-    if effective_since is None and latest_ts:
-        effective_since = latest_ts + 1
-
-    total_fetched = 0
-    total_inserted = 0
-    total_updated = 0
-
-    while True:
-        ohlcv_batch = exchange.fetch_ohlcv(
-            symbol,
-            timeframe,
-            limit=500,
-            since=effective_since,
-        )
-        if not ohlcv_batch:
-            break
+    page_limit = exchange.ohlcv_page_limit
+    tf_ms = db._timeframe_to_ms(timeframe)
+    shard_ms = page_limit * tf_ms * shard_pages
+    now_ms = _now_ms()
 
-        fetched = len(ohlcv_batch)
-        total_fetched += fetched
+    tasks = []
+    skipped = 0
+    for symbol in symbols:
+        start = _series_start(db, symbol, timeframe, since, page_limit * tf_ms)
+        pending = db.get_backfill_run_start(symbol, timeframe)
+        if pending is not None and pending < start:
+            logger.info(f"[BACKFILL] symbol={symbol} timeframe={timeframe} resume_from={pending} planned={start}")
+            start = pending
+        db.begin_backfill_run(symbol, timeframe, start)
+        done = db.get_completed_backfill_shards(symbol, timeframe)
+        for shard_start, shard_end in plan_shards(start, now_ms, shard_ms):
+            if (shard_start, shard_end) in done:
+                skipped += 1
+                continue
+            # Only a shard fetched from its own start and already fully closed can be checkpointed
+            fetch_start = max(shard_start, start)
+            complete = fetch_start == shard_start and shard_end < now_ms
+            tasks.append((symbol, shard_start, shard_end, fetch_start, complete))
 
-        inserted, updated = db.insert_ohlcv(symbol, timeframe, ohlcv_batch)
-        total_inserted += inserted
-        total_updated += updated
+    logger.info(
+        f"[BACKFILL] plan symbols={len(symbols)} timeframe={timeframe} shards={len(tasks)} "
+        f"skipped_done={skipped} page_limit={page_limit} shard_candles={page_limit * shard_pages} "
+        f"workers={workers}"
+    )
+    totals, _, failed = _run_tasks(exchange, db, timeframe, tasks, page_limit, workers)
+    for symbol in symbols:
+        if symbol not in failed:
+            db.finish_backfill_run(symbol, timeframe)
+    totals["skipped"] = skipped
+    return totals
 
-        latest_open_time = ohlcv_batch[-1][0]
-        effective_since = latest_open_time + 1
 
-        # If batch smaller than limit, we are caught up for this since-window.
-        if fetched < 500:
-            break
+def _run_tasks(exchange: Exchange, db: Database, timeframe: str, tasks: list[tuple], page_limit: int,
+               workers: int) -> tuple[dict[str, int], list[tuple], set[str]]:
+    """
+    Fetch (symbol, ckpt_start, ckpt_end, fetch_start, complete) tasks concurrently and store each
 
-    return total_fetched, total_inserted, total_updated
+    Returns:
+        (totals, stored, failed): stored lists (symbol, fetch_start, ckpt_end) of tasks that wrote
+        candles, failed the symbols with a task that could not be fetched or stored
+    """
+    totals = {"fetched": 0, "inserted": 0, "updated": 0, "shards": 0}
+    stored: list[tuple] = []
+    failed: set[str] = set()
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill") as pool:
+        futures = {}
+        for task in tasks:
+            symbol, _, shard_end, fetch_start, _ = task
+            futures[pool.submit(_fetch_shard, exchange, symbol, timeframe, fetch_start, shard_end, page_limit)] = task
+        # Writes stay on this thread: one transaction per shard, checkpoint included
+        for future in as_completed(futures):
+            symbol, shard_start, shard_end, fetch_start, complete = futures[future]
+            try:
+                candles = future.result()
+                inserted, updated = db.store_backfill_shard(
+                    symbol, timeframe, shard_start, shard_end, candles, complete
+                )
+            except Exception as e:
+                logger.error(f"[BACKFILL] symbol={symbol} shard_start={shard_start} error={e}", exc_info=True)
+                failed.add(symbol)
+                continue
+            totals["fetched"] += len(candles)
+            totals["inserted"] += inserted
+            totals["updated"] += updated
+            totals["shards"] += 1
+            if candles:
+                stored.append((symbol, fetch_start, shard_end))
+            logger.info(
+                f"[BACKFILL] symbol={symbol} timeframe={timeframe} shard_start={fetch_start} "
+                f"shard_end={shard_end} fetched={len(candles)} inserted={inserted} updated={updated} "
+                f"checkpointed={complete} progress={totals['shards']}/{len(tasks)}"
+            )
+    elapsed = time.time() - started
+    logger.info(
+        f"[BACKFILL] timeframe={timeframe} fetched={totals['fetched']} inserted={totals['inserted']} "
+        f"updated={totals['updated']} shards={totals['shards']} elapsed_s={elapsed:.1f} "
+        f"candles_per_s={totals['fetched'] / elapsed if elapsed > 0 else 0:.0f}"
+    )
+    return totals, stored, failed
+
+
+def plan_repair_windows(gaps: list[tuple[int, int]], timeframe_ms: int, max_candles: int) -> list[tuple[int, int]]:
+    """Merge ascending gaps into [start, end] fetch windows of at most max_candles candles each"""
+    windows: list[list[int]] = []
+    for gap_start, gap_end in gaps:
+        if windows and (gap_end - windows[-1][0]) // timeframe_ms + 1 <= max_candles:
+            windows[-1][1] = gap_end
+        else:
+            windows.append([gap_start, gap_end])
+    return [(start, end) for start, end in windows]
+
+
+def _covered(start: int, end: int, done: list[tuple[int, int]]) -> bool:
+    return any(d_start <= start and end <= d_end for d_start, d_end in done)
+
+
+def repair_gaps(exchange: Exchange, db: Database, symbols: list[str], timeframe: str, since: int | None = None,
+                workers: int = BACKFILL_WORKERS) -> dict[str, int]:
+    """
+    Fetch only the missing candle ranges inside each series' stored history, then re-resample them
+
+    Returns:
+        Totals: gaps, windows, skipped (already attempted), fetched, inserted, updated, resampled
+    """
+    page_limit = exchange.ohlcv_page_limit
+    tf_ms = db._timeframe_to_ms(timeframe)
+    tasks = []
+    gap_count = skipped = 0
+    for symbol in symbols:
+        done = sorted(db.get_completed_backfill_shards(symbol, timeframe))
+        gaps = []
+        for gap_start, gap_end in db.find_ohlcv_gaps(symbol, timeframe, start_time=since):
+            if _covered(gap_start, gap_end, done):
+                skipped += 1
+            else:
+                gaps.append((gap_start, gap_end))
+        gap_count += len(gaps)
+        windows = plan_repair_windows(gaps, tf_ms, page_limit)
+        missing = sum((end - start) // tf_ms + 1 for start, end in gaps)
+        if gaps:
+            logger.info(
+                f"[BACKFILL] repair symbol={symbol} timeframe={timeframe} gaps={len(gaps)} "
+                f"missing_candles={missing} windows={len(windows)}"
+            )
+        tasks.extend((symbol, start, end, start, True) for start, end in windows)
+
+    logger.info(
+        f"[BACKFILL] repair plan symbols={len(symbols)} timeframe={timeframe} gaps={gap_count} "
+        f"windows={len(tasks)} skipped_attempted={skipped}"
+    )
+    totals, stored, _ = _run_tasks(exchange, db, timeframe, tasks, page_limit, workers)
+    totals.update({"gaps": gap_count, "windows": len(tasks), "skipped": skipped, "resampled": 0})
+
+    # Higher timeframes built from 1m only need the buckets around the repaired windows
+    if timeframe == "1m":
+        for symbol, start, end in stored:
+            for to_tf in RESAMPLE_TO:
+                try:
+                    ins, upd = db.resample_ohlcv_range(symbol, "1m", to_tf, start, end)
+                    totals["resampled"] += ins + upd
+                except Exception as e:
+                    logger.warning(f"[BACKFILL] symbol={symbol} resample 1m->{to_tf} error={e}")
+        if stored:
+            logger.info(f"[BACKFILL] repair resampled candles={totals['resampled']} to={','.join(RESAMPLE_TO)}")
+    return totals
 
 
 def main():
@@ -76,6 +245,10 @@ def main():
     parser.add_argument("--timeframe", type=str, default=TIMEFRAME, help=f"Timeframe (default: {TIMEFRAME})")
     parser.add_argument("--since", type=int, help="Start timestamp in ms (overrides DB latest_ts logic)")
     parser.add_argument("--hours", type=float, help="Backfill from now-hours (overrides DB latest_ts logic)")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Shards fetched in parallel")
+    parser.add_argument("--shard-pages", type=int, default=BACKFILL_SHARD_PAGES, help="Full pages per time shard")
+    parser.add_argument("--repair", action="store_true",
+                        help="Only fetch gaps inside the stored history (from --since/--hours, else all of it)")
     args = parser.parse_args()
 
     timeframe = args.timeframe
@@ -84,15 +257,16 @@ def main():
     else:
         since = args.since
 
-    exchange = Exchange()
+    # Backfill yields to live collection/trading on the shared rate limit
+    exchange = Exchange(low_priority=True)
     db = Database()
     db.create_tables()
 
     symbols = [args.symbol] if args.symbol else [s.strip() for s in SYMBOLS]
 
     valid_symbols: list[str] = []
-    for s in symbols:
-        if exchange.validate_symbol(s):
+    for s, available in exchange.validate_symbols(symbols).items():
+        if available:
             valid_symbols.append(s)
             logger.info(f"[BACKFILL] symbol={s} status=available exchange={EXCHANGE_NAME}")
         else:
@@ -102,15 +276,11 @@ def main():
         logger.error("No valid symbols to backfill. Check SYMBOLS / --symbol.")
         sys.exit(1)
 
-    for s in valid_symbols:
-        try:
-            total_fetched, total_inserted, total_updated = _backfill_symbol(exchange, db, s, timeframe, since)
-            logger.info(
-                f"[BACKFILL] symbol={s} timeframe={timeframe} fetched={total_fetched} "
-                f"inserted={total_inserted} updated={total_updated} since={since}"
-            )
-        except Exception as e:
-            logger.error(f"[BACKFILL] symbol={s} error={e}", exc_info=True)
+    if args.repair:
+        repair_gaps(exchange, db, valid_symbols, timeframe, since, workers=args.workers)
+    else:
+        backfill(exchange, db, valid_symbols, timeframe, since,
+                 workers=args.workers, shard_pages=max(1, args.shard_pages))
 
     db.close()
     logger.info("[BACKFILL] done")
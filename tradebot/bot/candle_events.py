@@ -0,0 +1,126 @@
+"""
+Candle-close notifications from the collector to the trader.
+
+The collector appends one `candle_events` row per (symbol, timeframe) each
+time it stores a newly closed candle, collected or resampled, in the same
+transaction as the candle itself. CandleCloseTracker decides which writes
+close a candle; it remembers the newest close announced per series, so a
+re-fetched candle is never announced twice.
+
+The trader tails the log with CandleEventListener. Between events it only
+reads `PRAGMA data_version`, which changes when another connection commits
+and costs no table access; the log itself is read only after such a commit.
+A new candle_events row wakes the trader for just the symbols it names,
+right after the candle closed.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .db import Database
+
+logger = logging.getLogger(__name__)
+
+ONE_MINUTE_MS = 60 * 1000
+
+CandleEvent = Tuple[str, str, int]  # (symbol, timeframe, candle open ms)
+
+
+class CandleCloseTracker:
+    """Newest closed candle announced per series; turns written candles into close events."""
+
+    def __init__(self):
+        self._announced: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def closed(self, symbol: str, timeframe: str, candles: Sequence[Sequence],
+               now_ms: Optional[int] = None) -> Optional[CandleEvent]:
+        """Event for the newest candle in `candles` closed by now_ms, unless already announced"""
+        if not candles:
+            return None
+        tf_ms = Database._timeframe_to_ms(timeframe)
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        closed = [c[0] for c in candles if c[0] + tf_ms <= now_ms]
+        if not closed:
+            return None
+        return self._new(symbol, timeframe, int(max(closed)))
+
+    def closed_from_1m(self, symbol: str, to_timeframe: str) -> Optional[CandleEvent]:
+        """Event for the newest to_timeframe bucket covered by the 1m closes announced so far"""
+        with self._lock:
+            last_1m = self._announced.get((symbol, "1m"))
+        if last_1m is None:
+            return None
+        bucket_ms = Database._timeframe_to_ms(to_timeframe)
+        return self._new(symbol, to_timeframe, (last_1m + ONE_MINUTE_MS) // bucket_ms * bucket_ms - bucket_ms)
+
+    def _new(self, symbol: str, timeframe: str, candle_ts: int) -> Optional[CandleEvent]:
+        with self._lock:
+            announced = self._announced.get((symbol, timeframe))
+        if announced is not None and candle_ts <= announced:
+            return None
+        return symbol, timeframe, candle_ts
+
+    def mark(self, events: Sequence[CandleEvent]) -> None:
+        """Record events as announced (call once they are committed)"""
+        with self._lock:
+            for symbol, timeframe, candle_ts in events:
+                key = (symbol, timeframe)
+                if candle_ts > self._announced.get(key, -1):
+                    self._announced[key] = candle_ts
+
+
+class CandleEventListener:
+    """Tails candle_events for one timeframe on the trader's DB connection."""
+
+    def __init__(self, db: Database, timeframe: str, poll_s: float = 0.25):
+        self.db = db
+        self.timeframe = timeframe
+        self.poll_s = poll_s
+        # Start at the end of the log: closes from before startup are covered by the first sweep
+        self.cursor = db.get_last_candle_event_id()
+        self._version = db.data_version()
+        self.checks = 0
+        self.reads = 0
+
+    def wait(self, timeout: float, stop_event: Optional[threading.Event] = None) -> Dict[str, int]:
+        """
+        Block until closed `timeframe` candles are logged, `timeout` passes or stop_event is set
+
+        Returns:
+            {symbol: newest closed candle open (ms)}; empty on timeout/stop
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            version = self.db.data_version()
+            self.checks += 1
+            if version != self._version:
+                self._version = version
+                closed = self._read()
+                if closed:
+                    return closed
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {}
+            pause = min(self.poll_s, remaining)
+            if stop_event is not None:
+                if stop_event.wait(pause):
+                    return {}
+            else:
+                time.sleep(pause)
+
+    def _read(self) -> Dict[str, int]:
+        closed: Dict[str, int] = {}
+        while True:
+            events: List[Dict] = self.db.get_candle_events(self.cursor)
+            self.reads += 1
+            if not events:
+                return closed
+            self.cursor = events[-1]["id"]
+            for e in events:
+                if e["timeframe"] == self.timeframe:
+                    closed[e["symbol"]] = max(closed.get(e["symbol"], e["candle_ts"]), e["candle_ts"])
@@ -7,14 +7,24 @@ import time
 import logging
 import signal
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from .config import (
     SYMBOLS, TIMEFRAME, MULTI_TIMEFRAMES, RESAMPLE_TO, LOGS_DIR,
-    EXCHANGE_NAME
+    EXCHANGE_NAME, TICKER_FLUSH_ROWS, TICKER_FLUSH_INTERVAL, TICKER_SKIP_UNCHANGED,
+    COLLECTOR_CONCURRENCY, TICKER_FETCH_MODE, INGEST_WRITER, INGEST_QUEUE_SIZE, INGEST_MAX_BATCH_ROWS,
+    COLLECTOR_ALIGN, COLLECTOR_SETTLE_DELAY, CANDLE_EVENTS,
 )
+from ccxt.base.errors import NotSupported
 from .exchange import Exchange
 from .db import Database
+from .ticker_buffer import TickerBuffer
+from .ingest_writer import IngestWriter
+from .candle_events import CandleCloseTracker
+from .scheduler import CandleLatency, CandleScheduler, close_to_stored_ms
+from .series_state import SeriesStateCache
 
 # Configure logging
 log_file = LOGS_DIR / f"collector_{datetime.now().strftime('%Y%m%d')}.log"
@@ -22,13 +32,19 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler(log_file),
+        # delay=True: the file is only created once something is logged to it, so an importer
+        # that configured logging first (scripts/bench_collector.py) leaves no empty log behind
+        logging.FileHandler(log_file, delay=True),
         logging.StreamHandler(sys.stdout)
     ]
 )
 
 logger = logging.getLogger(__name__)
 
+OHLCV_PAGE_SIZE = 500
+# Cap on pages fetched per symbol/timeframe per cycle; a long catch-up continues next cycle
+MAX_OHLCV_PAGES_PER_CYCLE = 100
+
 DEFAULT_TIMEFRAME_INTERVALS = {
     "1m": 60,
     "5m": 300,
@@ -58,25 +74,45 @@ def _timeframe_to_seconds(timeframe: str) -> int:
 class Collector:
     """Main data collection class"""
     
-    def __init__(self, symbols: Optional[List[str]] = None, timeframes: Optional[List[str]] = None):
+    def __init__(self, symbols: Optional[List[str]] = None, timeframes: Optional[List[str]] = None,
+                 concurrency: int = COLLECTOR_CONCURRENCY):
         """Initialize collector"""
         self.exchange = Exchange()
         self.db = Database()
+        # Candle close -> stored latency samples, recorded by whichever side writes the candles
+        self.latency = CandleLatency()
+        # Newly closed candles are announced in candle_events for the trader (None = disabled)
+        self.candle_events = CandleCloseTracker() if CANDLE_EVENTS else None
+        # Fetch cursors and open resample buckets, loaded once and then kept current in memory
+        self.series_state = SeriesStateCache(RESAMPLE_TO)
+        self._state_loaded = False
+        # Writer thread owning its own connection; fetchers only enqueue (None = write inline).
+        # It advances the fetch cursors only once a page is committed.
+        self.writer = (
+            IngestWriter(self.db.db_path, max_queue=INGEST_QUEUE_SIZE, max_batch_rows=INGEST_MAX_BATCH_ROWS,
+                         latency=self.latency, events=self.candle_events, on_commit=self.series_state.record)
+            if INGEST_WRITER else None
+        )
+        self.ticker_buffer = TickerBuffer(
+            self.writer or self.db, max_rows=TICKER_FLUSH_ROWS, max_age_s=TICKER_FLUSH_INTERVAL,
+            skip_unchanged=TICKER_SKIP_UNCHANGED,
+        )
         self.running = False
+        self._stop_event = threading.Event()
+        self.concurrency = max(1, concurrency)
         self.setup_signal_handlers()
 
         self.symbols = self._resolve_symbols(symbols)
         self.timeframes = self._resolve_timeframes(timeframes)
         self.collection_interval_override = self._read_collection_interval_override()
         self.timeframe_intervals = self._build_timeframe_intervals(self.timeframes)
-        self.base_interval = min(self.timeframe_intervals.values())
-        self.last_run: Dict[str, Optional[float]] = {tf: None for tf in self.timeframes}
+        self.scheduler = CandleScheduler(self.timeframe_intervals, settle_s=COLLECTOR_SETTLE_DELAY,
+                                         align=COLLECTOR_ALIGN)
         
         # Validate symbols
         self.valid_symbols = []
-        for symbol in self.symbols:
-            symbol = symbol.strip()
-            if self.exchange.validate_symbol(symbol):
+        for symbol, available in self.exchange.validate_symbols(self.symbols).items():
+            if available:
                 self.valid_symbols.append(symbol)
                 logger.info(f"[COLLECTOR] symbol={symbol} status=available")
             else:
@@ -86,6 +122,11 @@ class Collector:
             logger.error("No valid symbols found! Check your SYMBOLS configuration.")
             sys.exit(1)
 
+        # One fetch_tickers request per cycle instead of one fetch_ticker per symbol
+        self.batch_tickers = TICKER_FETCH_MODE == "batch" and self.exchange.supports_fetch_tickers
+        if TICKER_FETCH_MODE == "batch" and not self.batch_tickers:
+            logger.warning(f"[COLLECTOR] exchange={EXCHANGE_NAME} fetch_tickers unsupported; using per-symbol tickers")
+
         # Optional: warn if exchange does not advertise timeframe
         advertised = getattr(self.exchange.exchange, "timeframes", None) or {}
         if advertised:
@@ -101,7 +142,20 @@ class Collector:
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals"""
         logger.info(f"Received signal {signum}, shutting down gracefully...")
+        # Only flags here: run()'s finally block flushes the tickers and drains the writer.
+        # Doing it in the handler could block on a full writer queue or re-enter SQLite.
         self.running = False
+        self._stop_event.set()
+
+    def _flush_tickers(self, force: bool = True):
+        """Write buffered tickers (or only if the age threshold passed), logging failures"""
+        try:
+            if force:
+                self.ticker_buffer.flush()
+            else:
+                self.ticker_buffer.maybe_flush()
+        except Exception as e:
+            logger.error(f"[TICKERS] flush failed queue_depth={self.ticker_buffer.queue_depth} error={e}")
 
     def _read_collection_interval_override(self) -> Optional[int]:
         raw = os.getenv("COLLECTION_INTERVAL")
@@ -157,58 +211,123 @@ class Collector:
         parts = [f"{tf}={self.timeframe_intervals[tf]}s" for tf in self.timeframes]
         return ", ".join(parts)
     
-    def collect_ohlcv(self, symbol: str, timeframe: str):
+    def _load_series_state(self):
+        """Initialise the in-memory series state (one grouped read, plus the open resample buckets)"""
+        if self._state_loaded:
+            return
+        series = [(symbol, tf) for symbol in self.valid_symbols for tf in self.timeframes]
+        self.series_state.load(self.db, series)
+        if RESAMPLE_TO:
+            for symbol in self.valid_symbols:
+                # Catch up through the watermark path once, then keep the open buckets in memory
+                self._resample_from_db(symbol, use_writer=False)
+                self.series_state.seed_resample(self.db, symbol)
+        self._state_loaded = True
+
+    def collect_ohlcv(self, symbol: str, timeframe: str) -> List[List]:
         """
         Collect OHLCV data for a symbol
         
         Args:
             symbol: Trading pair to collect data for
+
+        Returns:
+            The candles written (or queued for the writer)
         """
+        candles: List[List] = []
         try:
-            latest_ts = self.db.get_latest_timestamp(symbol, timeframe)
-            since = latest_ts + 1 if latest_ts else None
-            total_fetched = 0
-            total_inserted = 0
-            total_updated = 0
+            latest_ts = self.series_state.latest_ts(symbol, timeframe)
+            batches, error = self._fetch_ohlcv_pages(symbol, timeframe, latest_ts)
+            candles = self._store_ohlcv(symbol, timeframe, latest_ts, batches)
+            if error is not None:
+                raise error
+        except Exception as e:
+            logger.error(f"[COLLECTOR] symbol={symbol} error={e}", exc_info=True)
+        return candles
+
+    def _fetch_ohlcv_pages(self, symbol: str, timeframe: str, latest_ts: Optional[int]) -> tuple:
+        """
+        Fetch every candle page from latest_ts on (network only, safe to run in a worker thread)
 
-            while True:
+        The candle at latest_ts is fetched again: it was usually still forming when stored,
+        and this replaces it with its closed values.
+        
+        Returns:
+            (batches, error): pages fetched so far and the exception that stopped paging, if any
+        """
+        since = latest_ts if latest_ts else None
+        batches: List[List[List]] = []
+        try:
+            for _ in range(MAX_OHLCV_PAGES_PER_CYCLE):
                 ohlcv_batch = self.exchange.fetch_ohlcv(
                     symbol,
                     timeframe,
-                    limit=500,
+                    limit=OHLCV_PAGE_SIZE,
                     since=since
                 )
                 if not ohlcv_batch:
                     break
-
-                fetched = len(ohlcv_batch)
-                total_fetched += fetched
-
-                inserted, updated = self.db.insert_ohlcv(symbol, timeframe, ohlcv_batch)
-                total_inserted += inserted
-                total_updated += updated
-
-                latest_open_time = ohlcv_batch[-1][0]
-                since = latest_open_time + 1
+                batches.append(ohlcv_batch)
+                since = ohlcv_batch[-1][0] + 1
 
                 # If batch smaller than limit, we are caught up
-                if fetched < 500:
+                if len(ohlcv_batch) < OHLCV_PAGE_SIZE:
                     break
+        except Exception as e:
+            return batches, e
+        return batches, None
 
-            if total_fetched == 0:
-                latest_open = latest_ts if latest_ts is not None else None
-                logger.info(
-                    f"[COLLECTOR] symbol={symbol} timeframe={timeframe} fetched=0 inserted=0 updated=0 "
-                    f"latest_open={latest_open}"
-                )
-            else:
-                logger.info(
-                    f"[COLLECTOR] symbol={symbol} timeframe={timeframe} fetched={total_fetched} "
-                    f"inserted={total_inserted} updated={total_updated} latest_open={since - 1}"
-                )
+    def _store_ohlcv(self, symbol: str, timeframe: str, latest_ts: Optional[int],
+                     batches: List[List[List]]) -> List[List]:
+        """Write (or hand to the writer thread) fetched candle pages, log the summary, advance the state
 
+        With the writer, the state advances from its commit callback instead: a dropped group
+        leaves the cursor where it was, so the next cycle fetches those candles again.
+        """
+        candles = [c for ohlcv_batch in batches for c in ohlcv_batch]
+        if self.writer is not None and batches:
+            # The writer logs fetched/inserted/updated once the pages are committed
+            for ohlcv_batch in batches:
+                self.writer.submit_ohlcv(symbol, timeframe, ohlcv_batch, prev_latest=latest_ts)
+            return candles
+        total_fetched = 0
+        total_inserted = 0
+        total_updated = 0
+        for ohlcv_batch in batches:
+            total_fetched += len(ohlcv_batch)
+            inserted, updated = self.db.insert_ohlcv(symbol, timeframe, ohlcv_batch)
+            total_inserted += inserted
+            total_updated += updated
+
+        if total_fetched == 0:
+            logger.info(
+                f"[COLLECTOR] symbol={symbol} timeframe={timeframe} fetched=0 inserted=0 updated=0 "
+                f"latest_open={latest_ts}"
+            )
+        else:
+            close_ms = close_to_stored_ms(batches[-1], _timeframe_to_seconds(timeframe) * 1000,
+                                          latest_ts, int(time.time() * 1000))
+            if close_ms is not None:
+                self.latency.record(timeframe, close_ms)
+            logger.info(
+                f"[COLLECTOR] symbol={symbol} timeframe={timeframe} fetched={total_fetched} "
+                f"inserted={total_inserted} updated={total_updated} latest_open={batches[-1][-1][0]}"
+                + (f" close_to_stored_ms={close_ms}" if close_ms is not None else "")
+            )
+            self.series_state.record(symbol, timeframe, candles)
+            if self.candle_events is not None:
+                self._announce_closed(self.candle_events.closed(symbol, timeframe, candles))
+        return candles
+
+    def _announce_closed(self, event: Optional[tuple]):
+        """Log a candle close to candle_events (inline writes; the writer thread does its own)"""
+        if event is None:
+            return
+        try:
+            self.db.insert_candle_events([event])
+            self.candle_events.mark([event])
         except Exception as e:
-            logger.error(f"[COLLECTOR] symbol={symbol} error={e}", exc_info=True)
+            logger.warning(f"[COLLECTOR] candle event {event} error={e}")
     
     def collect_ticker(self, symbol: str):
         """
@@ -219,32 +338,168 @@ class Collector:
         """
         try:
             ticker = self.exchange.fetch_ticker(symbol)
-            self.db.insert_ticker(symbol, ticker)
+            self.ticker_buffer.add(symbol, ticker)
             logger.debug(f"{symbol}: Ticker collected - Last: {ticker.get('last')}")
         except Exception as e:
             logger.error(f"Error collecting ticker for {symbol}: {e}", exc_info=True)
+
+    def collect_tickers_batch(self):
+        """Collect tickers for every valid symbol with a single fetch_tickers request"""
+        try:
+            tickers = self.exchange.fetch_tickers(self.valid_symbols)
+        except NotSupported as e:
+            logger.warning(f"[COLLECTOR] fetch_tickers not supported ({e}); switching to per-symbol tickers")
+            self.batch_tickers = False
+            for symbol in self.valid_symbols:
+                self.collect_ticker(symbol)
+            return
+        except Exception as e:
+            logger.error(f"Error collecting tickers (batch of {len(self.valid_symbols)}): {e}", exc_info=True)
+            return
+
+        missing = []
+        for symbol in self.valid_symbols:
+            ticker = tickers.get(symbol)
+            if ticker:
+                self.ticker_buffer.add(symbol, ticker)
+            else:
+                missing.append(symbol)
+        if missing:
+            logger.warning(f"[COLLECTOR] fetch_tickers missing symbols={','.join(missing)}; fetching individually")
+            for symbol in missing:
+                self.collect_ticker(symbol)
+        logger.debug(f"Batch tickers collected: {len(self.valid_symbols) - len(missing)} in one request")
     
     def run_once(self, due_timeframes: List[str]):
         """Run collection cycle once"""
         logger.info(f"Starting collection cycle for timeframes: {', '.join(due_timeframes)}")
         
-        for symbol in self.valid_symbols:
+        if self.writer is not None:
+            self.writer.start()
+        self._load_series_state()
+        self._collect_symbols(due_timeframes)
+        self._flush_tickers(force=False)
+        
+        for tf, stats in self.latency.drain().items():
+            logger.info(
+                f"[LATENCY] timeframe={tf} candle_close_to_stored count={stats['count']} "
+                f"p50_ms={stats['p50']} p95_ms={stats['p95']} max_ms={stats['max']}"
+            )
+        logger.info("Collection cycle completed")
+
+    def _collect_symbols(self, due_timeframes: List[str]):
+        """Collect OHLCV, resampled candles and tickers for every valid symbol"""
+        if self.concurrency > 1 and len(self.valid_symbols) > 1:
+            self._collect_symbols_concurrent(due_timeframes)
+        else:
+            for symbol in self.valid_symbols:
+                try:
+                    fetched = {timeframe: self.collect_ohlcv(symbol, timeframe) for timeframe in due_timeframes}
+                    self._resample_symbol(symbol, fetched.get("1m") or [])
+                    if not self.batch_tickers:
+                        self.collect_ticker(symbol)
+                except Exception as e:
+                    logger.error(f"[COLLECTOR] symbol={symbol} error=processing_failed detail={e}", exc_info=True)
+        if self.batch_tickers:
+            self.collect_tickers_batch()
+
+    def _resample_symbol(self, symbol: str, candles_1m: List[List]):
+        """Build 5m, 7m, 30m (etc.) from 1m so trader can use 7m"""
+        if not RESAMPLE_TO or not candles_1m:
+            return
+        buckets = self.series_state.resample(symbol, candles_1m)
+        if buckets is None:
+            self._resample_from_db(symbol)
+            return
+        # Changed buckets come from memory; written as plain upserts with the watermark advanced
+        watermark = max(c[0] for c in candles_1m)
+        if self.writer is not None:
+            self.writer.submit_resampled(symbol, buckets, watermark)
+            return
+        for to_tf, candles in buckets.items():
             try:
-                for timeframe in due_timeframes:
-                    self.collect_ohlcv(symbol, timeframe)
-                # Build 5m, 7m, 30m (etc.) from 1m so trader can use 7m
-                for to_tf in RESAMPLE_TO:
-                    try:
-                        ins, upd = self.db.resample_ohlcv(symbol, "1m", to_tf)
-                        if ins or upd:
-                            logger.info(f"[COLLECTOR] symbol={symbol} resample 1m->{to_tf} inserted={ins} updated={upd}")
-                    except Exception as e:
-                        logger.warning(f"[COLLECTOR] symbol={symbol} resample 1m->{to_tf} error={e}")
-                self.collect_ticker(symbol)
+                ins, upd = self.db.insert_ohlcv(symbol, to_tf, candles, commit=False)
+                self.db.set_resample_watermark(symbol, "1m", to_tf, watermark)
+                if ins or upd:
+                    logger.info(f"[COLLECTOR] symbol={symbol} resample 1m->{to_tf} inserted={ins} updated={upd}")
+                if self.candle_events is not None:
+                    self._announce_closed(self.candle_events.closed(symbol, to_tf, candles))
             except Exception as e:
-                logger.error(f"[COLLECTOR] symbol={symbol} error=processing_failed detail={e}", exc_info=True)
+                self.db.conn.rollback()
+                logger.warning(f"[COLLECTOR] symbol={symbol} resample 1m->{to_tf} error={e}")
+
+    def _resample_from_db(self, symbol: str, use_writer: bool = True):
+        """Watermark-driven resample reading 1m candles back from the DB"""
+        if use_writer and self.writer is not None:
+            self.writer.submit_resample(symbol, RESAMPLE_TO)
+            return
+        for to_tf in RESAMPLE_TO:
+            try:
+                ins, upd = self.db.resample_ohlcv(symbol, "1m", to_tf)
+                if ins or upd:
+                    logger.info(f"[COLLECTOR] symbol={symbol} resample 1m->{to_tf} inserted={ins} updated={upd}")
+                    if self.candle_events is not None:
+                        self._announce_closed(self.candle_events.closed_from_1m(symbol, to_tf))
+            except Exception as e:
+                logger.warning(f"[COLLECTOR] symbol={symbol} resample 1m->{to_tf} error={e}")
+
+    def _fetch_symbol(self, symbol: str, latest_by_tf: Dict[str, Optional[int]],
+                      with_ticker: bool = True) -> Dict[str, Any]:
+        """Network part of one symbol's cycle; runs in a worker thread and never touches the DB"""
+        result: Dict[str, Any] = {"ohlcv": {}, "ticker": None, "ticker_error": None}
+        for timeframe, latest_ts in latest_by_tf.items():
+            result["ohlcv"][timeframe] = self._fetch_ohlcv_pages(symbol, timeframe, latest_ts)
+        if with_ticker:
+            try:
+                result["ticker"] = self.exchange.fetch_ticker(symbol)
+            except Exception as e:
+                result["ticker_error"] = e
+        return result
+
+    def _collect_symbols_concurrent(self, due_timeframes: List[str]):
+        """
+        Fetch up to `concurrency` symbols in parallel and store each as it completes
         
-        logger.info("Collection cycle completed")
+        Worker threads only talk to the exchange (paced by Exchange._pace); every
+        DB read and write stays on this thread, so SQLite access remains serialized.
+        """
+        start = time.time()
+        latest = {
+            symbol: {tf: self.series_state.latest_ts(symbol, tf) for tf in due_timeframes}
+            for symbol in self.valid_symbols
+        }
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="collector") as pool:
+            futures = {
+                pool.submit(self._fetch_symbol, symbol, latest[symbol], not self.batch_tickers): symbol
+                for symbol in self.valid_symbols
+            }
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    result = future.result()
+                    candles_1m: List[List] = []
+                    for timeframe in due_timeframes:
+                        batches, error = result["ohlcv"][timeframe]
+                        try:
+                            candles = self._store_ohlcv(symbol, timeframe, latest[symbol][timeframe], batches)
+                            if timeframe == "1m":
+                                candles_1m = candles
+                        except Exception as e:
+                            error = error or e
+                        if error is not None:
+                            logger.error(f"[COLLECTOR] symbol={symbol} error={error}", exc_info=error)
+                    self._resample_symbol(symbol, candles_1m)
+                    if result["ticker_error"] is not None:
+                        logger.error(f"Error collecting ticker for {symbol}: {result['ticker_error']}",
+                                     exc_info=result["ticker_error"])
+                    elif result["ticker"] is not None:
+                        self.ticker_buffer.add(symbol, result["ticker"])
+                except Exception as e:
+                    logger.error(f"[COLLECTOR] symbol={symbol} error=processing_failed detail={e}", exc_info=True)
+        logger.info(
+            f"[COLLECTOR] concurrent fetch symbols={len(self.valid_symbols)} "
+            f"workers={self.concurrency} elapsed_s={time.time() - start:.2f}"
+        )
     
     def run(self):
         """Run continuous collection loop"""
@@ -253,50 +508,61 @@ class Collector:
         logger.info(f"Exchange: {EXCHANGE_NAME}")
         logger.info(f"Symbols: {', '.join(self.valid_symbols)}")
         logger.info(f"Timeframes: {', '.join(self.timeframes)}")
-        logger.info(f"Schedule: {self._format_schedule()} (base_tick={self.base_interval}s)")
+        logger.info(
+            f"Schedule: {self._format_schedule()} "
+            f"({'aligned to candle close + %.1fs settle' % COLLECTOR_SETTLE_DELAY if COLLECTOR_ALIGN else 'fixed interval'})"
+        )
+        logger.info(f"Fetch concurrency: {self.concurrency}")
+        logger.info(f"Tickers: {'batch (fetch_tickers)' if self.batch_tickers else 'per-symbol'}")
+        logger.info(f"Writer: {'thread (queue=%d)' % INGEST_QUEUE_SIZE if self.writer else 'inline'}")
         if self.collection_interval_override:
             logger.info(f"Collection Interval Override: {self.collection_interval_override}s")
         logger.info("=" * 60)
         
         # Ensure database is initialized
         self.db.create_tables()
+        if self.writer is not None:
+            self.writer.start()
         
         self.running = True
         
         try:
             while self.running:
-                cycle_start = time.time()
-
-                now = time.time()
-                due_timeframes: List[str] = []
-                for tf, interval in self.timeframe_intervals.items():
-                    last = self.last_run.get(tf)
-                    if last is None or (now - last) >= interval:
-                        due_timeframes.append(tf)
-
-                if due_timeframes:
-                    self.run_once(due_timeframes)
-                    finished = time.time()
-                    for tf in due_timeframes:
-                        self.last_run[tf] = finished
-                else:
-                    logger.debug("No timeframes due this tick")
-
-                # Calculate sleep time to maintain base tick
-                elapsed = time.time() - cycle_start
-                sleep_time = max(0, self.base_interval - elapsed)
-                
+                sleep_time = self.scheduler.seconds_until_due()
                 if sleep_time > 0:
                     logger.debug(f"Sleeping for {sleep_time:.2f} seconds")
-                    time.sleep(sleep_time)
-                else:
+                    # Event wait so a shutdown signal ends the sleep immediately
+                    if self._stop_event.wait(sleep_time):
+                        break
+
+                cycle_start = time.time()
+                due = self.scheduler.pop_due(cycle_start)
+                if not due:
+                    continue
+                due_timeframes = [tf for tf, _ in due]
+                wake_lag_ms = max(0, int((cycle_start - min(at for _, at in due)) * 1000))
+                logger.info(f"[SCHED] due={','.join(due_timeframes)} wake_lag_ms={wake_lag_ms}")
+
+                self.run_once(due_timeframes)
+                finished = time.time()
+                # Next run is the next candle boundary after now, so an overrun skips ahead
+                # instead of piling up missed ticks
+                self.scheduler.reschedule(due_timeframes, finished)
+                elapsed = finished - cycle_start
+                shortest = min(self.timeframe_intervals[tf] for tf in due_timeframes)
+                if elapsed > shortest:
                     logger.warning(
-                        f"Collection cycle took {elapsed:.2f}s, longer than base tick {self.base_interval}s"
+                        f"Collection cycle took {elapsed:.2f}s, longer than interval {shortest}s; "
+                        f"skipping to the next boundary"
                     )
         
         except KeyboardInterrupt:
             logger.info("Interrupted by user")
         finally:
+            self._flush_tickers()
+            if self.writer is not None:
+                logger.info(f"[WRITER] draining queue_depth={self.writer.queue_depth}")
+                self.writer.close()
             self.db.close()
             logger.info("Collector stopped")
 
@@ -306,11 +572,14 @@ def main():
     parser = argparse.ArgumentParser(description="Tradebot data collector")
     parser.add_argument("--symbols", help="Comma-separated symbols to collect (overrides SYMBOLS)")
     parser.add_argument("--timeframes", help="Comma-separated timeframes (overrides TIMEFRAME/MULTI_TIMEFRAMES)")
+    parser.add_argument("--concurrency", type=int, default=COLLECTOR_CONCURRENCY,
+                        help="Symbols fetched in parallel (overrides COLLECTOR_CONCURRENCY)")
     args = parser.parse_args()
 
     collector = Collector(
         symbols=_parse_csv_list(args.symbols) if args.symbols else None,
         timeframes=_parse_csv_list(args.timeframes) if args.timeframes else None,
+        concurrency=args.concurrency,
     )
     collector.run()
 
@@ -13,7 +13,21 @@ BASE_DIR = Path(__file__).parent.parent
 
 # Database configuration
 DB_DIR = BASE_DIR / "db"
-DB_PATH = DB_DIR / "marketdata.sqlite"
+DB_PATH = Path(os.getenv("DB_PATH", "").strip() or DB_DIR / "marketdata.sqlite")
+# OHLCV storage layout for new databases: "legacy" (TEXT-keyed table) or "compact"
+# (integer series ids, WITHOUT ROWID). Existing DBs are converted with scripts/migrate_compact.py.
+OHLCV_LAYOUT = os.getenv("OHLCV_LAYOUT", "legacy").strip().lower() or "legacy"
+# Read-only connection pool used by api.py: max idle connections, page cache (KiB) and mmap (MiB) per connection
+DB_READER_POOL_SIZE = int(os.getenv("DB_READER_POOL_SIZE", "8"))
+DB_READER_CACHE_KB = int(os.getenv("DB_READER_CACHE_KB", "8192"))
+DB_READER_MMAP_MB = int(os.getenv("DB_READER_MMAP_MB", "64"))
+# Cold archive (scripts/archive_ohlcv.py): candles older than ARCHIVE_AFTER_DAYS move from SQLite into
+# compressed per-month segment files. ARCHIVE_DIR defaults to an "archive" folder next to the DB.
+_raw_archive_dir = os.getenv("ARCHIVE_DIR", "").strip()
+ARCHIVE_DIR = Path(_raw_archive_dir) if _raw_archive_dir else None
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_TIMEFRAMES = [t.strip() for t in os.getenv("ARCHIVE_TIMEFRAMES", "1m").split(",") if t.strip()]
+ARCHIVE_CODEC = os.getenv("ARCHIVE_CODEC", "zlib").strip().lower() or "zlib"  # zlib | lzma
 
 # Logs directory
 LOGS_DIR = BASE_DIR / "logs"
@@ -25,6 +39,39 @@ EXCHANGE_SECRET = os.getenv("EXCHANGE_SECRET", "")
 # PUBLIC_ONLY forces all requests to public endpoints; API keys are ignored when true
 PUBLIC_ONLY = os.getenv("PUBLIC_ONLY", "true").lower() == "true"
 EXCHANGE_SANDBOX = os.getenv("EXCHANGE_SANDBOX", "false").lower() == "true"
+# Markets metadata is cached on disk so process startup skips the multi-MB load_markets download
+MARKETS_CACHE_PATH = Path(os.getenv("MARKETS_CACHE_PATH", "").strip() or DB_DIR / "markets_cache.json")
+MARKETS_CACHE_TTL = int(os.getenv("MARKETS_CACHE_TTL", "21600"))  # seconds; 0 = always download
+# Candles per fetch_ohlcv request for backfills (0 = the exchange's advertised maximum, e.g. 1000 on Binance)
+OHLCV_PAGE_LIMIT = int(os.getenv("OHLCV_PAGE_LIMIT", "0"))
+# Historical backfill: time shards fetched in parallel, each spanning this many pages
+BACKFILL_WORKERS = max(1, int(os.getenv("BACKFILL_WORKERS", "4")))
+BACKFILL_SHARD_PAGES = max(1, int(os.getenv("BACKFILL_SHARD_PAGES", "10")))
+# Host-wide request-weight token bucket shared by collector, backfill and trader (SQLite file).
+# Binance allows 6000 weight/min per IP; the default leaves half of it as headroom.
+# On by default only for binance, whose endpoint weights it knows; elsewhere ccxt's throttle is used.
+RATE_LIMIT_SHARED = (
+    os.getenv("RATE_LIMIT_SHARED", "true" if EXCHANGE_NAME == "binance" else "false").strip().lower() == "true"
+)
+RATE_LIMIT_DB = Path(os.getenv("RATE_LIMIT_DB", "").strip() or DB_DIR / "ratelimit.sqlite")
+RATE_LIMIT_WEIGHT_PER_MIN = float(os.getenv("RATE_LIMIT_WEIGHT_PER_MIN", "3000"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "200"))  # bucket capacity (weight)
+# Low-priority callers (backfill) only draw while the bucket is above this fraction of its capacity
+RATE_LIMIT_LOW_PRIORITY_RESERVE = float(os.getenv("RATE_LIMIT_LOW_PRIORITY_RESERVE", "0.5"))
+# Offline: never download markets; use the on-disk cache regardless of age (paper trading, backfill prep)
+EXCHANGE_OFFLINE = os.getenv("EXCHANGE_OFFLINE", "false").strip().lower() == "true"
+# EXCHANGE_NAME=replay: offline stand-in exchange (bot/replay.py) for load tests and benchmarks.
+# Markets are SYMBOLS, REPLAY_MARKETS synthetic pairs (SYN000/USDT, ...) and every fixture folder
+# (<REPLAY_FIXTURES_DIR>/<BASE-QUOTE>/<timeframe>.csv); other symbols get a seeded random walk.
+REPLAY_MARKETS = int(os.getenv("REPLAY_MARKETS", "200"))
+REPLAY_SEED = int(os.getenv("REPLAY_SEED", "42"))
+_raw_fixtures_dir = os.getenv("REPLAY_FIXTURES_DIR", "").strip()
+REPLAY_FIXTURES_DIR = Path(_raw_fixtures_dir) if _raw_fixtures_dir else None
+REPLAY_LATENCY_MS = float(os.getenv("REPLAY_LATENCY_MS", "0"))  # per request, +/- REPLAY_LATENCY_JITTER_MS
+REPLAY_LATENCY_JITTER_MS = float(os.getenv("REPLAY_LATENCY_JITTER_MS", "0"))
+REPLAY_ERROR_RATE = float(os.getenv("REPLAY_ERROR_RATE", "0"))  # fraction of requests failing with a 429
+REPLAY_WEIGHT_PER_MIN = float(os.getenv("REPLAY_WEIGHT_PER_MIN", "0"))  # server-side weight budget; 0 = none
+REPLAY_BALANCE_QUOTE = float(os.getenv("REPLAY_BALANCE_QUOTE", "10000"))  # starting USDT for orders
 
 # Trading configuration
 SYMBOLS = os.getenv("SYMBOLS", "BTC/USDT,ETH/USDT").split(",")
@@ -34,9 +81,41 @@ MULTI_TIMEFRAMES = os.getenv("MULTI_TIMEFRAMES", "").strip()
 # Timeframes to build from 1m (comma-separated, e.g. 5m,7m,30m). Trader uses 7m.
 RESAMPLE_TO = os.getenv("RESAMPLE_TO", "5m,7m,30m").strip()
 RESAMPLE_TO = [t.strip() for t in RESAMPLE_TO.split(",") if t.strip()] if RESAMPLE_TO else []
+# How resampled candles are built: "python" (aggregate pages in Python) or "sql" (GROUP BY inside SQLite).
+# Use scripts/bench_resample.py to pick the faster one for a given device.
+RESAMPLE_ENGINE = os.getenv("RESAMPLE_ENGINE", "python").strip().lower() or "python"
 # Trader strategy runs on this timeframe (must be in RESAMPLE_TO or collected)
 TRADER_TIMEFRAME = os.getenv("TRADER_TIMEFRAME", "7m").strip() or "7m"
 COLLECTION_INTERVAL = int(os.getenv("COLLECTION_INTERVAL", "60"))  # seconds
+# Symbols fetched in parallel per collection cycle (1 = sequential). Requests stay paced to the
+# exchange rate limit; DB writes stay serialized (main thread or the ingest writer thread).
+COLLECTOR_CONCURRENCY = max(1, int(os.getenv("COLLECTOR_CONCURRENCY", "1")))
+# Collector wakes right after each candle closes (UTC multiples of the timeframe) plus this many
+# seconds for the exchange to finalise the candle. COLLECTOR_ALIGN=false restores fixed intervals.
+COLLECTOR_ALIGN = os.getenv("COLLECTOR_ALIGN", "true").strip().lower() == "true"
+COLLECTOR_SETTLE_DELAY = max(0.0, float(os.getenv("COLLECTOR_SETTLE_DELAY", "2")))
+# Collector buffers tickers and writes them with one commit. Flush when this many rows are queued...
+TICKER_FLUSH_ROWS = int(os.getenv("TICKER_FLUSH_ROWS", "200"))
+# ...or when the oldest queued row is this many seconds old (0 = flush at the end of every cycle).
+TICKER_FLUSH_INTERVAL = float(os.getenv("TICKER_FLUSH_INTERVAL", "0"))
+# Collector DB writes go through a dedicated writer thread that coalesces queued candle pages and
+# tickers into one transaction. INGEST_QUEUE_SIZE bounds the queue (fetchers block when it is full).
+INGEST_WRITER = os.getenv("INGEST_WRITER", "true").strip().lower() == "true"
+INGEST_QUEUE_SIZE = max(1, int(os.getenv("INGEST_QUEUE_SIZE", "64")))
+INGEST_MAX_BATCH_ROWS = int(os.getenv("INGEST_MAX_BATCH_ROWS", "20000"))
+# Collector appends a candle_events row (symbol, timeframe, candle open) whenever it stores a newly
+# closed candle, collected or resampled; the trader tails this log. Only the newest rows are kept.
+CANDLE_EVENTS = os.getenv("CANDLE_EVENTS", "true").strip().lower() == "true"
+CANDLE_EVENTS_KEEP = max(1, int(os.getenv("CANDLE_EVENTS_KEEP", "10000")))
+# How tickers are fetched each cycle: "batch" (one fetch_tickers call for all symbols; falls back
+# to per-symbol when the exchange cannot batch) or "per_symbol" (one fetch_ticker per symbol)
+TICKER_FETCH_MODE = os.getenv("TICKER_FETCH_MODE", "batch").strip().lower() or "batch"
+# Drop a ticker that is identical (apart from its timestamp) to the previous one for the symbol
+TICKER_SKIP_UNCHANGED = os.getenv("TICKER_SKIP_UNCHANGED", "true").strip().lower() == "true"
+# Ticker compaction (scripts/compact_tickers.py): raw tickers older than this many days are rolled
+# up into per-interval summaries (ticker_summaries) and deleted.
+TICKER_COMPACT_AFTER_DAYS = int(os.getenv("TICKER_COMPACT_AFTER_DAYS", "7"))
+TICKER_SUMMARY_INTERVAL = os.getenv("TICKER_SUMMARY_INTERVAL", "1h").strip() or "1h"
 
 # -----------------------------
 # Stage B: Trading configuration
@@ -71,6 +150,15 @@ SMA_SLOW_WINDOW = int(os.getenv("SMA_SLOW_WINDOW", "30"))
 # Trader loop interval (seconds). Defaults to COLLECTION_INTERVAL.
 TRADER_INTERVAL = int(os.getenv("TRADER_INTERVAL", str(COLLECTION_INTERVAL)))
 
+# Trader trigger: "events" evaluates a symbol as soon as the collector logs a closed TRADER_TIMEFRAME
+# candle for it (candle_events); "poll" re-evaluates every symbol every TRADER_INTERVAL seconds.
+# Poll by default: events mode needs a collector that logs candle_events, else it only runs on the fallback.
+TRADER_TRIGGER = os.getenv("TRADER_TRIGGER", "poll").strip().lower() or "poll"
+# How often the trader checks for commits from other processes (PRAGMA data_version, no table read)
+TRADER_EVENT_POLL_MS = max(10, int(os.getenv("TRADER_EVENT_POLL_MS", "250")))
+# In events mode, still sweep every symbol if no event arrived for this many seconds (0 = never)
+TRADER_EVENT_FALLBACK_S = int(os.getenv("TRADER_EVENT_FALLBACK_S", "900"))
+
 # Paper trading assumptions
 PAPER_FEE_RATE = float(os.getenv("PAPER_FEE_RATE", "0.001"))  # 0.1% default
 
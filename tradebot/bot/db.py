@@ -3,38 +3,84 @@ Database operations for storing market data
 """
 import sqlite3
 import logging
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict, Optional, Any, Iterable
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Any, Iterable, Iterator
 from pathlib import Path
-from .config import DB_PATH
+import numpy as np
+from .config import (
+    DB_PATH, RESAMPLE_ENGINE, OHLCV_LAYOUT, ARCHIVE_DIR,
+    DB_READER_POOL_SIZE, DB_READER_CACHE_KB, DB_READER_MMAP_MB, CANDLE_EVENTS_KEEP,
+)
 
 logger = logging.getLogger(__name__)
 
+# Columnar OHLCV record layout returned by Database.get_ohlcv_arrays
+OHLCV_DTYPE = np.dtype([
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+])
+
 
 class Database:
     """SQLite database interface for market data"""
     
-    def __init__(self, db_path: Optional[Path] = None):
+    def __init__(self, db_path: Optional[Path] = None, read_only: bool = False):
         """
         Initialize database connection
         
         Args:
             db_path: Path to SQLite database file
+            read_only: Open with mode=ro + query_only and reader cache/mmap tuning (see ReaderPool)
         """
         self.db_path = db_path or DB_PATH
+        self.read_only = read_only
         self.conn = None
+        # 'legacy' (TEXT-keyed ohlcv table) or 'compact' (ohlcv view over ohlcv_candles)
+        self.layout = None
+        self._series_ids: Dict[tuple, int] = {}
+        # Cold-archive segment files (see bot.archive)
+        self.archive_dir = ARCHIVE_DIR or Path(self.db_path).parent / "archive"
         logger.info(f"Database initialized at {self.db_path}")
     
     def connect(self):
         """Establish database connection"""
-        if self.conn is None:
+        if self.conn is None and self.read_only:
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            # journal_mode is persistent in the file (set by writers); readers only tune their cache
+            self.conn.execute("PRAGMA query_only=ON;")
+            self.conn.execute("PRAGMA busy_timeout=5000;")
+            self.conn.execute(f"PRAGMA cache_size=-{DB_READER_CACHE_KB};")
+            self.conn.execute(f"PRAGMA mmap_size={DB_READER_MMAP_MB * 1024 * 1024};")
+            self._detect_layout()
+            logger.debug("Read-only database connection established")
+        elif self.conn is None:
             self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
             self.conn.row_factory = sqlite3.Row  # Return rows as dictionaries
             # Harden SQLite for concurrent safe writes
             self.conn.execute("PRAGMA journal_mode=WAL;")
             self.conn.execute("PRAGMA synchronous=NORMAL;")
             self.conn.execute("PRAGMA busy_timeout=5000;")
+            self._detect_layout()
             logger.debug("Database connection established (WAL enabled)")
+
+    def _detect_layout(self) -> str:
+        """Detect the OHLCV storage layout: compact once `ohlcv` has been swapped for a view"""
+        row = self.conn.execute("SELECT type FROM sqlite_master WHERE name = 'ohlcv'").fetchone()
+        layout = "compact" if row and row["type"] == "view" else "legacy"
+        if layout != self.layout:
+            self._series_ids.clear()
+        self.layout = layout
+        return layout
     
     def close(self):
         """Close database connection"""
@@ -57,27 +103,15 @@ class Database:
         self.connect()
         cursor = self.conn.cursor()
         
-        # OHLCV data table (deterministic composite primary key)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ohlcv (
-                symbol TEXT NOT NULL,
-                timeframe TEXT NOT NULL,
-                timestamp INTEGER NOT NULL,
-                open REAL NOT NULL,
-                high REAL NOT NULL,
-                low REAL NOT NULL,
-                close REAL NOT NULL,
-                volume REAL NOT NULL,
-                close_time INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (symbol, timeframe, timestamp)
-            )
-        """)
-        # Backward-compat: ensure close_time exists if table was created before this version
-        cursor.execute("PRAGMA table_info(ohlcv)")
-        existing_cols = {row['name'] for row in cursor.fetchall()}
-        if 'close_time' not in existing_cols:
-            cursor.execute("ALTER TABLE ohlcv ADD COLUMN close_time INTEGER")
+        row = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'ohlcv'").fetchone()
+        use_compact = (row["type"] == "view") if row else (OHLCV_LAYOUT == "compact")
+        if use_compact:
+            self._create_compact_ohlcv(cursor)
+        else:
+            self._create_legacy_ohlcv(cursor)
+            if OHLCV_LAYOUT == "compact":
+                logger.warning("OHLCV_LAYOUT=compact but a legacy ohlcv table exists; "
+                               "run scripts/migrate_compact.py to convert it")
         
         # Ticker data table
         cursor.execute("""
@@ -99,6 +133,87 @@ class Database:
             )
         """)
 
+        # Downsampled tickers: one row per (symbol, interval, bucket) written by bot.ticker_compaction
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ticker_summaries (
+                symbol TEXT NOT NULL,
+                interval_ms INTEGER NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                samples INTEGER NOT NULL,
+                first_ts INTEGER NOT NULL,
+                last_ts INTEGER NOT NULL,
+                bid_first REAL, bid_last REAL, bid_min REAL, bid_max REAL,
+                ask_first REAL, ask_last REAL, ask_min REAL, ask_max REAL,
+                last_first REAL, last_last REAL, last_min REAL, last_max REAL,
+                PRIMARY KEY (symbol, interval_ms, bucket_start)
+            ) WITHOUT ROWID
+        """)
+
+        # Incremental resampling state: newest source candle aggregated per target timeframe
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS resample_watermarks (
+                symbol TEXT NOT NULL,
+                from_tf TEXT NOT NULL,
+                to_tf TEXT NOT NULL,
+                watermark INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (symbol, from_tf, to_tf)
+            )
+        """)
+
+        # Cold-archive index: one row per compressed (symbol, timeframe, month) segment file
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS archive_segments (
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                period_start INTEGER NOT NULL,
+                period_end INTEGER NOT NULL,
+                path TEXT NOT NULL,                 -- relative to Database.archive_dir
+                first_ts INTEGER NOT NULL,
+                last_ts INTEGER NOT NULL,
+                rows INTEGER NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (symbol, timeframe, period_start)
+            )
+        """)
+
+        # Backfill checkpoints: completed [shard_start, shard_end] time shards per series
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS backfill_shards (
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                shard_start INTEGER NOT NULL,
+                shard_end INTEGER NOT NULL,
+                fetched INTEGER NOT NULL,
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (symbol, timeframe, shard_start, shard_end)
+            ) WITHOUT ROWID
+        """)
+
+        # Planned start of an unfinished backfill run per series; a resumed run plans from here
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS backfill_runs (
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                start_ts INTEGER NOT NULL,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (symbol, timeframe)
+            ) WITHOUT ROWID
+        """)
+
+        # Change log of candle closes written by the collector; the trader tails it by id
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS candle_events (
+                id INTEGER PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                candle_ts INTEGER NOT NULL,
+                created_at INTEGER NOT NULL
+            )
+        """)
+
         # -----------------------------
         # Stage B: Trading tables
         # -----------------------------
@@ -163,13 +278,8 @@ class Database:
         """)
         
         # Create indexes for faster queries
-        cursor.execute(
-            "CREATE UNIQUE INDEX IF NOT EXISTS idx_ohlcv_symbol_timeframe_timestamp "
-            "ON ohlcv(symbol, timeframe, timestamp)"
-        )
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ohlcv_symbol_timeframe ON ohlcv(symbol, timeframe)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ohlcv_timestamp ON ohlcv(timestamp)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickers_symbol ON tickers(symbol)")
+        # idx_tickers_symbol duplicated the UNIQUE(symbol, timestamp) index; drop it on existing DBs
+        cursor.execute("DROP INDEX IF EXISTS idx_tickers_symbol")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickers_timestamp ON tickers(timestamp)")
 
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_symbol_ts ON orders(symbol, ts)")
@@ -178,57 +288,407 @@ class Database:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_positions_symbol ON positions(symbol)")
         
         self.conn.commit()
-        logger.info("Database tables created/verified")
+        self._detect_layout()
+        logger.info(f"Database tables created/verified (ohlcv layout={self.layout})")
+
+    def _create_legacy_ohlcv(self, cursor):
+        """Legacy layout: one TEXT-keyed ohlcv table"""
+        # OHLCV data table (deterministic composite primary key)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ohlcv (
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                close_time INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (symbol, timeframe, timestamp)
+            )
+        """)
+        # Backward-compat: ensure close_time exists if table was created before this version
+        cursor.execute("PRAGMA table_info(ohlcv)")
+        existing_cols = {row['name'] for row in cursor.fetchall()}
+        if 'close_time' not in existing_cols:
+            cursor.execute("ALTER TABLE ohlcv ADD COLUMN close_time INTEGER")
+        cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_ohlcv_symbol_timeframe_timestamp "
+            "ON ohlcv(symbol, timeframe, timestamp)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ohlcv_symbol_timeframe ON ohlcv(symbol, timeframe)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ohlcv_timestamp ON ohlcv(timestamp)")
+
+    def _create_compact_tables(self, cursor):
+        """Compact storage tables: series dictionary + clustered WITHOUT ROWID candles"""
+        # One row per (symbol, timeframe); candles reference it by integer id
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ohlcv_series (
+                id INTEGER PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                timeframe_ms INTEGER NOT NULL,
+                UNIQUE (symbol, timeframe)
+            )
+        """)
+        # Clustered on (series_id, timestamp): range scans read contiguous pages, no secondary indexes
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ohlcv_candles (
+                series_id INTEGER NOT NULL,
+                timestamp INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                PRIMARY KEY (series_id, timestamp)
+            ) WITHOUT ROWID
+        """)
+
+    def _create_compact_ohlcv(self, cursor):
+        """Compact layout: tables plus an `ohlcv` view so readers keep the legacy column set"""
+        self._create_compact_tables(cursor)
+        cursor.execute("""
+            CREATE VIEW IF NOT EXISTS ohlcv AS
+            SELECT s.symbol AS symbol,
+                   s.timeframe AS timeframe,
+                   c.timestamp AS timestamp,
+                   c.open AS open,
+                   c.high AS high,
+                   c.low AS low,
+                   c.close AS close,
+                   c.volume AS volume,
+                   c.timestamp + s.timeframe_ms - 1 AS close_time
+            FROM ohlcv_candles c
+            JOIN ohlcv_series s ON s.id = c.series_id
+        """)
+        # Plain INSERT/DELETE against the view keep working for ad-hoc SQL and scripts
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS ohlcv_view_insert INSTEAD OF INSERT ON ohlcv
+            BEGIN
+                INSERT INTO ohlcv_series (symbol, timeframe, timeframe_ms)
+                VALUES (NEW.symbol, NEW.timeframe, COALESCE(NEW.close_time - NEW.timestamp + 1, 60000))
+                ON CONFLICT(symbol, timeframe) DO NOTHING;
+                INSERT INTO ohlcv_candles (series_id, timestamp, open, high, low, close, volume)
+                VALUES (
+                    (SELECT id FROM ohlcv_series WHERE symbol = NEW.symbol AND timeframe = NEW.timeframe),
+                    NEW.timestamp, NEW.open, NEW.high, NEW.low, NEW.close, NEW.volume
+                )
+                ON CONFLICT(series_id, timestamp) DO UPDATE SET
+                    open=excluded.open, high=excluded.high, low=excluded.low,
+                    close=excluded.close, volume=excluded.volume;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS ohlcv_view_delete INSTEAD OF DELETE ON ohlcv
+            BEGIN
+                DELETE FROM ohlcv_candles
+                WHERE series_id = (SELECT id FROM ohlcv_series WHERE symbol = OLD.symbol AND timeframe = OLD.timeframe)
+                  AND timestamp = OLD.timestamp;
+            END
+        """)
+
+    def _series_id(self, symbol: str, timeframe: str) -> int:
+        """Return (creating if needed) the compact-layout series id for symbol/timeframe"""
+        key = (symbol, timeframe)
+        series_id = self._series_ids.get(key)
+        if series_id is None:
+            self.conn.execute("""
+                INSERT INTO ohlcv_series (symbol, timeframe, timeframe_ms) VALUES (?, ?, ?)
+                ON CONFLICT(symbol, timeframe) DO NOTHING
+            """, (symbol, timeframe, self._timeframe_to_ms(timeframe)))
+            row = self.conn.execute(
+                "SELECT id FROM ohlcv_series WHERE symbol = ? AND timeframe = ?", (symbol, timeframe)
+            ).fetchone()
+            series_id = int(row["id"])
+            self._series_ids[key] = series_id
+        return series_id
     
-    def insert_ohlcv(self, symbol: str, timeframe: str, ohlcv_data: List[List]):
+    # Triggers that mirror writes on the legacy table while migrate_ohlcv_to_compact copies it.
+    # Explicit upserts: an outer statement's conflict policy would override INSERT OR REPLACE.
+    _MIGRATION_TRIGGERS = {
+        "ohlcv_migrate_insert": """
+            CREATE TRIGGER IF NOT EXISTS ohlcv_migrate_insert AFTER INSERT ON ohlcv
+            BEGIN
+                INSERT INTO ohlcv_series (symbol, timeframe, timeframe_ms)
+                VALUES (NEW.symbol, NEW.timeframe, COALESCE(NEW.close_time - NEW.timestamp + 1, 60000))
+                ON CONFLICT(symbol, timeframe) DO NOTHING;
+                INSERT INTO ohlcv_candles (series_id, timestamp, open, high, low, close, volume)
+                VALUES (
+                    (SELECT id FROM ohlcv_series WHERE symbol = NEW.symbol AND timeframe = NEW.timeframe),
+                    NEW.timestamp, NEW.open, NEW.high, NEW.low, NEW.close, NEW.volume
+                )
+                ON CONFLICT(series_id, timestamp) DO UPDATE SET
+                    open=excluded.open, high=excluded.high, low=excluded.low,
+                    close=excluded.close, volume=excluded.volume;
+            END
+        """,
+        "ohlcv_migrate_update": """
+            CREATE TRIGGER IF NOT EXISTS ohlcv_migrate_update AFTER UPDATE ON ohlcv
+            BEGIN
+                INSERT INTO ohlcv_candles (series_id, timestamp, open, high, low, close, volume)
+                VALUES (
+                    (SELECT id FROM ohlcv_series WHERE symbol = NEW.symbol AND timeframe = NEW.timeframe),
+                    NEW.timestamp, NEW.open, NEW.high, NEW.low, NEW.close, NEW.volume
+                )
+                ON CONFLICT(series_id, timestamp) DO UPDATE SET
+                    open=excluded.open, high=excluded.high, low=excluded.low,
+                    close=excluded.close, volume=excluded.volume;
+            END
+        """,
+        "ohlcv_migrate_delete": """
+            CREATE TRIGGER IF NOT EXISTS ohlcv_migrate_delete AFTER DELETE ON ohlcv
+            BEGIN
+                DELETE FROM ohlcv_candles
+                WHERE series_id = (SELECT id FROM ohlcv_series WHERE symbol = OLD.symbol AND timeframe = OLD.timeframe)
+                  AND timestamp = OLD.timestamp;
+            END
+        """,
+    }
+
+    def migrate_ohlcv_to_compact(self, batch_size: int = 50000, pause_s: float = 0.0) -> int:
         """
-        Insert OHLCV data into database
+        Convert the legacy ohlcv table to the compact layout without stopping writers
         
-        Args:
-            symbol: Trading pair (e.g., 'BTC/USDT')
-            timeframe: Timeframe (e.g., '1m')
-            ohlcv_data: List of [timestamp, open, high, low, close, volume]
+        1. Create the compact tables and install triggers that mirror every write
+           on the legacy table into them.
+        2. Copy each series in keyset batches of `batch_size`, one short transaction
+           per batch (progress is checkpointed, so an interrupted run resumes).
+        3. In one transaction, verify row counts, rename the legacy table to
+           ohlcv_legacy and create the `ohlcv` view in its place.
+        
+        Running writers detect the swap on their next write and switch layout.
+        The legacy table is kept; drop it with drop_legacy_ohlcv() once satisfied.
+        
+        Returns:
+            Number of rows copied by the batched phase
         """
         self.connect()
+        if self._detect_layout() == "compact":
+            logger.info("[MIGRATE] ohlcv already uses the compact layout")
+            return 0
         cursor = self.conn.cursor()
         
-        inserted = 0
-        updated = 0
-        timeframe_ms = self._timeframe_to_ms(timeframe)
+        self._create_compact_tables(cursor)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ohlcv_migration (
+                series_id INTEGER PRIMARY KEY,
+                copied_upto INTEGER NOT NULL
+            )
+        """)
+        series = [(r["symbol"], r["timeframe"]) for r in
+                  cursor.execute("SELECT DISTINCT symbol, timeframe FROM ohlcv").fetchall()]
+        for symbol, timeframe in series:
+            self._series_id(symbol, timeframe)
+        for ddl in self._MIGRATION_TRIGGERS.values():
+            cursor.execute(ddl)
+        self.conn.commit()
+        logger.info(f"[MIGRATE] mirroring triggers installed series={len(series)}")
         
-        for candle in ohlcv_data:
-            timestamp, open_price, high, low, close_price, volume = candle
-            close_time = timestamp + timeframe_ms - 1
-            
-            try:
-                # Detect existing row to log insert vs update
-                cursor.execute("""
-                    SELECT 1 FROM ohlcv WHERE symbol = ? AND timeframe = ? AND timestamp = ?
-                """, (symbol, timeframe, timestamp))
-                exists = cursor.fetchone() is not None
-
-                cursor.execute("""
-                    INSERT INTO ohlcv (symbol, timeframe, timestamp, open, high, low, close, volume, close_time)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(symbol, timeframe, timestamp) DO UPDATE SET
+        copied = 0
+        for symbol, timeframe in series:
+            series_id = self._series_id(symbol, timeframe)
+            row = cursor.execute(
+                "SELECT copied_upto FROM ohlcv_migration WHERE series_id = ?", (series_id,)
+            ).fetchone()
+            lo = int(row["copied_upto"]) if row else -1
+            series_copied = 0
+            while True:
+                # Upper bound of this batch (None = remainder of the series)
+                hi_row = cursor.execute("""
+                    SELECT timestamp FROM ohlcv
+                    WHERE symbol = ? AND timeframe = ? AND timestamp > ?
+                    ORDER BY timestamp LIMIT 1 OFFSET ?
+                """, (symbol, timeframe, lo, batch_size - 1)).fetchone()
+                hi = int(hi_row["timestamp"]) if hi_row else None
+                cursor.execute(f"""
+                    INSERT INTO ohlcv_candles (series_id, timestamp, open, high, low, close, volume)
+                    SELECT ?, timestamp, open, high, low, close, volume FROM ohlcv
+                    WHERE symbol = ? AND timeframe = ? AND timestamp > ?{" AND timestamp <= ?" if hi is not None else ""}
+                    ON CONFLICT(series_id, timestamp) DO UPDATE SET
                         open=excluded.open,
                         high=excluded.high,
                         low=excluded.low,
                         close=excluded.close,
-                        volume=excluded.volume,
-                        close_time=excluded.close_time
-                """, (symbol, timeframe, timestamp, open_price, high, low, close_price, volume, close_time))
-                
-                if exists:
-                    updated += 1
-                else:
-                    inserted += 1
-            except Exception as e:
-                logger.error(f"Error inserting OHLCV data: {e}")
+                        volume=excluded.volume
+                """, (series_id, symbol, timeframe, lo) + ((hi,) if hi is not None else ()))
+                series_copied += cursor.rowcount
+                if hi is None:
+                    break
+                lo = hi
+                cursor.execute("""
+                    INSERT INTO ohlcv_migration (series_id, copied_upto) VALUES (?, ?)
+                    ON CONFLICT(series_id) DO UPDATE SET copied_upto = excluded.copied_upto
+                """, (series_id, lo))
+                self.conn.commit()
+                if pause_s > 0:
+                    time.sleep(pause_s)
+            self.conn.commit()
+            copied += series_copied
+            logger.info(f"[MIGRATE] symbol={symbol} timeframe={timeframe} copied={series_copied}")
         
+        # Swap: everything written since step 1 was mirrored, so the copy is complete
         self.conn.commit()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            legacy_count = cursor.execute("SELECT COUNT(*) AS n FROM ohlcv").fetchone()["n"]
+            compact_count = cursor.execute("SELECT COUNT(*) AS n FROM ohlcv_candles").fetchone()["n"]
+            if legacy_count != compact_count:
+                raise RuntimeError(f"row count mismatch legacy={legacy_count} compact={compact_count}")
+            for name in self._MIGRATION_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute("ALTER TABLE ohlcv RENAME TO ohlcv_legacy")
+            self._create_compact_ohlcv(cursor)
+            cursor.execute("DROP TABLE IF EXISTS ohlcv_migration")
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self._detect_layout()
+        logger.info(f"[MIGRATE] swapped to compact layout rows={compact_count}")
+        return copied
+
+    def drop_legacy_ohlcv(self, vacuum: bool = False):
+        """Drop the ohlcv_legacy table left by the migration; VACUUM to return the space to the OS"""
+        self.connect()
+        self.conn.execute("DROP TABLE IF EXISTS ohlcv_legacy")
+        self.conn.commit()
+        if vacuum:
+            self.conn.execute("VACUUM")
+        logger.info(f"[MIGRATE] dropped ohlcv_legacy vacuum={vacuum}")
+
+    def insert_ohlcv(self, symbol: str, timeframe: str, ohlcv_data: List[List], commit: bool = True):
+        """
+        Insert OHLCV data into database
+        
+        The whole batch is staged with one executemany and merged with a single
+        set-based upsert inside one transaction. Rows whose OHLCV values are
+        unchanged are left untouched so re-fetched candles cause no page writes.
+        
+        Args:
+            symbol: Trading pair (e.g., 'BTC/USDT')
+            timeframe: Timeframe (e.g., '1m')
+            ohlcv_data: List of [timestamp, open, high, low, close, volume]
+            commit: If False, leave the transaction open so the caller can group several writes
+        
+        Returns:
+            (inserted, updated) where updated counts only rows whose values changed
+        """
+        self.connect()
+        if not ohlcv_data:
+            return 0, 0
+        
+        timeframe_ms = self._timeframe_to_ms(timeframe)
+        staged = []
+        for candle in ohlcv_data:
+            timestamp, open_price, high, low, close_price, volume = candle[:6]
+            timestamp = int(timestamp)
+            staged.append((timestamp, open_price, high, low, close_price, volume, timestamp + timeframe_ms - 1))
+        
+        try:
+            if not self.conn.in_transaction:
+                # Take the write lock up front: the counting SELECT below would otherwise open a
+                # read snapshot that cannot be upgraded once another connection commits
+                # (SQLITE_BUSY_SNAPSHOT, which busy_timeout does not retry)
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._reset_ohlcv_stage()
+            # Later duplicates of the same timestamp win, matching the old row-by-row upsert
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO temp.ohlcv_stage (timestamp, open, high, low, close, volume, close_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, staged)
+            inserted, updated = self._merge_ohlcv_stage(symbol, timeframe)
+            if commit:
+                self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error inserting OHLCV data: {e}")
+            raise
+        
         logger.debug(f"Inserted {inserted} OHLCV records, updated {updated} existing for {symbol}")
         return inserted, updated
+
+    def _reset_ohlcv_stage(self):
+        """Create (once per connection) and empty the temp staging table used for bulk upserts"""
+        self.conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS ohlcv_stage (
+                timestamp INTEGER PRIMARY KEY,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                close_time INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("DELETE FROM temp.ohlcv_stage")
+
+    def _merge_ohlcv_stage(self, symbol: str, timeframe: str) -> tuple[int, int]:
+        """
+        Merge temp.ohlcv_stage into ohlcv for one symbol/timeframe (caller commits).
+        
+        Returns:
+            (inserted, updated) counted with a set-based diff against existing rows
+        """
+        try:
+            return self._merge_ohlcv_stage_into(symbol, timeframe)
+        except sqlite3.OperationalError as e:
+            # The layout may have been swapped by an online migration since we connected;
+            # lock errors are not layout errors and go straight to the caller
+            if "locked" in str(e) or "busy" in str(e):
+                raise
+            previous = self.layout
+            if self._detect_layout() == previous:
+                raise
+            logger.info(f"OHLCV layout changed {previous} -> {self.layout}; retrying merge")
+            return self._merge_ohlcv_stage_into(symbol, timeframe)
+
+    def _merge_ohlcv_stage_into(self, symbol: str, timeframe: str) -> tuple[int, int]:
+        cursor = self.conn.cursor()
+        if self.layout == "compact":
+            series_id = self._series_id(symbol, timeframe)
+            target = "ohlcv_candles"
+            key_sql = "o.series_id = ?"
+            key_params: tuple = (series_id,)
+            value_cols = ("open", "high", "low", "close", "volume")
+        else:
+            target = "ohlcv"
+            key_sql = "o.symbol = ? AND o.timeframe = ?"
+            key_params = (symbol, timeframe)
+            value_cols = ("open", "high", "low", "close", "volume", "close_time")
+        
+        changed = " OR ".join(f"o.{c} IS NOT s.{c}" for c in value_cols)
+        cursor.execute(f"""
+            SELECT
+                SUM(o.timestamp IS NULL) AS inserted,
+                SUM(o.timestamp IS NOT NULL AND ({changed})) AS updated
+            FROM temp.ohlcv_stage s
+            LEFT JOIN {target} o
+              ON {key_sql} AND o.timestamp = s.timestamp
+        """, key_params)
+        row = cursor.fetchone()
+        inserted = int(row['inserted'] or 0)
+        updated = int(row['updated'] or 0)
+        if inserted == 0 and updated == 0:
+            return 0, 0
+        
+        key_cols = "series_id" if self.layout == "compact" else "symbol, timeframe"
+        placeholders = ", ".join("?" for _ in key_params)
+        cols = ", ".join(value_cols)
+        set_clause = ",\n                ".join(f"{c}=excluded.{c}" for c in value_cols)
+        differs = "\n               OR ".join(f"{target}.{c} IS NOT excluded.{c}" for c in value_cols)
+        # WHERE true disambiguates INSERT ... SELECT from the upsert clause
+        cursor.execute(f"""
+            INSERT INTO {target} ({key_cols}, timestamp, {cols})
+            SELECT {placeholders}, timestamp, {cols}
+            FROM temp.ohlcv_stage WHERE true
+            ON CONFLICT({key_cols}, timestamp) DO UPDATE SET
+                {set_clause}
+            WHERE {differs}
+        """, key_params)
+        return inserted, updated
     
     def insert_ticker(self, symbol: str, ticker_data: Dict):
         """
@@ -241,32 +701,135 @@ class Database:
         self.connect()
         cursor = self.conn.cursor()
         
-        timestamp = ticker_data.get('timestamp') or int(datetime.now().timestamp() * 1000)
-        
         try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO tickers 
-                (symbol, timestamp, bid, ask, last, high, low, open, close, volume, quote_volume)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                symbol,
-                timestamp,
-                ticker_data.get('bid'),
-                ticker_data.get('ask'),
-                ticker_data.get('last'),
-                ticker_data.get('high'),
-                ticker_data.get('low'),
-                ticker_data.get('open'),
-                ticker_data.get('close'),
-                ticker_data.get('baseVolume'),
-                ticker_data.get('quoteVolume')
-            ))
-            
+            cursor.execute(self._TICKER_INSERT_SQL, self._ticker_params(symbol, ticker_data))
             self.conn.commit()
             logger.debug(f"Inserted ticker data for {symbol}")
         except Exception as e:
             logger.error(f"Error inserting ticker data: {e}")
             raise
+
+    def insert_tickers(self, tickers: Iterable[tuple], commit: bool = True) -> int:
+        """
+        Insert many tickers with one executemany and a single commit
+        
+        Args:
+            tickers: Iterable of (symbol, ticker_data) pairs
+            commit: If False, leave the transaction open so the caller can group several writes
+        
+        Returns:
+            Number of rows written
+        """
+        self.connect()
+        params = [self._ticker_params(symbol, ticker_data) for symbol, ticker_data in tickers]
+        if not params:
+            return 0
+        try:
+            self.conn.executemany(self._TICKER_INSERT_SQL, params)
+            if commit:
+                self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error inserting ticker batch: {e}")
+            raise
+        logger.debug(f"Inserted {len(params)} tickers")
+        return len(params)
+
+    def get_ticker_symbols(self) -> List[str]:
+        """Symbols with raw rows in the tickers table"""
+        self.connect()
+        return [r["symbol"] for r in self.conn.execute("SELECT DISTINCT symbol FROM tickers").fetchall()]
+
+    def get_tickers_range(self, symbol: str, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                          limit: Optional[int] = None) -> List[tuple]:
+        """Raw (timestamp, bid, ask, last) tuples for a symbol, ascending"""
+        self.connect()
+        query = "SELECT timestamp, bid, ask, last FROM tickers WHERE symbol = ?"
+        params: List[Any] = [symbol]
+        if start_time is not None:
+            query += " AND timestamp >= ?"
+            params.append(start_time)
+        if end_time is not None:
+            query += " AND timestamp <= ?"
+            params.append(end_time)
+        query += " ORDER BY timestamp ASC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [tuple(r) for r in self.conn.execute(query, params).fetchall()]
+
+    def replace_tickers_with_summaries(self, symbol: str, interval_ms: int, summaries: List[tuple],
+                                       start_time: int, end_time: int) -> int:
+        """
+        In one short transaction, upsert ticker summaries and delete the raw
+        tickers of `symbol` in [start_time, end_time] that they replace.
+        Summaries for an existing bucket are merged (counts added, first/last/min/max combined).
+        Returns the number of raw rows deleted.
+        """
+        self.connect()
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany(self._TICKER_SUMMARY_UPSERT_SQL, [(symbol, interval_ms) + s for s in summaries])
+            cursor.execute(
+                "DELETE FROM tickers WHERE symbol = ? AND timestamp >= ? AND timestamp <= ?",
+                (symbol, start_time, end_time),
+            )
+            deleted = cursor.rowcount
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Error compacting tickers for {symbol}: {e}")
+            raise
+        return deleted
+
+    _TICKER_SUMMARY_UPSERT_SQL = """
+        INSERT INTO ticker_summaries (
+            symbol, interval_ms, bucket_start, samples, first_ts, last_ts,
+            bid_first, bid_last, bid_min, bid_max,
+            ask_first, ask_last, ask_min, ask_max,
+            last_first, last_last, last_min, last_max
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol, interval_ms, bucket_start) DO UPDATE SET
+            samples = samples + excluded.samples,
+            first_ts = MIN(first_ts, excluded.first_ts),
+            last_ts = MAX(last_ts, excluded.last_ts),
+            bid_first = CASE WHEN excluded.first_ts < first_ts THEN excluded.bid_first ELSE bid_first END,
+            bid_last = CASE WHEN excluded.last_ts > last_ts THEN excluded.bid_last ELSE bid_last END,
+            bid_min = MIN(COALESCE(bid_min, excluded.bid_min), COALESCE(excluded.bid_min, bid_min)),
+            bid_max = MAX(COALESCE(bid_max, excluded.bid_max), COALESCE(excluded.bid_max, bid_max)),
+            ask_first = CASE WHEN excluded.first_ts < first_ts THEN excluded.ask_first ELSE ask_first END,
+            ask_last = CASE WHEN excluded.last_ts > last_ts THEN excluded.ask_last ELSE ask_last END,
+            ask_min = MIN(COALESCE(ask_min, excluded.ask_min), COALESCE(excluded.ask_min, ask_min)),
+            ask_max = MAX(COALESCE(ask_max, excluded.ask_max), COALESCE(excluded.ask_max, ask_max)),
+            last_first = CASE WHEN excluded.first_ts < first_ts THEN excluded.last_first ELSE last_first END,
+            last_last = CASE WHEN excluded.last_ts > last_ts THEN excluded.last_last ELSE last_last END,
+            last_min = MIN(COALESCE(last_min, excluded.last_min), COALESCE(excluded.last_min, last_min)),
+            last_max = MAX(COALESCE(last_max, excluded.last_max), COALESCE(excluded.last_max, last_max))
+    """
+
+    _TICKER_INSERT_SQL = """
+        INSERT OR REPLACE INTO tickers 
+        (symbol, timestamp, bid, ask, last, high, low, open, close, volume, quote_volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def _ticker_params(symbol: str, ticker_data: Dict) -> tuple:
+        """Map a ccxt ticker dict onto the tickers table columns"""
+        timestamp = ticker_data.get('timestamp') or int(datetime.now().timestamp() * 1000)
+        return (
+            symbol,
+            timestamp,
+            ticker_data.get('bid'),
+            ticker_data.get('ask'),
+            ticker_data.get('last'),
+            ticker_data.get('high'),
+            ticker_data.get('low'),
+            ticker_data.get('open'),
+            ticker_data.get('close'),
+            ticker_data.get('baseVolume'),
+            ticker_data.get('quoteVolume')
+        )
     
     def get_latest_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
         """
@@ -282,15 +845,239 @@ class Database:
         self.connect()
         cursor = self.conn.cursor()
         
+        # ORDER BY ... LIMIT 1 (rather than MAX) stays an index seek through the compact-layout view
         cursor.execute("""
-            SELECT MAX(timestamp) as max_ts FROM ohlcv
+            SELECT timestamp as max_ts FROM ohlcv
             WHERE symbol = ? AND timeframe = ?
+            ORDER BY timestamp DESC
+            LIMIT 1
         """, (symbol, timeframe))
         
         result = cursor.fetchone()
         return result['max_ts'] if result and result['max_ts'] else None
 
-    def _timeframe_to_ms(self, timeframe: str) -> int:
+    def get_latest_timestamps(self, series: List[tuple]) -> Dict[tuple, Optional[int]]:
+        """
+        Latest timestamp of many (symbol, timeframe) series in one statement
+
+        Each series is still an index seek (correlated ORDER BY ... LIMIT 1),
+        not a GROUP BY scan over the whole table.
+        """
+        self.connect()
+        latest: Dict[tuple, Optional[int]] = {}
+        chunk = 400  # 2 bound parameters per series
+        for i in range(0, len(series), chunk):
+            part = series[i:i + chunk]
+            values = ", ".join("(?, ?)" for _ in part)
+            rows = self.conn.execute(f"""
+                WITH wanted(symbol, timeframe) AS (VALUES {values})
+                SELECT w.symbol, w.timeframe, (
+                    SELECT timestamp FROM ohlcv o
+                    WHERE o.symbol = w.symbol AND o.timeframe = w.timeframe
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                ) AS latest_ts
+                FROM wanted w
+            """, [v for pair in part for v in pair]).fetchall()
+            for r in rows:
+                latest[(r[0], r[1])] = int(r[2]) if r[2] is not None else None
+        return latest
+
+    def get_oldest_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Oldest timestamp stored in SQLite (archived candles excluded) for a symbol/timeframe"""
+        self.connect()
+        row = self.conn.execute("""
+            SELECT timestamp FROM ohlcv
+            WHERE symbol = ? AND timeframe = ?
+            ORDER BY timestamp ASC
+            LIMIT 1
+        """, (symbol, timeframe)).fetchone()
+        return int(row["timestamp"]) if row else None
+
+    def find_ohlcv_gaps(self, symbol: str, timeframe: str, start_time: Optional[int] = None,
+                        end_time: Optional[int] = None) -> List[tuple]:
+        """
+        Missing candle ranges of a series stored in SQLite (archived candles excluded)
+
+        One pass with LAG() over the (symbol, timeframe, timestamp) index.
+        Returns [(first_missing_open, last_missing_open), ...] ascending, in ms.
+        """
+        self.connect()
+        timeframe_ms = self._timeframe_to_ms(timeframe)
+        where = "symbol = ? AND timeframe = ?"
+        params: List[Any] = [symbol, timeframe]
+        if start_time is not None:
+            where += " AND timestamp >= ?"
+            params.append(start_time)
+        if end_time is not None:
+            where += " AND timestamp <= ?"
+            params.append(end_time)
+        rows = self.conn.execute(f"""
+            SELECT prev_ts, timestamp FROM (
+                SELECT timestamp, LAG(timestamp) OVER (ORDER BY timestamp) AS prev_ts
+                FROM ohlcv WHERE {where}
+            )
+            WHERE timestamp - prev_ts > ?
+        """, params + [timeframe_ms]).fetchall()
+        return [(r[0] + timeframe_ms, r[1] - timeframe_ms) for r in rows]
+
+    def list_ohlcv_series(self) -> List[tuple]:
+        """All (symbol, timeframe) pairs with candles in SQLite"""
+        self.connect()
+        if self.layout == "compact":
+            query = "SELECT symbol, timeframe FROM ohlcv_series ORDER BY symbol, timeframe"
+        else:
+            query = "SELECT DISTINCT symbol, timeframe FROM ohlcv ORDER BY symbol, timeframe"
+        return [(r["symbol"], r["timeframe"]) for r in self.conn.execute(query).fetchall()]
+
+    def delete_ohlcv_range(self, symbol: str, timeframe: str, start_time: int, end_time: int,
+                           batch_size: int = 5000) -> int:
+        """
+        Delete candles in [start_time, end_time] in batches of `batch_size` rows,
+        committing after each so concurrent writers are never blocked for long.
+        Returns the number of rows deleted.
+        """
+        self.connect()
+        cursor = self.conn.cursor()
+        deleted = 0
+        lo = start_time
+        while True:
+            row = cursor.execute("""
+                SELECT timestamp FROM ohlcv
+                WHERE symbol = ? AND timeframe = ? AND timestamp >= ? AND timestamp <= ?
+                ORDER BY timestamp LIMIT 1 OFFSET ?
+            """, (symbol, timeframe, lo, end_time, batch_size - 1)).fetchone()
+            hi = int(row["timestamp"]) if row else end_time
+            if self.layout == "compact":
+                cursor.execute(
+                    "DELETE FROM ohlcv_candles WHERE series_id = ? AND timestamp >= ? AND timestamp <= ?",
+                    (self._series_id(symbol, timeframe), lo, hi),
+                )
+            else:
+                cursor.execute(
+                    "DELETE FROM ohlcv WHERE symbol = ? AND timeframe = ? AND timestamp >= ? AND timestamp <= ?",
+                    (symbol, timeframe, lo, hi),
+                )
+            deleted += cursor.rowcount
+            self.conn.commit()
+            if row is None:
+                return deleted
+            lo = hi + 1
+
+    def get_archive_segments(self, symbol: str, timeframe: str, start_time: Optional[int] = None,
+                             end_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Archive segments of a series overlapping [start_time, end_time], oldest first"""
+        self.connect()
+        query = "SELECT * FROM archive_segments WHERE symbol = ? AND timeframe = ?"
+        params: List[Any] = [symbol, timeframe]
+        if start_time:
+            query += " AND last_ts >= ?"
+            params.append(start_time)
+        if end_time:
+            query += " AND first_ts <= ?"
+            params.append(end_time)
+        query += " ORDER BY period_start ASC"
+        return [dict(r) for r in self.conn.execute(query, params).fetchall()]
+
+    def upsert_archive_segment(self, *, symbol: str, timeframe: str, period_start: int, period_end: int,
+                               path: str, first_ts: int, last_ts: int, rows: int, size_bytes: int,
+                               codec: str) -> None:
+        """Record (or replace) the index row of an archive segment"""
+        self.connect()
+        self.conn.execute(
+            """
+            INSERT OR REPLACE INTO archive_segments (
+                symbol, timeframe, period_start, period_end, path,
+                first_ts, last_ts, rows, size_bytes, codec
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (symbol, timeframe, period_start, period_end, path, first_ts, last_ts, rows, size_bytes, codec),
+        )
+        self.conn.commit()
+
+    def get_completed_backfill_shards(self, symbol: str, timeframe: str) -> set:
+        """(shard_start, shard_end) of every backfill shard already completed for a series"""
+        self.connect()
+        rows = self.conn.execute(
+            "SELECT shard_start, shard_end FROM backfill_shards WHERE symbol = ? AND timeframe = ?",
+            (symbol, timeframe),
+        ).fetchall()
+        return {(r[0], r[1]) for r in rows}
+
+    def get_backfill_run_start(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Planned start of the unfinished backfill run of a series, or None if there is none"""
+        self.connect()
+        row = self.conn.execute(
+            "SELECT start_ts FROM backfill_runs WHERE symbol = ? AND timeframe = ?", (symbol, timeframe)
+        ).fetchone()
+        return row[0] if row else None
+
+    def begin_backfill_run(self, symbol: str, timeframe: str, start_ts: int) -> None:
+        """Persist a run's planned start before any shard is written (an earlier pending start is kept)"""
+        self.connect()
+        self.conn.execute(
+            """
+            INSERT INTO backfill_runs (symbol, timeframe, start_ts) VALUES (?, ?, ?)
+            ON CONFLICT(symbol, timeframe) DO UPDATE SET start_ts = MIN(start_ts, excluded.start_ts)
+            """,
+            (symbol, timeframe, start_ts),
+        )
+        self.conn.commit()
+
+    def finish_backfill_run(self, symbol: str, timeframe: str) -> None:
+        """Forget a series' run once every one of its shards was stored"""
+        self.connect()
+        self.conn.execute("DELETE FROM backfill_runs WHERE symbol = ? AND timeframe = ?", (symbol, timeframe))
+        self.conn.commit()
+
+    def store_backfill_shard(self, symbol: str, timeframe: str, shard_start: int, shard_end: int,
+                             candles: List[List], complete: bool) -> tuple:
+        """
+        Upsert a shard's candles and, if `complete`, checkpoint it in the same transaction
+
+        Returns:
+            (inserted, updated)
+        """
+        self.connect()
+        try:
+            inserted, updated = self.insert_ohlcv(symbol, timeframe, candles, commit=False)
+            if complete:
+                self.conn.execute(
+                    """
+                    INSERT OR REPLACE INTO backfill_shards (symbol, timeframe, shard_start, shard_end, fetched)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (symbol, timeframe, shard_start, shard_end, len(candles)),
+                )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return inserted, updated
+
+    def _archive_span(self, symbol: str, timeframe: str) -> Optional[tuple]:
+        """(first_ts, last_ts) covered by archive segments of a series, or None if nothing is archived"""
+        row = self.conn.execute(
+            "SELECT MIN(first_ts) AS lo, MAX(last_ts) AS hi FROM archive_segments WHERE symbol = ? AND timeframe = ?",
+            (symbol, timeframe),
+        ).fetchone()
+        return (row["lo"], row["hi"]) if row and row["lo"] is not None else None
+
+    def _archive_needed(self, symbol: str, timeframe: str, start_time: Optional[int], end_time: Optional[int],
+                        limit: Optional[int], latest: bool, hot_count: int, hot_oldest: Optional[int]) -> bool:
+        """Whether a read must also consult the archive, given what SQLite returned"""
+        span = self._archive_span(symbol, timeframe)
+        if span is None:
+            return False
+        if (start_time and start_time > span[1]) or (end_time and end_time < span[0]):
+            return False
+        # Newest `limit` rows all came from SQLite and are newer than anything archived
+        if latest and limit and hot_count >= limit and hot_oldest > span[1]:
+            return False
+        return True
+
+    @staticmethod
+    def _timeframe_to_ms(timeframe: str) -> int:
         """Convert timeframe string to milliseconds"""
         unit = timeframe[-1]
         value = int(timeframe[:-1])
@@ -305,7 +1092,8 @@ class Database:
         return value * multipliers.get(unit, 60 * 1000)
     
     def get_ohlcv(self, symbol: str, timeframe: str, start_time: Optional[int] = None, 
-                  end_time: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+                  end_time: Optional[int] = None, limit: Optional[int] = None,
+                  include_archive: bool = True) -> List[Dict]:
         """
         Retrieve OHLCV data from database
         
@@ -315,6 +1103,7 @@ class Database:
             start_time: Start timestamp (milliseconds)
             end_time: End timestamp (milliseconds)
             limit: Maximum number of records
+            include_archive: Also read cold-archive segments when the range reaches into them
         
         Returns:
             List of OHLCV records as dictionaries
@@ -340,22 +1129,242 @@ class Database:
             params.append(limit)
         
         cursor.execute(query, params)
-        rows = cursor.fetchall()
+        rows = [dict(row) for row in cursor.fetchall()]
+        
+        if include_archive and self._archive_needed(
+            symbol, timeframe, start_time, end_time, limit, False,
+            len(rows), rows[0]["timestamp"] if rows else None,
+        ):
+            from .archive import read_archived
+            archived = read_archived(self, symbol, timeframe, start_time, end_time, limit)
+            hot_ts = {r["timestamp"] for r in rows}
+            tf_ms = self._timeframe_to_ms(timeframe)
+            rows.extend(
+                {"symbol": symbol, "timeframe": timeframe, "timestamp": int(a["timestamp"]),
+                 "open": float(a["open"]), "high": float(a["high"]), "low": float(a["low"]),
+                 "close": float(a["close"]), "volume": float(a["volume"]),
+                 "close_time": int(a["timestamp"]) + tf_ms - 1}
+                for a in archived if int(a["timestamp"]) not in hot_ts
+            )
+            rows.sort(key=lambda r: r["timestamp"])
+            if limit:
+                rows = rows[:limit]
+        return rows
+
+    def get_ohlcv_arrays(self, symbol: str, timeframe: str, start_time: Optional[int] = None,
+                         end_time: Optional[int] = None, limit: Optional[int] = None,
+                         latest: bool = False, include_archive: bool = True) -> np.ndarray:
+        """
+        Retrieve OHLCV data as a contiguous NumPy structured array (see OHLCV_DTYPE)
+        
+        Rows are streamed from the cursor as plain tuples straight into the array,
+        so no per-row dict is created. Columns are accessed as arr['close'] etc.
+        
+        Args:
+            symbol: Trading pair
+            timeframe: Timeframe
+            start_time: Start timestamp (milliseconds)
+            end_time: End timestamp (milliseconds)
+            limit: Maximum number of records
+            latest: If True, `limit` keeps the most recent rows instead of the oldest
+            include_archive: Also read cold-archive segments when the range reaches into them
+        
+        Returns:
+            Structured array ordered ascending by timestamp
+        """
+        self.connect()
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        
+        query = ("SELECT timestamp, open, high, low, close, volume FROM ohlcv "
+                 "WHERE symbol = ? AND timeframe = ?")
+        params: List[Any] = [symbol, timeframe]
+        
+        if start_time:
+            query += " AND timestamp >= ?"
+            params.append(start_time)
+        
+        if end_time:
+            query += " AND timestamp <= ?"
+            params.append(end_time)
+        
+        query += " ORDER BY timestamp DESC" if latest else " ORDER BY timestamp ASC"
         
-        return [dict(row) for row in rows]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        arr = np.fromiter(cursor.execute(query, params), dtype=OHLCV_DTYPE)
+        if latest:
+            arr = np.ascontiguousarray(arr[::-1])
+        
+        if include_archive and self._archive_needed(
+            symbol, timeframe, start_time, end_time, limit, latest,
+            len(arr), int(arr["timestamp"][0]) if len(arr) else None,
+        ):
+            from .archive import read_archived
+            archived = read_archived(self, symbol, timeframe, start_time, end_time, limit, latest)
+            if len(archived):
+                archived = archived[~np.isin(archived["timestamp"], arr["timestamp"])]
+                arr = np.concatenate([archived, arr])
+                arr = arr[np.argsort(arr["timestamp"], kind="stable")]
+                if limit:
+                    arr = arr[-limit:] if latest else arr[:limit]
+                arr = np.ascontiguousarray(arr)
+        return arr
 
-    def resample_ohlcv(self, symbol: str, from_tf: str, to_tf: str, limit_1m: int = 5000) -> tuple[int, int]:
+    def iter_ohlcv(self, symbol: str, timeframe: str, start_time: Optional[int] = None,
+                   end_time: Optional[int] = None, page_size: int = 5000) -> Iterator[Dict]:
+        """
+        Stream OHLCV rows (as dicts, ascending) in keyset-paginated pages
+        
+        Each page is a separate short query starting after the last timestamp
+        seen, so memory stays bounded by `page_size` and no read transaction is
+        held open across the whole history.
+        """
+        cursor_ts = start_time
+        while True:
+            rows = self.get_ohlcv(symbol, timeframe, start_time=cursor_ts, end_time=end_time, limit=page_size)
+            yield from rows
+            if len(rows) < page_size:
+                return
+            cursor_ts = int(rows[-1]["timestamp"]) + 1
+
+    def iter_ohlcv_arrays(self, symbol: str, timeframe: str, start_time: Optional[int] = None,
+                          end_time: Optional[int] = None, page_size: int = 50000) -> Iterator[np.ndarray]:
+        """Stream OHLCV as structured-array pages (see get_ohlcv_arrays), keyset-paginated"""
+        cursor_ts = start_time
+        while True:
+            page = self.get_ohlcv_arrays(symbol, timeframe, start_time=cursor_ts, end_time=end_time, limit=page_size)
+            if len(page):
+                yield page
+            if len(page) < page_size:
+                return
+            cursor_ts = int(page["timestamp"][-1]) + 1
+
+    def resample_ohlcv(self, symbol: str, from_tf: str, to_tf: str, limit_1m: int = 5000,
+                       engine: Optional[str] = None) -> tuple[int, int]:
         """
         Build higher timeframe candles from 1m data and insert into ohlcv.
         E.g. from_tf='1m', to_tf='7m' groups every 7 one-minute candles into one 7m candle.
+        
+        Incremental: a per-(symbol, from_tf, to_tf) watermark records the newest
+        source candle already aggregated, so each call only re-reads the bucket
+        holding the watermark (it may still have been open) plus newer candles.
+        
+        engine: 'python' aggregates pages of `limit_1m` rows in Python; 'sql' runs a
+        single INSERT ... SELECT ... GROUP BY inside SQLite. Defaults to RESAMPLE_ENGINE.
         Returns (inserted, updated) like insert_ohlcv.
         """
         self.connect()
+        engine = (engine or RESAMPLE_ENGINE).lower()
+        bucket_ms = self._timeframe_to_ms(to_tf)
+        watermark = self.get_resample_watermark(symbol, from_tf, to_tf)
+        if watermark is None:
+            # First run: resume from the newest bucket built by earlier versions, if any
+            watermark = self.get_latest_timestamp(symbol, to_tf)
+        start = (watermark // bucket_ms) * bucket_ms if watermark is not None else None
+        
+        if engine == "sql":
+            inserted, updated, newest = self._resample_sql(symbol, from_tf, to_tf, bucket_ms, start)
+        elif engine == "python":
+            inserted, updated, newest = self._resample_python(symbol, from_tf, to_tf, bucket_ms, start, limit_1m)
+        else:
+            raise ValueError(f"Unknown resample engine: {engine}")
+        
+        if newest is not None:
+            self.set_resample_watermark(symbol, from_tf, to_tf, newest)
+        return inserted, updated
+
+    def resample_ohlcv_range(self, symbol: str, from_tf: str, to_tf: str, start_time: int,
+                             end_time: int) -> tuple[int, int]:
+        """
+        Rebuild the to_tf buckets overlapping [start_time, end_time] from from_tf candles
+
+        For candles written behind the resample watermark (e.g. a repaired gap);
+        the watermark itself is left alone. Returns (inserted, updated).
+        """
         bucket_ms = self._timeframe_to_ms(to_tf)
-        rows = self.get_ohlcv(symbol, from_tf, limit=limit_1m)
+        first = (start_time // bucket_ms) * bucket_ms
+        last = (end_time // bucket_ms) * bucket_ms + bucket_ms - 1
+        rows = self.get_ohlcv(symbol, from_tf, start_time=first, end_time=last)
         if not rows:
             return 0, 0
-        # Group by bucket start timestamp
+        return self.insert_ohlcv(symbol, to_tf, self._aggregate_buckets(rows, bucket_ms))
+
+    def _resample_python(self, symbol: str, from_tf: str, to_tf: str, bucket_ms: int,
+                         start: Optional[int], limit_1m: int) -> tuple[int, int, Optional[int]]:
+        """Aggregate source rows in Python, one page of `limit_1m` rows at a time"""
+        total_inserted = 0
+        total_updated = 0
+        newest = None
+        while True:
+            rows = self.get_ohlcv(symbol, from_tf, start_time=start, limit=limit_1m)
+            if not rows:
+                break
+            aggregated = self._aggregate_buckets(rows, bucket_ms)
+            full_page = len(rows) >= limit_1m
+            if full_page and len(aggregated) > 1:
+                # The last bucket may continue on the next page; rebuild it there
+                aggregated.pop()
+            inserted, updated = self.insert_ohlcv(symbol, to_tf, aggregated)
+            total_inserted += inserted
+            total_updated += updated
+            newest = int(rows[-1]["timestamp"])
+            if not full_page:
+                break
+            next_start = aggregated[-1][0] + bucket_ms
+            start = next_start if start is None or next_start > start else newest + 1
+        return total_inserted, total_updated, newest
+
+    def _resample_sql(self, symbol: str, from_tf: str, to_tf: str, bucket_ms: int,
+                      start: Optional[int]) -> tuple[int, int, Optional[int]]:
+        """Aggregate source rows inside SQLite with one INSERT ... SELECT ... GROUP BY"""
+        start = start or 0
+        cursor = self.conn.cursor()
+        try:
+            if not self.conn.in_transaction:
+                # Write lock first, as in insert_ohlcv: the staging SELECT would otherwise take a
+                # read snapshot that the merge cannot upgrade once another connection commits
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._reset_ohlcv_stage()
+            # Group on the bucket; first open / last close come from the rows at MIN/MAX(timestamp)
+            cursor.execute("""
+                INSERT INTO temp.ohlcv_stage (timestamp, open, high, low, close, volume, close_time)
+                SELECT g.bucket, f.open, g.high, g.low, l.close, g.volume, g.bucket + :bucket_ms - 1
+                FROM (
+                    SELECT (timestamp / :bucket_ms) * :bucket_ms AS bucket,
+                           MIN(timestamp) AS first_ts,
+                           MAX(timestamp) AS last_ts,
+                           MAX(high) AS high,
+                           MIN(low) AS low,
+                           SUM(volume) AS volume
+                    FROM ohlcv
+                    WHERE symbol = :symbol AND timeframe = :from_tf AND timestamp >= :start
+                    GROUP BY timestamp / :bucket_ms
+                ) g
+                JOIN ohlcv f ON f.symbol = :symbol AND f.timeframe = :from_tf AND f.timestamp = g.first_ts
+                JOIN ohlcv l ON l.symbol = :symbol AND l.timeframe = :from_tf AND l.timestamp = g.last_ts
+            """, {"bucket_ms": int(bucket_ms), "symbol": symbol, "from_tf": from_tf, "start": int(start)})
+            if cursor.rowcount == 0:
+                self.conn.rollback()
+                return 0, 0, None
+            cursor.execute("""
+                SELECT MAX(timestamp) AS max_ts FROM ohlcv
+                WHERE symbol = ? AND timeframe = ? AND timestamp >= ?
+            """, (symbol, from_tf, int(start)))
+            newest = cursor.fetchone()['max_ts']
+            inserted, updated = self._merge_ohlcv_stage(symbol, to_tf)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        logger.debug(f"SQL resample {symbol} {from_tf}->{to_tf}: inserted={inserted} updated={updated}")
+        return inserted, updated, int(newest) if newest is not None else None
+
+    @staticmethod
+    def _aggregate_buckets(rows: List[Dict], bucket_ms: int) -> List[List]:
+        """Group chronological OHLCV rows into [bucket_ts, open, high, low, close, volume] candles"""
         buckets: Dict[int, List[Dict]] = {}
         for r in rows:
             ts = int(r["timestamp"])
@@ -371,7 +1380,74 @@ class Database:
             close = float(group[-1]["close"])
             volume = sum(float(r["volume"]) for r in group)
             aggregated.append([key, open_, high, low, close, volume])
-        return self.insert_ohlcv(symbol, to_tf, aggregated)
+        return aggregated
+
+    def get_resample_watermark(self, symbol: str, from_tf: str, to_tf: str) -> Optional[int]:
+        """Return the newest source timestamp already aggregated into to_tf, or None"""
+        self.connect()
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT watermark FROM resample_watermarks
+            WHERE symbol = ? AND from_tf = ? AND to_tf = ?
+        """, (symbol, from_tf, to_tf))
+        row = cursor.fetchone()
+        return int(row['watermark']) if row else None
+
+    def set_resample_watermark(self, symbol: str, from_tf: str, to_tf: str, watermark: int, commit: bool = True):
+        """Persist the resample watermark for symbol/from_tf/to_tf"""
+        self.connect()
+        self.conn.execute("""
+            INSERT INTO resample_watermarks (symbol, from_tf, to_tf, watermark, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(symbol, from_tf, to_tf) DO UPDATE SET
+                watermark = excluded.watermark,
+                updated_at = CURRENT_TIMESTAMP
+        """, (symbol, from_tf, to_tf, int(watermark)))
+        if commit:
+            self.conn.commit()
+
+    def insert_candle_events(self, events: Iterable[tuple], commit: bool = True) -> int:
+        """
+        Append (symbol, timeframe, candle_ts) close events and trim the log to CANDLE_EVENTS_KEEP rows
+        
+        Args:
+            events: (symbol, timeframe, candle_ts) tuples
+            commit: If False, leave the transaction open (events commit together with their candles)
+        """
+        self.connect()
+        now_ms = int(datetime.now().timestamp() * 1000)
+        params = [(symbol, timeframe, int(candle_ts), now_ms) for symbol, timeframe, candle_ts in events]
+        if not params:
+            return 0
+        cursor = self.conn.executemany(
+            "INSERT INTO candle_events (symbol, timeframe, candle_ts, created_at) VALUES (?, ?, ?, ?)", params
+        )
+        # Ids only grow (the newest row is never deleted), so trimming is a rowid range delete
+        self.conn.execute(
+            "DELETE FROM candle_events WHERE id <= (SELECT MAX(id) FROM candle_events) - ?", (CANDLE_EVENTS_KEEP,)
+        )
+        if commit:
+            self.conn.commit()
+        return cursor.rowcount
+
+    def get_candle_events(self, after_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Close events with id > after_id, oldest first"""
+        self.connect()
+        rows = self.conn.execute(
+            "SELECT id, symbol, timeframe, candle_ts, created_at FROM candle_events WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_last_candle_event_id(self) -> int:
+        self.connect()
+        row = self.conn.execute("SELECT MAX(id) FROM candle_events").fetchone()
+        return int(row[0]) if row[0] is not None else 0
+
+    def data_version(self) -> int:
+        """PRAGMA data_version: changes whenever another connection commits to the DB file"""
+        self.connect()
+        return int(self.conn.execute("PRAGMA data_version").fetchone()[0])
 
     # -----------------------------
     # Stage B: Trading helpers
@@ -411,6 +1487,85 @@ class Database:
         # Reverse into chronological order
         return [dict(r) for r in reversed(rows)]
 
+    def get_recent_ohlcv_many(self, symbols: List[str], timeframe: str, limit: int) -> Dict[str, np.ndarray]:
+        """
+        The latest `limit` candles of many symbols in one statement
+
+        Each symbol's window starts at its limit-th newest timestamp, found by a correlated
+        index seek (ORDER BY ... LIMIT 1 OFFSET), so only the windows are read rather than
+        whole per-symbol partitions.
+
+        Returns:
+            {symbol: OHLCV_DTYPE array, ascending}; symbols without candles are absent
+        """
+        out: Dict[str, np.ndarray] = {}
+        chunk = 400  # 2 bound parameters per symbol
+        for i in range(0, len(symbols), chunk):
+            part = symbols[i:i + chunk]
+            values = ", ".join("(?, ?)" for _ in part)
+            out.update(self._fetch_ohlcv_many(part, f"""
+                WITH wanted(idx, symbol) AS (VALUES {values}),
+                bounds AS (
+                    SELECT w.idx, w.symbol, (
+                        SELECT timestamp FROM ohlcv o
+                        WHERE o.symbol = w.symbol AND o.timeframe = ?
+                        ORDER BY timestamp DESC
+                        LIMIT 1 OFFSET ?
+                    ) AS start_ts
+                    FROM wanted w
+                )
+                SELECT b.idx, o.timestamp, o.open, o.high, o.low, o.close, o.volume
+                FROM bounds b
+                JOIN ohlcv o ON o.symbol = b.symbol AND o.timeframe = ? AND o.timestamp >= IFNULL(b.start_ts, 0)
+            """, [v for pair in enumerate(part) for v in pair] + [timeframe, max(0, limit - 1), timeframe]))
+        return out
+
+    def get_ohlcv_since_many(self, since: Dict[str, int], timeframe: str, max_rows: int) -> Dict[str, np.ndarray]:
+        """
+        Candles at or after a per-symbol timestamp, for many symbols in one statement
+
+        At most `max_rows` per symbol (oldest first, ROW_NUMBER over the bounded range), so a
+        symbol far behind cannot blow up the read; the caller sees the cap was hit.
+
+        Returns:
+            {symbol: OHLCV_DTYPE array, ascending}; symbols without such candles are absent
+        """
+        out: Dict[str, np.ndarray] = {}
+        items = list(since.items())
+        chunk = 300  # 3 bound parameters per symbol
+        for i in range(0, len(items), chunk):
+            part = items[i:i + chunk]
+            values = ", ".join("(?, ?, ?)" for _ in part)
+            out.update(self._fetch_ohlcv_many([symbol for symbol, _ in part], f"""
+                WITH wanted(idx, symbol, since) AS (VALUES {values})
+                SELECT idx, timestamp, open, high, low, close, volume FROM (
+                    SELECT w.idx, o.timestamp, o.open, o.high, o.low, o.close, o.volume,
+                           ROW_NUMBER() OVER (PARTITION BY w.idx ORDER BY o.timestamp) AS rn
+                    FROM wanted w
+                    JOIN ohlcv o ON o.symbol = w.symbol AND o.timeframe = ? AND o.timestamp >= w.since
+                )
+                WHERE rn <= ?
+            """, [v for j, (symbol, ts) in enumerate(part) for v in (j, symbol, int(ts))] + [timeframe, max_rows]))
+        return out
+
+    _OHLCV_MANY_DTYPE = np.dtype([('idx', np.int64)] + OHLCV_DTYPE.descr)
+
+    def _fetch_ohlcv_many(self, symbols: List[str], query: str, params: List[Any]) -> Dict[str, np.ndarray]:
+        """Run a query yielding (idx, timestamp, open, high, low, close, volume) and split it per symbol"""
+        self.connect()
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        arr = np.fromiter(cursor.execute(query, params), dtype=self._OHLCV_MANY_DTYPE)
+        # Sorting here is cheaper than an ORDER BY temp b-tree in SQLite
+        arr = arr[np.lexsort((arr["timestamp"], arr["idx"]))]
+        bounds = np.flatnonzero(np.diff(arr["idx"])) + 1
+        out: Dict[str, np.ndarray] = {}
+        for group in np.split(arr, bounds) if len(arr) else []:
+            out[symbols[int(group["idx"][0])]] = np.ascontiguousarray(
+                group[list(OHLCV_DTYPE.names)]
+            ).astype(OHLCV_DTYPE)
+        return out
+
     def get_recent_ohlcv(self, symbol: str, timeframe: str, limit: int) -> List[Dict[str, Any]]:
         """Return most recent `limit` OHLCV rows (full columns) ordered ascending by timestamp."""
         self.connect()
@@ -566,6 +1721,24 @@ class Database:
         row = cursor.fetchone()
         return float(row["total"]) if row else 0.0
 
+    def iter_fills(self, mode: Optional[str] = None, chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Stream fills ordered by ts (optionally for one mode) in fetchmany chunks"""
+        self.connect()
+        cursor = self.conn.cursor()
+        query = "SELECT id, order_id, mode, exchange, symbol, side, price, amount, cost, fee, fee_currency, ts FROM fills"
+        params: List[Any] = []
+        if mode is not None:
+            query += " WHERE mode = ?"
+            params.append(mode)
+        query += " ORDER BY ts ASC, id ASC"
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+
     def get_trade_round_trips(
         self, mode: str, limit: int = 100
     ) -> List[Dict[str, Any]]:
@@ -573,25 +1746,12 @@ class Database:
         Compute round-trip trades from fills (FIFO matching buys to sells).
         Returns list of dicts: {symbol, ts, side, price, amount, cost, fee, pnl, is_win}.
         Each sell fill produces one trade with realized pnl.
+        All fills are streamed; only the last `limit` trades are kept in memory.
         """
-        self.connect()
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            SELECT id, symbol, side, price, amount, cost, fee, ts
-            FROM fills
-            WHERE mode = ?
-            ORDER BY ts ASC
-            LIMIT ?
-            """,
-            (mode, min(limit * 50, 5000)),
-        )
-        fills = [dict(row) for row in cursor.fetchall()]
-
-        trades: List[Dict[str, Any]] = []
+        trades: deque = deque(maxlen=limit)
         position: Dict[str, tuple] = {}  # symbol -> (qty, cost_basis)
 
-        for f in fills:
+        for f in self.iter_fills(mode):
             symbol = f["symbol"]
             side = f["side"]
             price = float(f["price"])
@@ -631,7 +1791,7 @@ class Database:
                     }
                 )
 
-        return trades[-limit:] if len(trades) > limit else trades
+        return list(trades)
 
     def get_position(self, *, mode: str, exchange: str, symbol: str) -> Optional[Dict[str, Any]]:
         """Fetch current position row (if any)."""
@@ -648,6 +1808,21 @@ class Database:
         row = cursor.fetchone()
         return dict(row) if row else None
 
+    def get_positions(self, *, mode: str, exchange: str, symbols: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Position rows of many symbols (all if symbols is None) in one query, keyed by symbol"""
+        self.connect()
+        query = (
+            "SELECT mode, exchange, symbol, base_qty, avg_entry_price, realized_pnl, updated_at "
+            "FROM positions WHERE mode = ? AND exchange = ?"
+        )
+        params: List[Any] = [mode, exchange]
+        if symbols is not None:
+            if not symbols:
+                return {}
+            query += f" AND symbol IN ({', '.join('?' for _ in symbols)})"
+            params.extend(symbols)
+        return {r["symbol"]: dict(r) for r in self.conn.execute(query, params).fetchall()}
+
     def upsert_position(
         self,
         *,
@@ -675,3 +1850,77 @@ class Database:
         )
         self.conn.commit()
 
+
+class ReaderPool:
+    """
+    Bounded pool of read-only Database handles reused across requests
+    
+    A handle is checked out by one thread at a time and returned afterwards,
+    so connection setup (open + PRAGMAs) is paid once per pooled connection
+    rather than once per request. Idle handles are reused LIFO so the warmest
+    page cache serves the next request; at most `max_size` are kept idle.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, max_size: int = DB_READER_POOL_SIZE):
+        self.db_path = db_path or DB_PATH
+        self.max_size = max(1, max_size)
+        self._idle: List[Database] = []
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[Database]:
+        """Check out a connected read-only Database for the duration of the block"""
+        db = self._acquire()
+        try:
+            yield db
+        finally:
+            self._release(db)
+
+    def _acquire(self) -> Database:
+        with self._lock:
+            self.in_use += 1
+            if self._idle:
+                self.hits += 1
+                return self._idle.pop()
+            self.misses += 1
+        try:
+            db = Database(self.db_path, read_only=True)
+            db.connect()
+        except Exception:
+            with self._lock:
+                self.in_use -= 1
+            raise
+        return db
+
+    def _release(self, db: Database) -> None:
+        with self._lock:
+            self.in_use -= 1
+            if len(self._idle) < self.max_size:
+                self._idle.append(db)
+                return
+            self.discarded += 1
+        db.close()
+
+    def close_all(self) -> None:
+        """Close every idle connection (checked-out handles close when returned to a full pool)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for db in idle:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self.in_use,
+                "hits": self.hits,
+                "misses": self.misses,
+                "discarded": self.discarded,
+                "hit_rate": round(self.hits / requests, 4) if requests else None,
+            }
@@ -1,12 +1,22 @@
 """
 Exchange interface using ccxt library
 """
+import json
+import os
+import threading
 import time
 import ccxt
 import logging
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterable
 from ccxt.base.errors import NetworkError, DDoSProtection, RateLimitExceeded, ExchangeError
-from .config import EXCHANGE_NAME, EXCHANGE_API_KEY, EXCHANGE_SECRET, EXCHANGE_SANDBOX, PUBLIC_ONLY
+from .config import (
+    EXCHANGE_NAME, EXCHANGE_API_KEY, EXCHANGE_SECRET, EXCHANGE_SANDBOX, PUBLIC_ONLY,
+    MARKETS_CACHE_PATH, MARKETS_CACHE_TTL, EXCHANGE_OFFLINE,
+    OHLCV_PAGE_LIMIT, RATE_LIMIT_SHARED, RATE_LIMIT_DB, RATE_LIMIT_WEIGHT_PER_MIN, RATE_LIMIT_BURST, RATE_LIMIT_LOW_PRIORITY_RESERVE,
+    SYMBOLS, REPLAY_MARKETS, REPLAY_SEED, REPLAY_FIXTURES_DIR, REPLAY_LATENCY_MS, REPLAY_LATENCY_JITTER_MS,
+    REPLAY_ERROR_RATE, REPLAY_WEIGHT_PER_MIN, REPLAY_BALANCE_QUOTE,
+)
+from .ratelimit import WEIGHTED_EXCHANGES, SharedRateLimiter, request_weight
 
 logger = logging.getLogger(__name__)
 
@@ -14,15 +24,19 @@ logger = logging.getLogger(__name__)
 class Exchange:
     """Wrapper for ccxt exchange interface"""
     
-    def __init__(self):
-        """Initialize exchange connection"""
-        exchange_class = getattr(ccxt, EXCHANGE_NAME)
-        
+    def __init__(self, low_priority: bool = False):
+        """
+        Initialize exchange connection
+
+        Args:
+            low_priority: Yield to other processes on the shared rate limit (backfills)
+        """
         config = {
             # API keys are ignored when PUBLIC_ONLY is true (Stage A safety)
             'apiKey': EXCHANGE_API_KEY if EXCHANGE_API_KEY and not PUBLIC_ONLY else None,
             'secret': EXCHANGE_SECRET if EXCHANGE_SECRET and not PUBLIC_ONLY else None,
-            'enableRateLimit': True,
+            # The shared limiter replaces ccxt's per-instance throttle where it knows the endpoint weights
+            'enableRateLimit': not (RATE_LIMIT_SHARED and EXCHANGE_NAME in WEIGHTED_EXCHANGES),
             'options': {
                 'defaultType': 'spot',  # spot, future, delivery
             }
@@ -32,7 +46,29 @@ class Exchange:
         if EXCHANGE_SANDBOX:
             config['sandbox'] = True
         
-        self.exchange = exchange_class(config)
+        if EXCHANGE_NAME == "replay":
+            # Offline stand-in with its markets already loaded (bot/replay.py)
+            from .replay import ReplayExchange
+            self.exchange = ReplayExchange(
+                SYMBOLS, synthetic_markets=REPLAY_MARKETS, seed=REPLAY_SEED, fixtures_dir=REPLAY_FIXTURES_DIR,
+                latency_ms=REPLAY_LATENCY_MS, latency_jitter_ms=REPLAY_LATENCY_JITTER_MS,
+                error_rate=REPLAY_ERROR_RATE, weight_per_min=REPLAY_WEIGHT_PER_MIN,
+                balances={"USDT": REPLAY_BALANCE_QUOTE},
+            )
+        else:
+            self.exchange = getattr(ccxt, EXCHANGE_NAME)(config)
+        # Request pacing shared by all threads (ccxt's own throttle is not thread-safe)
+        self._pace_lock = threading.Lock()
+        self._next_request_at = 0.0
+        # Request weight budget shared by every process on this host
+        self.low_priority = low_priority
+        self.rate_limiter = (
+            SharedRateLimiter(
+                RATE_LIMIT_DB, EXCHANGE_NAME, weight_per_min=RATE_LIMIT_WEIGHT_PER_MIN,
+                burst=RATE_LIMIT_BURST, low_priority_reserve=RATE_LIMIT_LOW_PRIORITY_RESERVE,
+            )
+            if RATE_LIMIT_SHARED else None
+        )
         if EXCHANGE_SANDBOX:
             try:
                 self.exchange.set_sandbox_mode(True)
@@ -43,17 +79,42 @@ class Exchange:
             logger.warning("PUBLIC_ONLY=true: ignoring provided API keys; using public endpoints only")
         logger.info(f"Initialized {EXCHANGE_NAME} exchange (public-only={PUBLIC_ONLY}, sandbox={EXCHANGE_SANDBOX})")
 
-    def _request_with_backoff(self, func, *args, **kwargs):
+    def _pace(self):
+        """Reserve the next request slot so concurrent callers stay within the exchange rate limit."""
+        interval = (getattr(self.exchange, "rateLimit", 0) or 0) / 1000.0
+        with self._pace_lock:
+            now = time.monotonic()
+            start = max(now, self._next_request_at)
+            self._next_request_at = start + interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _throttle(self, weight: int):
+        """Wait for `weight` tokens from the shared limiter (or in-process pacing if it is disabled)"""
+        if self.rate_limiter is None:
+            self._pace()
+            return
+        waited = self.rate_limiter.acquire(weight, low_priority=self.low_priority)
+        if waited >= 1.0:
+            logger.info(
+                f"[RATELIMIT] waited_s={waited:.1f} weight={weight} low_priority={self.low_priority}"
+            )
+
+    def _request_with_backoff(self, func, *args, weight: int = 1, **kwargs):
         """Execute exchange call with simple exponential backoff for rate limits/network errors."""
         backoff = 1
         attempts = 0
         last_err = None
         while attempts < 5:
             try:
+                self._throttle(weight)
                 return func(*args, **kwargs)
             except (RateLimitExceeded, DDoSProtection) as e:
                 last_err = e
                 logger.warning(f"Rate limit hit; retrying in {backoff}s (attempt {attempts + 1}/5)")
+                if self.rate_limiter is not None:
+                    # Make every process on the host back off, not just this one
+                    self.rate_limiter.penalize(backoff)
             except NetworkError as e:
                 last_err = e
                 logger.warning(f"Network error; retrying in {backoff}s (attempt {attempts + 1}/5)")
@@ -81,7 +142,10 @@ class Exchange:
             List of [timestamp, open, high, low, close, volume]
         """
         try:
-            ohlcv = self._request_with_backoff(self.exchange.fetch_ohlcv, symbol, timeframe, limit=limit, since=since)
+            ohlcv = self._request_with_backoff(
+                self.exchange.fetch_ohlcv, symbol, timeframe, limit=limit, since=since,
+                weight=request_weight("fetch_ohlcv"),
+            )
             logger.debug(f"Fetched {len(ohlcv)} candles for {symbol} {timeframe} (since={since})")
             return ohlcv
         except Exception as e:
@@ -99,22 +163,127 @@ class Exchange:
             Ticker data dictionary
         """
         try:
-            ticker = self._request_with_backoff(self.exchange.fetch_ticker, symbol)
+            ticker = self._request_with_backoff(
+                self.exchange.fetch_ticker, symbol, weight=request_weight("fetch_ticker")
+            )
             logger.debug(f"Fetched ticker for {symbol}")
             return ticker
         except Exception as e:
             logger.error(f"Error fetching ticker for {symbol}: {e}")
             raise
     
-    def get_markets(self) -> Dict:
-        """Get available markets"""
+    @property
+    def ohlcv_page_limit(self) -> int:
+        """Most candles one fetch_ohlcv request may return (OHLCV_PAGE_LIMIT, else what ccxt advertises)"""
+        if OHLCV_PAGE_LIMIT > 0:
+            return OHLCV_PAGE_LIMIT
+        features = getattr(self.exchange, "features", None) or {}
+        for market_type in ("spot", "default"):
+            limit = ((features.get(market_type) or {}).get("fetchOHLCV") or {}).get("limit")
+            if limit:
+                return int(limit)
+        return 500
+
+    @property
+    def supports_fetch_tickers(self) -> bool:
+        """Whether the exchange returns many tickers in one fetch_tickers request"""
+        has = getattr(self.exchange, "has", None) or {}
+        return bool(has.get("fetchTickers"))
+
+    def fetch_tickers(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch tickers for many symbols in a single request
+        
+        Args:
+            symbols: Trading pairs (e.g., ['BTC/USDT', 'ETH/USDT'])
+        
+        Returns:
+            Dict of symbol -> ticker data (symbols the exchange did not return are absent)
+        """
         try:
-            markets = self.exchange.load_markets()
-            return markets
+            tickers = self._request_with_backoff(
+                self.exchange.fetch_tickers, symbols, weight=request_weight("fetch_tickers", len(symbols))
+            )
+            logger.debug(f"Fetched {len(tickers)} tickers in one request")
+            return tickers
         except Exception as e:
-            logger.error(f"Error loading markets: {e}")
+            logger.error(f"Error fetching tickers for {len(symbols)} symbols: {e}")
             raise
     
+    def get_markets(self) -> Dict:
+        """
+        Get available markets
+        
+        Served from memory once loaded, then from the on-disk cache while it is
+        younger than MARKETS_CACHE_TTL (any age when EXCHANGE_OFFLINE), and only
+        otherwise downloaded with load_markets() and written back to the cache.
+        """
+        if self.exchange.markets:
+            return self.exchange.markets
+        start = time.perf_counter()
+        cached = self._read_markets_cache()
+        fresh = cached is not None and (
+            EXCHANGE_OFFLINE or time.time() - cached["saved_at"] < MARKETS_CACHE_TTL
+        )
+        if fresh:
+            markets = self.exchange.set_markets(cached["markets"], cached.get("currencies"))
+            source = "cache"
+        elif EXCHANGE_OFFLINE:
+            raise RuntimeError(f"EXCHANGE_OFFLINE=true but no markets cache at {MARKETS_CACHE_PATH}")
+        else:
+            try:
+                self._throttle(request_weight("load_markets"))
+                markets = self.exchange.load_markets()
+                source = "network"
+            except Exception as e:
+                if cached is None:
+                    logger.error(f"Error loading markets: {e}")
+                    raise
+                # A stale cache beats failing to start
+                logger.warning(f"Error loading markets ({e}); using stale cache from {MARKETS_CACHE_PATH}")
+                markets = self.exchange.set_markets(cached["markets"], cached.get("currencies"))
+                source = "stale_cache"
+            else:
+                self._write_markets_cache()
+        logger.info(
+            f"[EXCHANGE] markets source={source} count={len(markets)} "
+            f"elapsed_ms={(time.perf_counter() - start) * 1000:.0f}"
+        )
+        return markets
+
+    def _read_markets_cache(self) -> Optional[Dict[str, Any]]:
+        """Load the markets cache for this exchange, or None if missing/unreadable/for another exchange"""
+        try:
+            with open(MARKETS_CACHE_PATH, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable markets cache {MARKETS_CACHE_PATH}: {e}")
+            return None
+        key = (cached.get("exchange"), cached.get("sandbox"))
+        if key != (EXCHANGE_NAME, EXCHANGE_SANDBOX) or not cached.get("markets"):
+            return None
+        return cached
+
+    def _write_markets_cache(self):
+        """Persist the loaded markets atomically (tmp + rename); failures are only logged"""
+        payload = {
+            "exchange": EXCHANGE_NAME,
+            "sandbox": EXCHANGE_SANDBOX,
+            "saved_at": time.time(),
+            "markets": self.exchange.markets,
+            "currencies": self.exchange.currencies,
+        }
+        tmp = MARKETS_CACHE_PATH.with_suffix(MARKETS_CACHE_PATH.suffix + ".tmp")
+        try:
+            MARKETS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(tmp, MARKETS_CACHE_PATH)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write markets cache {MARKETS_CACHE_PATH}: {e}")
+    
     def validate_symbol(self, symbol: str) -> bool:
         """Check if symbol is available on exchange"""
         try:
@@ -124,6 +293,16 @@ class Exchange:
             logger.error(f"Error validating symbol {symbol}: {e}")
             return False
 
+    def validate_symbols(self, symbols: Iterable[str]) -> Dict[str, bool]:
+        """Check many symbols against one markets load; returns {symbol: available} in input order"""
+        symbols = [s.strip() for s in symbols if s and s.strip()]
+        try:
+            markets = self.get_markets()
+        except Exception as e:
+            logger.error(f"Error validating symbols: {e}")
+            return {s: False for s in symbols}
+        return {s: s in markets for s in symbols}
+
     # -----------------------------
     # Stage B: Authenticated helpers
     # -----------------------------
@@ -137,7 +316,7 @@ class Exchange:
         """Fetch account balances (requires PUBLIC_ONLY=false)."""
         if PUBLIC_ONLY:
             raise RuntimeError("PUBLIC_ONLY=true: authenticated endpoints are disabled")
-        return self._request_with_backoff(self.exchange.fetch_balance)
+        return self._request_with_backoff(self.exchange.fetch_balance, weight=request_weight("fetch_balance"))
 
     def get_free_balance(self, asset: str) -> float:
         """Return free balance for an asset (requires PUBLIC_ONLY=false)."""
@@ -170,7 +349,10 @@ class Exchange:
         if order_type == "market":
             price = None
         try:
-            return self._request_with_backoff(self.exchange.create_order, symbol, order_type, side, amount, price, params)
+            return self._request_with_backoff(
+                self.exchange.create_order, symbol, order_type, side, amount, price, params,
+                weight=request_weight("create_order"),
+            )
         except ExchangeError:
             raise
         except Exception as e:
@@ -3,14 +3,19 @@ Feature engineering for ML trading strategy.
 
 Builds OHLCV-derived features from a rolling window of candles.
 Each row = one candle timestamp with features computed from past lookback candles.
+Live inference only needs the newest row: build_latest_features computes just
+that one, with the same per-row code as build_features.
 """
 
 from __future__ import annotations
 
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Union
 
 import numpy as np
 
+# Either chronological OHLCV dicts or a structured array from Database.get_ohlcv_arrays
+OhlcvInput = Union[List[Dict[str, Any]], np.ndarray]
+
 
 FEATURE_NAMES = [
     "return_1",
@@ -25,8 +30,33 @@ FEATURE_NAMES = [
 ]
 
 
+def ohlcv_columns(ohlcv_rows: OhlcvInput) -> Tuple[np.ndarray, ...]:
+    """
+    Return (opens, highs, lows, closes, volumes, timestamps) float64/int64 arrays.
+
+    Structured arrays are used as-is (field views, no copy); dict rows are converted.
+    """
+    if isinstance(ohlcv_rows, np.ndarray) and ohlcv_rows.dtype.names:
+        return (
+            ohlcv_rows["open"].astype(np.float64, copy=False),
+            ohlcv_rows["high"].astype(np.float64, copy=False),
+            ohlcv_rows["low"].astype(np.float64, copy=False),
+            ohlcv_rows["close"].astype(np.float64, copy=False),
+            ohlcv_rows["volume"].astype(np.float64, copy=False),
+            ohlcv_rows["timestamp"].astype(np.int64, copy=False),
+        )
+    return (
+        np.array([float(r["open"]) for r in ohlcv_rows]),
+        np.array([float(r["high"]) for r in ohlcv_rows]),
+        np.array([float(r["low"]) for r in ohlcv_rows]),
+        np.array([float(r["close"]) for r in ohlcv_rows]),
+        np.array([float(r["volume"]) for r in ohlcv_rows]),
+        np.array([int(r["timestamp"]) for r in ohlcv_rows], dtype=np.int64),
+    )
+
+
 def build_features(
-    ohlcv_rows: List[Dict[str, Any]],
+    ohlcv_rows: OhlcvInput,
     lookback: int = 60,
     sma_fast_window: int = 10,
     sma_slow_window: int = 30,
@@ -36,7 +66,8 @@ def build_features(
 
     Args:
         ohlcv_rows: List of OHLCV dicts (chronological order), each with
-            open, high, low, close, volume, timestamp.
+            open, high, low, close, volume, timestamp, or the equivalent
+            structured array from Database.get_ohlcv_arrays.
         lookback: Minimum candles needed before first valid row.
         sma_fast_window: Fast SMA window.
         sma_slow_window: Slow SMA window.
@@ -48,63 +79,122 @@ def build_features(
     if len(ohlcv_rows) < lookback:
         return np.array([]).reshape(0, len(FEATURE_NAMES)), []
 
-    closes = np.array([float(r["close"]) for r in ohlcv_rows])
-    opens = np.array([float(r["open"]) for r in ohlcv_rows])
-    highs = np.array([float(r["high"]) for r in ohlcv_rows])
-    lows = np.array([float(r["low"]) for r in ohlcv_rows])
-    volumes = np.array([float(r["volume"]) for r in ohlcv_rows])
-    timestamps = [int(r["timestamp"]) for r in ohlcv_rows]
+    opens, highs, lows, closes, volumes, ts_arr = ohlcv_columns(ohlcv_rows)
+    timestamps = ts_arr.tolist()
 
     # Returns: (close[i] - close[i-k]) / close[i-k] for k in 1, 3, 5
-    returns = np.zeros_like(closes)
-    returns[1:] = (closes[1:] - closes[:-1]) / np.where(closes[:-1] != 0, closes[:-1], 1e-10)
+    returns = _returns(closes)
 
     n = len(closes)
-    rows = []
-
-    for i in range(lookback, n):
-        window_closes = closes[i - lookback : i]
-        window_returns = returns[i - lookback : i]
-        window_volumes = volumes[i - lookback : i]
-
-        # return_1, return_3, return_5: % change over last 1, 3, 5 candles
-        c = closes[i]
-        c_1 = closes[i - 1] if i >= 1 else c
-        c_3 = closes[i - 3] if i >= 3 else c
-        c_5 = closes[i - 5] if i >= 5 else c
-
-        return_1 = (c - c_1) / c_1 if c_1 != 0 else 0.0
-        return_3 = (c - c_3) / c_3 if c_3 != 0 else 0.0
-        return_5 = (c - c_5) / c_5 if c_5 != 0 else 0.0
-
-        # SMA fast, slow
-        sma_fast = np.mean(window_closes[-sma_fast_window:]) if len(window_closes) >= sma_fast_window else np.mean(window_closes)
-        sma_slow = np.mean(window_closes[-sma_slow_window:]) if len(window_closes) >= sma_slow_window else np.mean(window_closes)
-        sma_cross = 1.0 if sma_fast > sma_slow else 0.0
-
-        # Volatility: std dev of returns over lookback
-        volatility = float(np.std(window_returns)) if len(window_returns) > 0 else 0.0
-
-        # Volume ratio: current volume / mean volume over lookback
-        mean_vol = np.mean(window_volumes)
-        volume_ratio = volumes[i] / mean_vol if mean_vol > 0 else 1.0
-
-        # High-low range: (high - low) / close for current candle
-        high_low_range = (highs[i] - lows[i]) / c if c > 0 else 0.0
-
-        rows.append([
-            return_1,
-            return_3,
-            return_5,
-            sma_fast,
-            sma_slow,
-            sma_cross,
-            volatility,
-            volume_ratio,
-            high_low_range,
-        ])
+    rows = [
+        _feature_row(closes, highs, lows, volumes, returns[i - lookback : i], i, lookback, sma_fast_window, sma_slow_window)
+        for i in range(lookback, n)
+    ]
 
     X = np.array(rows, dtype=np.float64)
     out_timestamps = timestamps[lookback:]
 
     return X, out_timestamps
+
+
+def live_rows(lookback: int) -> int:
+    """
+    Candles to load for live inference.
+
+    The newest candle's volatility window holds the lookback returns before it, and the
+    oldest of those needs one more close; return_5 needs the close 5 candles back. With
+    fewer rows these fall back to the leading zero / current close, which the training
+    rows (full history) never see.
+    """
+    return max(lookback + 2, 6)
+
+
+def build_latest_features(
+    ohlcv_rows: OhlcvInput,
+    lookback: int = 60,
+    sma_fast_window: int = 10,
+    sma_slow_window: int = 30,
+) -> np.ndarray:
+    """
+    Feature row of the newest candle only.
+
+    Bit-identical to build_features(ohlcv_rows, ...)[0][-1]: same per-row code, and the
+    returns are computed element-wise over just the window that row reads. Costs
+    O(lookback) whatever the length of ohlcv_rows. Pass live_rows(lookback) candles (or
+    more) to get the row training produced for that candle.
+
+    Returns:
+        1D array of len(FEATURE_NAMES).
+    """
+    n = len(ohlcv_rows)
+    if n < lookback + 1:
+        raise ValueError(f"need at least {lookback + 1} OHLCV rows, got {n}")
+    opens, highs, lows, closes, volumes, _ = ohlcv_columns(ohlcv_rows)
+    i = n - 1
+    lo = i - lookback
+    if lo == 0:
+        window_returns = _returns(closes[:i])
+    else:
+        window_returns = _returns(closes[lo - 1 : i])[1:]
+    row = _feature_row(closes, highs, lows, volumes, window_returns, i, lookback, sma_fast_window, sma_slow_window)
+    return np.array(row, dtype=np.float64)
+
+
+def _returns(closes: np.ndarray) -> np.ndarray:
+    """One-candle returns; the first element is 0"""
+    returns = np.zeros_like(closes)
+    returns[1:] = (closes[1:] - closes[:-1]) / np.where(closes[:-1] != 0, closes[:-1], 1e-10)
+    return returns
+
+
+def _feature_row(
+    closes: np.ndarray,
+    highs: np.ndarray,
+    lows: np.ndarray,
+    volumes: np.ndarray,
+    window_returns: np.ndarray,
+    i: int,
+    lookback: int,
+    sma_fast_window: int,
+    sma_slow_window: int,
+) -> List[float]:
+    """Features of candle i; window_returns = returns[i - lookback : i]"""
+    window_closes = closes[i - lookback : i]
+    window_volumes = volumes[i - lookback : i]
+
+    # return_1, return_3, return_5: % change over last 1, 3, 5 candles
+    c = closes[i]
+    c_1 = closes[i - 1] if i >= 1 else c
+    c_3 = closes[i - 3] if i >= 3 else c
+    c_5 = closes[i - 5] if i >= 5 else c
+
+    return_1 = (c - c_1) / c_1 if c_1 != 0 else 0.0
+    return_3 = (c - c_3) / c_3 if c_3 != 0 else 0.0
+    return_5 = (c - c_5) / c_5 if c_5 != 0 else 0.0
+
+    # SMA fast, slow
+    sma_fast = np.mean(window_closes[-sma_fast_window:]) if len(window_closes) >= sma_fast_window else np.mean(window_closes)
+    sma_slow = np.mean(window_closes[-sma_slow_window:]) if len(window_closes) >= sma_slow_window else np.mean(window_closes)
+    sma_cross = 1.0 if sma_fast > sma_slow else 0.0
+
+    # Volatility: std dev of returns over lookback
+    volatility = float(np.std(window_returns)) if len(window_returns) > 0 else 0.0
+
+    # Volume ratio: current volume / mean volume over lookback
+    mean_vol = np.mean(window_volumes)
+    volume_ratio = volumes[i] / mean_vol if mean_vol > 0 else 1.0
+
+    # High-low range: (high - low) / close for current candle
+    high_low_range = (highs[i] - lows[i]) / c if c > 0 else 0.0
+
+    return [
+        return_1,
+        return_3,
+        return_5,
+        sma_fast,
+        sma_slow,
+        sma_cross,
+        volatility,
+        volume_ratio,
+        high_low_range,
+    ]
@@ -0,0 +1,219 @@
+"""
+Streaming indicators for the trader.
+
+Each (symbol, timeframe) keeps fixed-size state per indicator: a ring buffer
+and running sum for SMA, the previous value for EMA. The state is seeded
+once from the DB. After that, every read fetches only the candles from the
+newest one already seen onward, usually one or two rows. The newest candle may
+still be forming: when it comes back with the same open time it replaces the
+last value in place instead of being appended. Reading SMA/EMA is O(1)
+whatever the window length.
+
+Candles rewritten *behind* the newest one seen (e.g. a gap repair) are not
+picked up until the series is reseeded (IndicatorBook.reset or a restart).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .db import Database
+
+
+class RollingSMA:
+    """Simple moving average over the last `window` values (ring buffer + running sum)."""
+
+    __slots__ = ("window", "_buf", "_head", "_count", "_sum", "_since_resum")
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError("window must be > 0")
+        self.window = window
+        self._buf: List[float] = [0.0] * window
+        self._head = 0  # slot of the newest value
+        self._count = 0
+        self._sum = 0.0
+        self._since_resum = 0
+
+    def push(self, value: float) -> None:
+        """Append a new candle's value, evicting the oldest once full"""
+        self._head = (self._head + 1) % self.window
+        if self._count == self.window:
+            self._sum -= self._buf[self._head]
+        else:
+            self._count += 1
+        self._buf[self._head] = value
+        self._sum += value
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            # Re-add from scratch once per window so add/subtract rounding cannot drift (amortised O(1))
+            self._sum = math.fsum(self._buf[:self._count] if self._count < self.window else self._buf)
+            self._since_resum = 0
+
+    def replace_last(self, value: float) -> None:
+        """Overwrite the newest value (the forming candle moved)"""
+        if self._count == 0:
+            self.push(value)
+            return
+        self._sum += value - self._buf[self._head]
+        self._buf[self._head] = value
+
+    @property
+    def ready(self) -> bool:
+        return self._count == self.window
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._sum / self.window if self.ready else None
+
+
+class RollingEMA:
+    """
+    Exponential moving average, alpha = 2 / (window + 1), started at the first value
+
+    Matches pandas `ewm(span=window, adjust=False).mean()` over the values fed in; reported
+    once `window` values have been seen.
+    """
+
+    __slots__ = ("window", "alpha", "_prev", "_value", "_count")
+
+    def __init__(self, window: int):
+        if window <= 0:
+            raise ValueError("window must be > 0")
+        self.window = window
+        self.alpha = 2.0 / (window + 1)
+        self._prev: Optional[float] = None  # EMA through the candle before the newest
+        self._value: Optional[float] = None
+        self._count = 0
+
+    def push(self, value: float) -> None:
+        self._prev = self._value
+        self._value = self._step(value)
+        self._count += 1
+
+    def replace_last(self, value: float) -> None:
+        if self._count == 0:
+            self.push(value)
+            return
+        self._value = self._step(value)
+
+    def _step(self, value: float) -> float:
+        return value if self._prev is None else self.alpha * value + (1.0 - self.alpha) * self._prev
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= self.window
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._value if self.ready else None
+
+
+class SeriesIndicators:
+    """Indicators of one (symbol, timeframe), fed chronological (open_ts, close) pairs."""
+
+    def __init__(self, sma_windows: Iterable[int] = (), ema_windows: Iterable[int] = ()):
+        self.sma: Dict[int, RollingSMA] = {w: RollingSMA(w) for w in sorted(set(sma_windows))}
+        self.ema: Dict[int, RollingEMA] = {w: RollingEMA(w) for w in sorted(set(ema_windows))}
+        self._all = list(self.sma.values()) + list(self.ema.values())
+        self.count = 0
+        self.last_ts: Optional[int] = None
+        self.last_close: Optional[float] = None
+
+    def update(self, ts: int, close: float) -> bool:
+        """Feed one candle; the same open time as the newest replaces it. Older candles are ignored."""
+        if self.last_ts is not None and ts < self.last_ts:
+            return False
+        if ts == self.last_ts:
+            for ind in self._all:
+                ind.replace_last(close)
+        else:
+            for ind in self._all:
+                ind.push(close)
+            self.count += 1
+        self.last_ts = ts
+        self.last_close = close
+        return True
+
+    def sma_value(self, window: int) -> Optional[float]:
+        return self.sma[window].value
+
+    def ema_value(self, window: int) -> Optional[float]:
+        return self.ema[window].value
+
+
+class IndicatorBook:
+    """SeriesIndicators per (symbol, timeframe), seeded from and kept current with the DB."""
+
+    def __init__(self, sma_windows: Iterable[int] = (), ema_windows: Iterable[int] = (), ema_warmup: int = 4):
+        self.sma_windows = tuple(sorted(set(sma_windows)))
+        self.ema_windows = tuple(sorted(set(ema_windows)))
+        # An EMA depends on all history; ema_warmup * window candles bring the seed error below e^-(2*warmup)
+        self.seed_rows = max(
+            [*self.sma_windows, *(w * ema_warmup for w in self.ema_windows), 1]
+        )
+        self._series: Dict[Tuple[str, str], SeriesIndicators] = {}
+        self.rows_read = 0
+
+    def get(self, symbol: str, timeframe: str) -> Optional[SeriesIndicators]:
+        return self._series.get((symbol, timeframe))
+
+    def reset(self, symbol: Optional[str] = None, timeframe: Optional[str] = None) -> None:
+        """Drop state (all, or one series) so the next update reseeds from the DB"""
+        if symbol is None:
+            self._series.clear()
+        else:
+            self._series.pop((symbol, timeframe), None)
+
+    def update(self, db: Database, symbol: str, timeframe: str) -> SeriesIndicators:
+        """Bring a series up to date: seed on first use, afterwards read only candles >= the newest seen"""
+        key = (symbol, timeframe)
+        state = self._series.get(key)
+        if state is not None and state.last_ts is not None:
+            rows = db.get_ohlcv_arrays(symbol, timeframe, start_time=state.last_ts, limit=self.seed_rows + 1,
+                                       include_archive=False)
+            if len(rows) <= self.seed_rows:
+                self._feed(state, rows)
+                return state
+            # Further behind than a seed's worth of candles: reseeding reads less
+        state = SeriesIndicators(self.sma_windows, self.ema_windows)
+        self._feed(state, db.get_ohlcv_arrays(symbol, timeframe, limit=self.seed_rows, latest=True))
+        self._series[key] = state
+        return state
+
+    def update_many(self, db: Database, symbols: Iterable[str], timeframe: str) -> Dict[str, SeriesIndicators]:
+        """update() for many symbols with one read for the seeded series and one for the rest"""
+        symbols = list(symbols)
+        since = {}
+        for symbol in symbols:
+            state = self._series.get((symbol, timeframe))
+            if state is not None and state.last_ts is not None:
+                since[symbol] = state.last_ts
+        out: Dict[str, SeriesIndicators] = {}
+        if since:
+            fresh = db.get_ohlcv_since_many(since, timeframe, max_rows=self.seed_rows + 1)
+            for symbol in since:
+                rows = fresh.get(symbol)
+                if rows is not None and len(rows) > self.seed_rows:
+                    continue  # too far behind: reseed below
+                state = self._series[(symbol, timeframe)]
+                if rows is not None:
+                    self._feed(state, rows)
+                out[symbol] = state
+        to_seed = [s for s in symbols if s not in out]
+        if to_seed:
+            seeds = db.get_recent_ohlcv_many(to_seed, timeframe, limit=self.seed_rows)
+            for symbol in to_seed:
+                state = SeriesIndicators(self.sma_windows, self.ema_windows)
+                rows = seeds.get(symbol)
+                if rows is not None:
+                    self._feed(state, rows)
+                self._series[(symbol, timeframe)] = state
+                out[symbol] = state
+        return out
+
+    def _feed(self, state: SeriesIndicators, rows) -> None:
+        self.rows_read += len(rows)
+        for ts, close in zip(rows["timestamp"].tolist(), rows["close"].tolist()):
+            state.update(int(ts), float(close))
@@ -0,0 +1,304 @@
+"""
+Dedicated SQLite writer thread for the collector.
+
+Fetchers hand candle pages, ticker batches and resample requests to
+IngestWriter through a bounded queue and go straight back to the network.
+The writer thread owns its own Database connection and drains everything
+that is queued into one transaction: pages of the same series are merged
+into a single upsert, tickers into one executemany, and one commit covers
+the lot. Resamples run after that commit, so they see the new 1m candles.
+
+on_commit(symbol, timeframe, candles) is called for every candle series once
+its transaction has committed; the collector advances its fetch cursors there.
+
+With a CandleCloseTracker, newly closed candles are logged to candle_events
+in the transaction that stores them (DB resamples: right after they run).
+
+A full queue blocks the producer (back-pressure), which bounds memory when
+the disk falls behind. close() drains what is queued and stops the thread.
+A failed transaction is retried once; if that fails too the group is dropped
+and counted in stats()["dropped_rows"]. Any other error while handling a group
+is logged and counted the same way; the thread keeps running.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .candle_events import CandleCloseTracker
+from .db import Database
+from .scheduler import CandleLatency, close_to_stored_ms
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class IngestWriter:
+    """Single writer thread coalescing queued OHLCV/ticker writes into large transactions."""
+
+    def __init__(self, db_path: Optional[Path] = None, max_queue: int = 64, max_batch_rows: int = 20000,
+                 latency: Optional[CandleLatency] = None, events: Optional[CandleCloseTracker] = None,
+                 on_commit: Optional[Callable[[str, str, List[List]], None]] = None):
+        if max_queue <= 0:
+            raise ValueError("max_queue must be > 0")
+        self.db_path = db_path
+        self.latency = latency
+        self.events = events
+        self.on_commit = on_commit
+        self.max_batch_rows = max(1, max_batch_rows)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+        self.transactions = 0
+        self.rows_written = 0
+        self.failed_jobs = 0
+        self.dropped_rows = 0
+        self.backpressure_waits = 0
+        self.last_commit_ms: Optional[float] = None
+        self.max_commit_ms = 0.0
+
+    # -----------------------------
+    # Producer side
+    # -----------------------------
+    def start(self) -> "IngestWriter":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit_ohlcv(self, symbol: str, timeframe: str, rows: List[List], prev_latest: Optional[int] = None) -> None:
+        """Queue one fetched candle page (blocks while the queue is full)
+
+        prev_latest is the newest stored open before the fetch, used for close -> stored latency.
+        """
+        if rows:
+            self._put(("ohlcv", symbol, timeframe, rows, prev_latest))
+
+    def submit_resample(self, symbol: str, to_timeframes: Iterable[str]) -> None:
+        """Queue a 1m -> to_timeframes resample, run after the candles queued before it are committed"""
+        to_timeframes = list(to_timeframes)
+        if to_timeframes:
+            self._put(("resample", symbol, to_timeframes))
+
+    def submit_resampled(self, symbol: str, candles_by_tf: Dict[str, List[List]], watermark: int) -> None:
+        """Queue resampled candles built in memory, written in the same transaction as the 1m pages"""
+        if any(candles_by_tf.values()):
+            self._put(("resampled", symbol, candles_by_tf, watermark))
+
+    def insert_tickers(self, tickers: Iterable[tuple]) -> int:
+        """Queue (symbol, ticker) pairs; same signature as Database.insert_tickers so TickerBuffer can use it"""
+        tickers = list(tickers)
+        if tickers:
+            self._put(("tickers", tickers))
+        return len(tickers)
+
+    def _put(self, job: tuple) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError("IngestWriter is not running")
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.backpressure_waits += 1
+            start = time.perf_counter()
+            self._queue.put(job)
+            logger.info(
+                f"[WRITER] backpressure waited_ms={(time.perf_counter() - start) * 1000:.0f} "
+                f"queue_depth={self.queue_depth}"
+            )
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Drain the queue, then stop the writer thread"""
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.error(f"[WRITER] drain timed out queue_depth={self.queue_depth}")
+                return
+        self._thread = None
+        logger.info(f"[WRITER] stopped {self._format_stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "transactions": self.transactions,
+            "rows_written": self.rows_written,
+            "failed_jobs": self.failed_jobs,
+            "dropped_rows": self.dropped_rows,
+            "backpressure_waits": self.backpressure_waits,
+            "last_commit_ms": self.last_commit_ms,
+            "max_commit_ms": self.max_commit_ms,
+        }
+
+    def _format_stats(self) -> str:
+        return " ".join(f"{k}={v}" for k, v in self.stats().items())
+
+    # -----------------------------
+    # Writer thread
+    # -----------------------------
+    def _run(self) -> None:
+        db = Database(self.db_path)
+        db.connect()
+        try:
+            while True:
+                jobs = [self._queue.get()]
+                rows = self._job_rows(jobs[0])
+                # Coalesce whatever else is already queued, up to max_batch_rows
+                while rows < self.max_batch_rows:
+                    try:
+                        job = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    jobs.append(job)
+                    rows += self._job_rows(job)
+                stop = any(job is _STOP for job in jobs)
+                group = [job for job in jobs if job is not _STOP]
+                try:
+                    self._process(db, group)
+                except Exception as e:
+                    # Keep the thread alive: once it exits every submit raises and all writes are lost
+                    self.failed_jobs += len(group)
+                    self.dropped_rows += sum(self._job_rows(job) for job in group)
+                    logger.error(f"[WRITER] group failed jobs={len(group)} error={e}", exc_info=True)
+                if stop:
+                    return
+        finally:
+            db.close()
+
+    @staticmethod
+    def _job_rows(job: Any) -> int:
+        if job is _STOP or job[0] == "resample":
+            return 0
+        if job[0] == "resampled":
+            return sum(len(rows) for rows in job[2].values())
+        return len(job[3]) if job[0] == "ohlcv" else len(job[1])
+
+    def _process(self, db: Database, jobs: List[tuple]) -> None:
+        """Write one coalesced group: all candles + tickers in one transaction, then the resamples"""
+        series: Dict[tuple, List[List]] = {}
+        prev_latest: Dict[tuple, Optional[int]] = {}
+        tickers: List[tuple] = []
+        resampled: List[tuple] = []
+        followups: List[tuple] = []
+        for job in jobs:
+            if job[0] == "ohlcv":
+                series.setdefault((job[1], job[2]), []).extend(job[3])
+                prev_latest.setdefault((job[1], job[2]), job[4])
+            elif job[0] == "tickers":
+                tickers.extend(job[1])
+            elif job[0] == "resampled":
+                resampled.append(job)
+            else:
+                followups.append(job)
+
+        if series or tickers or resampled:
+            start = time.perf_counter()
+            rows = sum(len(c) for c in series.values()) + len(tickers) + sum(
+                self._job_rows(job) for job in resampled
+            )
+            results = None
+            for attempt in (1, 2):
+                try:
+                    results, resample_results, events = self._write_group(db, series, tickers, resampled)
+                    break
+                except Exception as e:
+                    db.conn.rollback()
+                    if attempt == 1:
+                        # Usually transient (lock timeout, disk hiccup): the whole group is retried once
+                        logger.warning(
+                            f"[WRITER] transaction failed, retrying series={len(series)} tickers={len(tickers)} "
+                            f"error={e}"
+                        )
+                        continue
+                    self.failed_jobs += len(jobs) - len(followups)
+                    self.dropped_rows += rows
+                    logger.error(
+                        f"[WRITER] transaction failed twice, dropped rows={rows} series={len(series)} "
+                        f"tickers={len(tickers)} error={e}",
+                        exc_info=True,
+                    )
+            if results is not None:
+                latency_ms = (time.perf_counter() - start) * 1000
+                stored_at_ms = int(time.time() * 1000)
+                self.transactions += 1
+                self.rows_written += rows
+                self.last_commit_ms = latency_ms
+                self.max_commit_ms = max(self.max_commit_ms, latency_ms)
+                if events:
+                    self.events.mark(events)
+                for (symbol, timeframe), (inserted, updated) in results.items():
+                    candles = series[(symbol, timeframe)]
+                    if self.on_commit is not None:
+                        self.on_commit(symbol, timeframe, candles)
+                    close_ms = close_to_stored_ms(candles, db._timeframe_to_ms(timeframe),
+                                                  prev_latest[(symbol, timeframe)], stored_at_ms)
+                    if close_ms is not None and self.latency is not None:
+                        self.latency.record(timeframe, close_ms)
+                    logger.info(
+                        f"[COLLECTOR] symbol={symbol} timeframe={timeframe} fetched={len(candles)} "
+                        f"inserted={inserted} updated={updated} latest_open={max(c[0] for c in candles)}"
+                        + (f" close_to_stored_ms={close_ms}" if close_ms is not None else "")
+                    )
+                for symbol, to_tf, ins, upd in resample_results:
+                    if ins or upd:
+                        logger.info(f"[COLLECTOR] symbol={symbol} resample 1m->{to_tf} inserted={ins} updated={upd}")
+                logger.info(
+                    f"[WRITER] committed jobs={len(jobs) - len(followups)} rows={rows} "
+                    f"latency_ms={latency_ms:.1f} queue_depth={self.queue_depth}"
+                )
+
+        for job in followups:
+            symbol, to_timeframes = job[1], job[2]
+            for to_tf in to_timeframes:
+                try:
+                    ins, upd = db.resample_ohlcv(symbol, "1m", to_tf)
+                    if ins or upd:
+                        logger.info(f"[COLLECTOR] symbol={symbol} resample 1m->{to_tf} inserted={ins} updated={upd}")
+                        event = self.events.closed_from_1m(symbol, to_tf) if self.events is not None else None
+                        if event:
+                            db.insert_candle_events([event])
+                            self.events.mark([event])
+                except Exception as e:
+                    logger.warning(f"[COLLECTOR] symbol={symbol} resample 1m->{to_tf} error={e}")
+
+    def _write_group(self, db: Database, series: Dict[tuple, List[List]], tickers: List[tuple],
+                     resampled: List[tuple]) -> tuple:
+        """One transaction for a coalesced group; returns (upsert results, resample results, events)"""
+        results = {}
+        closes = []
+        for (symbol, timeframe), candles in series.items():
+            results[(symbol, timeframe)] = db.insert_ohlcv(symbol, timeframe, candles, commit=False)
+            closes.append((symbol, timeframe, candles))
+        if tickers:
+            db.insert_tickers(tickers, commit=False)
+        resample_results = []
+        for _, symbol, candles_by_tf, watermark in resampled:
+            for to_tf, candles in candles_by_tf.items():
+                ins, upd = db.insert_ohlcv(symbol, to_tf, candles, commit=False)
+                db.set_resample_watermark(symbol, "1m", to_tf, watermark, commit=False)
+                resample_results.append((symbol, to_tf, ins, upd))
+                closes.append((symbol, to_tf, candles))
+        events = self._close_events(closes)
+        if events:
+            db.insert_candle_events(events, commit=False)
+        db.conn.commit()
+        return results, resample_results, events
+
+    def _close_events(self, closes: List[tuple]) -> List[tuple]:
+        """candle_events rows for the (symbol, timeframe, candles) writes that close a candle"""
+        if self.events is None:
+            return []
+        now_ms = int(time.time() * 1000)
+        events = [self.events.closed(symbol, timeframe, candles, now_ms) for symbol, timeframe, candles in closes]
+        return [e for e in events if e]
@@ -39,19 +39,19 @@ class Plotter:
         start_time = end_time - (hours * 3600 * 1000)
         
         # Fetch data
-        data = self.db.get_ohlcv(symbol, TIMEFRAME, start_time=start_time, end_time=end_time)
+        data = self.db.get_ohlcv_arrays(symbol, TIMEFRAME, start_time=start_time, end_time=end_time)
         
-        if not data:
+        if len(data) == 0:
             logger.error(f"No data found for {symbol} in the last {hours} hours")
             return
         
         # Extract data
-        timestamps = [datetime.fromtimestamp(d['timestamp'] / 1000) for d in data]
-        opens = [d['open'] for d in data]
-        highs = [d['high'] for d in data]
-        lows = [d['low'] for d in data]
-        closes = [d['close'] for d in data]
-        volumes = [d['volume'] for d in data]
+        timestamps = [datetime.fromtimestamp(ts / 1000) for ts in data['timestamp'].tolist()]
+        opens = data['open']
+        highs = data['high']
+        lows = data['low']
+        closes = data['close']
+        volumes = data['volume']
         
         # Create figure with subplots
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), height_ratios=[3, 1])
@@ -102,15 +102,15 @@ class Plotter:
         start_time = end_time - (hours * 3600 * 1000)
         
         # Fetch data
-        data = self.db.get_ohlcv(symbol, TIMEFRAME, start_time=start_time, end_time=end_time)
+        data = self.db.get_ohlcv_arrays(symbol, TIMEFRAME, start_time=start_time, end_time=end_time)
         
-        if not data:
+        if len(data) == 0:
             logger.error(f"No data found for {symbol} in the last {hours} hours")
             return
         
         # Extract data
-        timestamps = [datetime.fromtimestamp(d['timestamp'] / 1000) for d in data]
-        closes = [d['close'] for d in data]
+        timestamps = [datetime.fromtimestamp(ts / 1000) for ts in data['timestamp'].tolist()]
+        closes = data['close']
         
         # Create plot
         plt.figure(figsize=(12, 6))
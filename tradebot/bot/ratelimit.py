@@ -0,0 +1,156 @@
+"""
+Host-wide token bucket for exchange requests.
+
+Every Exchange on the host (collector, backfill, trader, scripts) draws
+request weight from one bucket stored in a small SQLite file, so processes
+running side by side share the exchange's per-IP budget instead of each
+assuming it has all of it. Binance counts request *weight*, not requests,
+so each endpoint debits its documented weight (ENDPOINT_WEIGHTS).
+
+Normal callers reserve their tokens immediately and sleep off any deficit
+(first come, first served). Low-priority callers such as backfill only take
+tokens while the bucket stays above `low_priority_reserve` of its capacity,
+which keeps headroom for live collection. A 429/418 from the exchange
+empties the bucket for everyone via penalize().
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Exchanges whose request weights ENDPOINT_WEIGHTS describes
+WEIGHTED_EXCHANGES = {"binance"}
+
+# Binance spot request weights (GET /api/v3/...); unknown endpoints cost 1
+ENDPOINT_WEIGHTS = {
+    "fetch_ohlcv": 2,        # klines
+    "fetch_ticker": 2,       # ticker/24hr, one symbol
+    "load_markets": 20,      # exchangeInfo
+    "fetch_balance": 20,     # account
+    "create_order": 1,       # order
+}
+
+
+def request_weight(endpoint: str, symbols: Optional[int] = None) -> int:
+    """Weight of one request; fetch_tickers scales with the number of symbols asked for"""
+    if endpoint == "fetch_tickers":
+        if not symbols:
+            return 80
+        return 2 if symbols <= 20 else 40 if symbols <= 100 else 80
+    return ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+
+class SharedRateLimiter:
+    """Token bucket persisted in SQLite; safe across threads and processes."""
+
+    def __init__(self, path: Path, name: str, weight_per_min: float, burst: float,
+                 low_priority_reserve: float = 0.5):
+        if weight_per_min <= 0 or burst <= 0:
+            raise ValueError("weight_per_min and burst must be > 0")
+        self.path = Path(path)
+        self.name = name
+        self.rate = weight_per_min / 60.0  # tokens per second
+        self.capacity = float(burst)
+        self.reserve = min(max(low_priority_reserve, 0.0), 1.0) * self.capacity
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.acquired = 0
+        self.waited_s = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Bucket state is disposable; losing the last update on power loss is harmless
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _tokens(self, conn: sqlite3.Connection, now: float) -> float:
+        """Current bucket level (refilled up to now); call inside a transaction"""
+        row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE name = ?", (self.name,)).fetchone()
+        if row is None:
+            return self.capacity
+        return min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+
+    def _store(self, conn: sqlite3.Connection, tokens: float, now: float) -> None:
+        conn.execute(
+            "INSERT INTO rate_buckets (name, tokens, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+            (self.name, tokens, now),
+        )
+
+    def _take(self, weight: float, low_priority: bool) -> float:
+        """One transaction: refill, then debit if allowed. Returns seconds to sleep (0 = acquired)"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens = self._tokens(conn, now)
+            if low_priority and tokens - weight < self.reserve:
+                # Do not debit; come back once the bucket has refilled above the reserve
+                conn.execute("COMMIT")
+                return max((self.reserve + weight - tokens) / self.rate, 0.001)
+            # Normal priority may go negative: that is a reservation, repaid by sleeping
+            tokens -= weight
+            self._store(conn, tokens, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return 0.0 if tokens >= 0 else -tokens / self.rate
+
+    def acquire(self, weight: float = 1, low_priority: bool = False) -> float:
+        """Block until `weight` tokens are granted; returns the seconds spent waiting"""
+        # Low priority only draws above the reserve, so a heavier request could never be granted
+        weight = min(float(weight), self.capacity - self.reserve if low_priority else self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                wait = self._take(weight, low_priority)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited += wait
+            if not low_priority:
+                # Tokens were already reserved; the sleep pays them back
+                break
+        self.acquired += 1
+        self.waited_s += waited
+        return waited
+
+    def penalize(self, seconds: float) -> None:
+        """Drain the bucket so every process pauses ~`seconds` (after a 429/418 from the exchange)"""
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._store(conn, min(self._tokens(conn, now), -seconds * self.rate), now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        logger.warning(f"[RATELIMIT] bucket={self.name} penalized seconds={seconds:.0f}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,443 @@
+"""
+Offline replay exchange for load tests and benchmarks.
+
+ReplayExchange is a drop-in for the ccxt object inside bot.exchange.Exchange
+(selected with EXCHANGE_NAME=replay), so the collector, backfill and trader
+run unchanged against it without network access.
+
+Candles come from one of two sources, per symbol:
+
+- Recorded fixtures: <fixtures_dir>/<BASE-QUOTE>/<timeframe>.csv with
+  timestamp,open,high,low,close,volume rows (scripts/export_replay_fixtures.py
+  writes them from the DB). They are served as recorded.
+- A synthetic random walk otherwise. It is a pure function of (seed, symbol,
+  minute), so every process and every run sees the same history: daily
+  anchor prices follow a walk over a fixed day grid, and each day's 1m path
+  is a walk bridged onto the next anchor. Higher timeframes are aggregated
+  from 1m. The walk runs up to the wall clock; the forming candle grows as
+  time passes, like on a live exchange.
+
+Each request can sleep a configurable latency (with jitter), fail with a
+RateLimitExceeded at a given rate, and count against an optional server-side
+weight budget per minute, so the client's backoff and the shared limiter get
+exercised too. Orders fill at the current synthetic price against in-memory
+balances.
+"""
+
+from __future__ import annotations
+
+import collections
+import csv
+import logging
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from ccxt.base.errors import BadSymbol, InsufficientFunds, InvalidOrder, RateLimitExceeded
+
+from .db import Database
+from .ratelimit import request_weight
+
+logger = logging.getLogger(__name__)
+
+MINUTE_MS = 60_000
+DAY_MS = 86_400_000
+DAY_MINUTES = 1440
+# Day 0 of the synthetic walk (2017-01-01 UTC) and length of the daily anchor grid (~22 years)
+WALK_ORIGIN_MS = 1_483_228_800_000
+WALK_DAYS = 8192
+MINUTE_VOLATILITY = 0.0008
+TAKER_FEE = 0.001
+MAX_OHLCV_LIMIT = 1000
+TIMEFRAMES = ("1m", "3m", "5m", "7m", "15m", "30m", "1h", "2h", "4h", "6h", "12h", "1d")
+
+
+def _symbol_key(symbol: str) -> int:
+    return zlib.crc32(symbol.encode("utf-8"))
+
+
+class _SyntheticSeries:
+    """Deterministic 1m random walk for one symbol."""
+
+    def __init__(self, symbol: str, seed: int, day_cache: int = 3):
+        self.key = (seed, _symbol_key(symbol))
+        rng = np.random.default_rng(self.key)
+        self.base_log = np.log(10 ** rng.uniform(-1.0, 4.5))
+        self.sigma = MINUTE_VOLATILITY * rng.uniform(0.5, 1.5)
+        self.volume_scale = 10 ** rng.uniform(1.0, 4.0) / np.exp(self.base_log) ** 0.5
+        # Log price at the start of every day on the grid
+        steps = rng.normal(0.0, self.sigma * np.sqrt(DAY_MINUTES), WALK_DAYS)
+        self.anchors = self.base_log + np.concatenate(([0.0], np.cumsum(steps)))
+        self._days: "collections.OrderedDict[int, np.ndarray]" = collections.OrderedDict()
+        self._day_cache = day_cache
+        self._lock = threading.Lock()
+
+    def day(self, day: int) -> np.ndarray:
+        """(1440, 6) float array of the day's 1m candles: ts, open, high, low, close, volume"""
+        with self._lock:
+            arr = self._days.get(day)
+            if arr is not None:
+                self._days.move_to_end(day)
+                return arr
+        if not 0 <= day < WALK_DAYS:
+            raise ValueError(f"replay walk covers days 0..{WALK_DAYS - 1}; got {day}")
+        rng = np.random.default_rng(self.key + (day,))
+        path = np.cumsum(rng.normal(0.0, self.sigma, DAY_MINUTES))
+        # Brownian bridge: end the day exactly on the next anchor
+        drift = self.anchors[day + 1] - self.anchors[day]
+        path -= np.arange(1, DAY_MINUTES + 1) / DAY_MINUTES * (path[-1] - drift)
+        close = self.anchors[day] + path
+        open_ = np.concatenate(([self.anchors[day]], close[:-1]))
+        wick = np.abs(rng.normal(0.0, self.sigma * 0.5, (2, DAY_MINUTES)))
+        arr = np.empty((DAY_MINUTES, 6))
+        arr[:, 0] = WALK_ORIGIN_MS + day * DAY_MS + np.arange(DAY_MINUTES) * MINUTE_MS
+        arr[:, 1] = np.exp(open_)
+        arr[:, 4] = np.exp(close)
+        arr[:, 2] = np.exp(np.maximum(open_, close) + wick[0])
+        arr[:, 3] = np.exp(np.minimum(open_, close) - wick[1])
+        arr[:, 5] = self.volume_scale * rng.lognormal(0.0, 0.75, DAY_MINUTES)
+        with self._lock:
+            self._days[day] = arr
+            while len(self._days) > self._day_cache:
+                self._days.popitem(last=False)
+        return arr
+
+    def minutes(self, start_ms: int, end_ms: int, now_ms: int) -> np.ndarray:
+        """1m candles opening in [start_ms, end_ms), cut at now_ms; the forming minute is partial"""
+        end_ms = min(end_ms, now_ms // MINUTE_MS * MINUTE_MS + MINUTE_MS)
+        if end_ms <= start_ms:
+            return np.empty((0, 6))
+        first_day = (start_ms - WALK_ORIGIN_MS) // DAY_MS
+        last_day = (end_ms - 1 - WALK_ORIGIN_MS) // DAY_MS
+        arr = np.concatenate([self.day(d) for d in range(first_day, last_day + 1)])
+        arr = arr[(arr[:, 0] >= start_ms) & (arr[:, 0] < end_ms)]
+        if len(arr) and arr[-1, 0] + MINUTE_MS > now_ms:
+            # Forming minute: price moves linearly from open towards its final close
+            frac = (now_ms - arr[-1, 0]) / MINUTE_MS
+            row = arr[-1].copy()
+            row[4] = row[1] + (row[4] - row[1]) * frac
+            row[2] = max(row[1], row[4])
+            row[3] = min(row[1], row[4])
+            row[5] *= frac
+            arr = np.concatenate((arr[:-1], row[None, :]))
+        return arr
+
+
+class _FixtureSeries:
+    """Recorded candles for one symbol, loaded lazily per timeframe."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._frames: Dict[str, Optional[np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def frame(self, timeframe: str) -> Optional[np.ndarray]:
+        with self._lock:
+            if timeframe not in self._frames:
+                self._frames[timeframe] = self._load(self.directory / f"{timeframe}.csv")
+            return self._frames[timeframe]
+
+    @staticmethod
+    def _load(path: Path) -> Optional[np.ndarray]:
+        if not path.exists():
+            return None
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [r for r in csv.reader(f) if r and r[0].strip().lstrip("-").isdigit()]
+        arr = np.array(rows, dtype=float).reshape(-1, 6)
+        arr = arr[np.argsort(arr[:, 0], kind="stable")]
+        logger.info(f"[REPLAY] fixture={path} candles={len(arr)}")
+        return arr
+
+
+class ReplayExchange:
+    """ccxt-compatible offline exchange serving fixture or synthetic candles."""
+
+    id = "replay"
+
+    def __init__(self, symbols: Sequence[str] = (), synthetic_markets: int = 0, seed: int = 42,
+                 fixtures_dir: Optional[Path] = None, latency_ms: float = 0.0, latency_jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, weight_per_min: float = 0.0,
+                 balances: Optional[Dict[str, float]] = None):
+        self.seed = seed
+        self.latency_s = max(0.0, latency_ms) / 1000.0
+        self.jitter_s = max(0.0, latency_jitter_ms) / 1000.0
+        self.error_rate = min(max(error_rate, 0.0), 1.0)
+        self.weight_per_min = max(0.0, weight_per_min)
+        self.rateLimit = 0  # the Exchange wrapper paces requests; this backend only enforces weight_per_min
+        self.timeframes = {tf: tf for tf in TIMEFRAMES}
+        self.has = {"fetchOHLCV": True, "fetchTicker": True, "fetchTickers": True,
+                    "fetchBalance": True, "createOrder": True}
+        self.features = {"spot": {"fetchOHLCV": {"limit": MAX_OHLCV_LIMIT}}}
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._weight_window: "collections.deque[tuple]" = collections.deque()
+        self._fixtures: Dict[str, _FixtureSeries] = {}
+        self._synthetic: Dict[str, _SyntheticSeries] = {}
+        self._balances = {k: float(v) for k, v in (balances or {"USDT": 10_000.0}).items()}
+        self._orders = 0
+
+        self.requests: Dict[str, int] = collections.Counter()
+        self.injected_errors = 0
+        self.budget_errors = 0
+
+        listed = [s.strip() for s in symbols if s and s.strip()]
+        listed += [f"SYN{i:03d}/USDT" for i in range(max(0, synthetic_markets))]
+        if fixtures_dir is not None and Path(fixtures_dir).is_dir():
+            for directory in sorted(p for p in Path(fixtures_dir).iterdir() if p.is_dir() and "-" in p.name):
+                symbol = directory.name.replace("-", "/", 1)
+                self._fixtures[symbol] = _FixtureSeries(directory)
+                listed.append(symbol)
+        self.markets: Dict[str, Dict[str, Any]] = {}
+        self.currencies: Dict[str, Dict[str, Any]] = {}
+        self.set_markets({s: self._market(s) for s in dict.fromkeys(listed)})
+        logger.info(
+            f"[REPLAY] markets={len(self.markets)} fixtures={len(self._fixtures)} seed={seed} "
+            f"latency_ms={latency_ms:g} error_rate={self.error_rate:g} weight_per_min={self.weight_per_min:g}"
+        )
+
+    # -----------------------------
+    # Markets
+    # -----------------------------
+    @staticmethod
+    def _market(symbol: str) -> Dict[str, Any]:
+        base, _, quote = symbol.partition("/")
+        return {
+            "id": f"{base}{quote}", "symbol": symbol, "base": base, "quote": quote,
+            "type": "spot", "spot": True, "active": True,
+            "precision": {"amount": 1e-6, "price": 1e-8},
+            "limits": {"amount": {"min": 1e-6}, "cost": {"min": 5.0}},
+        }
+
+    def load_markets(self, reload: bool = False, params: Optional[Dict] = None) -> Dict[str, Dict[str, Any]]:
+        self._request("load_markets")
+        return self.markets
+
+    def set_markets(self, markets: Dict[str, Dict[str, Any]], currencies: Optional[Dict] = None):
+        self.markets = dict(markets)
+        codes = {m["base"] for m in self.markets.values()} | {m["quote"] for m in self.markets.values()}
+        self.currencies = currencies or {c: {"id": c, "code": c} for c in sorted(codes)}
+        return self.markets
+
+    def set_sandbox_mode(self, enabled: bool) -> None:
+        pass
+
+    def amount_to_precision(self, symbol: str, amount: float) -> str:
+        return f"{amount:.6f}"
+
+    def price_to_precision(self, symbol: str, price: float) -> str:
+        return f"{price:.8f}"
+
+    def _series(self, symbol: str) -> _SyntheticSeries:
+        if symbol not in self.markets:
+            raise BadSymbol(f"replay does not have market symbol {symbol}")
+        with self._lock:
+            series = self._synthetic.get(symbol)
+            if series is None:
+                series = self._synthetic[symbol] = _SyntheticSeries(symbol, self.seed)
+        return series
+
+    # -----------------------------
+    # Request simulation
+    # -----------------------------
+    def _request(self, endpoint: str, symbols: Optional[int] = None) -> None:
+        """Count the request, sleep its latency, then maybe fail it like a 429 would"""
+        with self._lock:
+            self.requests[endpoint] += 1
+        if self.latency_s or self.jitter_s:
+            time.sleep(max(0.0, self.latency_s + self._uniform(-self.jitter_s, self.jitter_s)))
+        if self.weight_per_min:
+            now = time.monotonic()
+            with self._lock:
+                while self._weight_window and self._weight_window[0][0] <= now - 60.0:
+                    self._weight_window.popleft()
+                used = sum(w for _, w in self._weight_window)
+                weight = request_weight(endpoint, symbols)
+                over = used + weight > self.weight_per_min
+                if not over:
+                    self._weight_window.append((now, weight))
+            if over:
+                self.budget_errors += 1
+                raise RateLimitExceeded(f"replay 429: weight {used:.0f}/{self.weight_per_min:.0f} per minute used")
+        if self.error_rate and self._uniform(0.0, 1.0) < self.error_rate:
+            self.injected_errors += 1
+            raise RateLimitExceeded("replay 429: injected rate-limit error")
+
+    def _uniform(self, low: float, high: float) -> float:
+        with self._lock:
+            return self._rng.uniform(low, high)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": sum(self.requests.values()),
+            "by_endpoint": dict(self.requests),
+            "injected_errors": self.injected_errors,
+            "budget_errors": self.budget_errors,
+        }
+
+    # -----------------------------
+    # Market data
+    # -----------------------------
+    def fetch_ohlcv(self, symbol: str, timeframe: str = "1m", since: Optional[int] = None,
+                    limit: Optional[int] = None, params: Optional[Dict] = None) -> List[List]:
+        self._request("fetch_ohlcv")
+        limit = min(limit or 500, MAX_OHLCV_LIMIT)
+        if symbol in self._fixtures:
+            return self._fixture_ohlcv(symbol, timeframe, since, limit)
+        tf_ms = Database._timeframe_to_ms(timeframe)
+        now_ms = int(time.time() * 1000)
+        forming = now_ms // tf_ms * tf_ms
+        if since is None:
+            start = forming - (limit - 1) * tf_ms
+        else:
+            start = -(-since // tf_ms) * tf_ms  # first candle opening at or after since
+        end = min(start + limit * tf_ms, forming + tf_ms)
+        start = max(start, WALK_ORIGIN_MS)
+        if end <= start:
+            return []
+        minutes = self._series(symbol).minutes(start, end, now_ms)
+        return self._aggregate(minutes, tf_ms)
+
+    def _fixture_ohlcv(self, symbol: str, timeframe: str, since: Optional[int], limit: int) -> List[List]:
+        arr = self._fixtures[symbol].frame(timeframe)
+        if arr is None:
+            tf_ms = Database._timeframe_to_ms(timeframe)
+            minutes = self._fixtures[symbol].frame("1m")
+            if minutes is None or tf_ms <= MINUTE_MS:
+                raise BadSymbol(f"replay has no {timeframe} fixture for {symbol}")
+            arr = np.array(self._aggregate(minutes, tf_ms), dtype=float).reshape(-1, 6)
+        if since is None:
+            rows = arr[-limit:]
+        else:
+            i = int(np.searchsorted(arr[:, 0], since, side="left"))
+            rows = arr[i:i + limit]
+        return [[int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5])] for r in rows]
+
+    @staticmethod
+    def _aggregate(minutes: np.ndarray, tf_ms: int) -> List[List]:
+        """Fold 1m rows into epoch-aligned tf_ms candles (a partial first or last bucket is kept)"""
+        if not len(minutes):
+            return []
+        buckets = (minutes[:, 0] // tf_ms * tf_ms).astype(np.int64)
+        if tf_ms == MINUTE_MS:
+            idx = np.arange(len(minutes))
+        else:
+            idx = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+        ends = np.append(idx[1:], len(minutes)) - 1
+        opens = minutes[idx, 1]
+        closes = minutes[ends, 4]
+        highs = np.maximum.reduceat(minutes[:, 2], idx)
+        lows = np.minimum.reduceat(minutes[:, 3], idx)
+        volumes = np.add.reduceat(minutes[:, 5], idx)
+        return [
+            [int(buckets[i]), float(o), float(h), float(l), float(c), float(v)]
+            for i, o, h, l, c, v in zip(idx, opens, highs, lows, closes, volumes)
+        ]
+
+    def _ticker(self, symbol: str, now_ms: int) -> Dict[str, Any]:
+        if symbol in self._fixtures:
+            day = np.array(self._fixture_ohlcv(symbol, "1m", None, DAY_MINUTES), dtype=float).reshape(-1, 6)
+        elif symbol in self.markets:
+            day = self._series(symbol).minutes(now_ms - DAY_MS + 1, now_ms + 1, now_ms)
+        else:
+            raise BadSymbol(f"replay does not have market symbol {symbol}")
+        if not len(day):
+            raise BadSymbol(f"replay has no candles for {symbol}")
+        last = float(day[-1, 4])
+        open_ = float(day[0, 1])
+        base_volume = float(day[:, 5].sum())
+        spread = last * 0.0001
+        timestamp = now_ms if symbol not in self._fixtures else int(day[-1, 0]) + MINUTE_MS - 1
+        return {
+            "symbol": symbol,
+            "timestamp": timestamp,
+            "datetime": datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).isoformat(),
+            "high": float(day[:, 2].max()),
+            "low": float(day[:, 3].min()),
+            "bid": last - spread / 2,
+            "ask": last + spread / 2,
+            "open": open_,
+            "close": last,
+            "last": last,
+            "change": last - open_,
+            "percentage": (last / open_ - 1) * 100 if open_ else None,
+            "baseVolume": base_volume,
+            "quoteVolume": float((day[:, 5] * day[:, 4]).sum()),
+        }
+
+    def fetch_ticker(self, symbol: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+        self._request("fetch_ticker")
+        return self._ticker(symbol, int(time.time() * 1000))
+
+    def fetch_tickers(self, symbols: Optional[Sequence[str]] = None, params: Optional[Dict] = None) -> Dict[str, Dict]:
+        symbols = list(symbols) if symbols else list(self.markets)
+        self._request("fetch_tickers", len(symbols))
+        now_ms = int(time.time() * 1000)
+        return {s: self._ticker(s, now_ms) for s in symbols if s in self.markets}
+
+    # -----------------------------
+    # Account
+    # -----------------------------
+    def fetch_balance(self, params: Optional[Dict] = None) -> Dict[str, Any]:
+        self._request("fetch_balance")
+        with self._lock:
+            free = dict(self._balances)
+        balance: Dict[str, Any] = {"free": free, "used": {c: 0.0 for c in free}, "total": dict(free)}
+        for code, amount in free.items():
+            balance[code] = {"free": amount, "used": 0.0, "total": amount}
+        return balance
+
+    def create_order(self, symbol: str, type: str, side: str, amount: float, price: Optional[float] = None,
+                     params: Optional[Dict] = None) -> Dict[str, Any]:
+        """Fill market orders (and marketable limits) at once at the current price; others stay open"""
+        self._request("create_order")
+        if side not in ("buy", "sell") or amount <= 0:
+            raise InvalidOrder(f"replay: invalid order side={side} amount={amount}")
+        ticker = self._ticker(symbol, int(time.time() * 1000))
+        market = self.markets[symbol]
+        fill_price = ticker["ask"] if side == "buy" else ticker["bid"]
+        if type == "limit":
+            if price is None:
+                raise InvalidOrder("replay: limit order needs a price")
+            marketable = price >= fill_price if side == "buy" else price <= fill_price
+        else:
+            marketable = True
+        cost = amount * fill_price
+        fee = cost * TAKER_FEE
+        with self._lock:
+            self._orders += 1
+            order_id = f"replay-{self._orders}"
+            if marketable:
+                base, quote = market["base"], market["quote"]
+                if side == "buy":
+                    if self._balances.get(quote, 0.0) < cost + fee:
+                        raise InsufficientFunds(f"replay: {quote} balance too low for {cost + fee:.2f}")
+                    self._balances[quote] -= cost + fee
+                    self._balances[base] = self._balances.get(base, 0.0) + amount
+                else:
+                    if self._balances.get(base, 0.0) < amount:
+                        raise InsufficientFunds(f"replay: {base} balance too low for {amount}")
+                    self._balances[base] -= amount
+                    self._balances[quote] = self._balances.get(quote, 0.0) + cost - fee
+        timestamp = ticker["timestamp"]
+        return {
+            "id": order_id,
+            "symbol": symbol,
+            "type": type,
+            "side": side,
+            "timestamp": timestamp,
+            "datetime": ticker["datetime"],
+            "amount": amount,
+            "price": price if type == "limit" else fill_price,
+            "status": "closed" if marketable else "open",
+            "filled": amount if marketable else 0.0,
+            "remaining": 0.0 if marketable else amount,
+            "average": fill_price if marketable else None,
+            "cost": cost if marketable else 0.0,
+            "fee": {"cost": fee, "currency": market["quote"]} if marketable else None,
+        }
@@ -0,0 +1,115 @@
+"""
+Candle-close-aligned scheduling for the collector.
+
+Each timeframe is due right after one of its candles closes: at the next
+multiple of its interval (UTC epoch based, like exchange candles) plus a
+small settle delay that gives the exchange time to finalise the candle.
+Due times live in a heap, so the collector sleeps exactly until the next
+one. A cycle that overruns simply makes the timeframe due at the following
+boundary; boundaries are never "made up", so drift cannot accumulate.
+
+CandleLatency records how long after a candle closed it was stored, per
+timeframe, so the end-to-end lag can be reported and compared.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def next_boundary(now: float, interval_s: int, settle_s: float = 0.0) -> float:
+    """First `k * interval_s + settle_s` strictly after `now` (epoch seconds)"""
+    due = (now - settle_s) // interval_s * interval_s + interval_s + settle_s
+    return due if due > now else due + interval_s
+
+
+class CandleScheduler:
+    """Heap of (due_at, timeframe); aligned to candle closes or, if align=False, fixed intervals."""
+
+    def __init__(self, intervals: Dict[str, int], settle_s: float = 2.0, align: bool = True,
+                 now: Optional[float] = None):
+        self.intervals = dict(intervals)
+        self.settle_s = max(0.0, settle_s)
+        self.align = align
+        now = time.time() if now is None else now
+        # Everything is due immediately on start so a restart catches up at once
+        self._heap: List[Tuple[float, str]] = [(now, tf) for tf in self.intervals]
+        heapq.heapify(self._heap)
+
+    @property
+    def next_due(self) -> float:
+        return self._heap[0][0]
+
+    def seconds_until_due(self, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return max(0.0, self.next_due - now)
+
+    def pop_due(self, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Remove and return every (timeframe, scheduled_at) due at `now`"""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            scheduled_at, tf = heapq.heappop(self._heap)
+            due.append((tf, scheduled_at))
+        return due
+
+    def reschedule(self, timeframes: Sequence[str], now: Optional[float] = None) -> None:
+        """Schedule the next run of `timeframes` after a cycle that finished at `now`"""
+        now = time.time() if now is None else now
+        for tf in timeframes:
+            interval = self.intervals[tf]
+            due = next_boundary(now, interval, self.settle_s) if self.align else now + interval
+            heapq.heappush(self._heap, (due, tf))
+
+    def describe(self) -> str:
+        return ", ".join(f"{tf}@{due:.0f}" for due, tf in sorted(self._heap))
+
+
+def close_to_stored_ms(candles: Sequence[Sequence], timeframe_ms: int, prev_latest: Optional[int],
+                       stored_at_ms: int) -> Optional[int]:
+    """
+    Milliseconds between the close of the newest closed candle in `candles` and `stored_at_ms`
+
+    Only counts a candle stored in its closed form for the first time: its open
+    must be >= prev_latest (the forming candle seen last cycle, or newer).
+    Returns None if there is no such candle (nothing closed, or first fill).
+    """
+    if prev_latest is None:
+        return None
+    closed = [c[0] for c in candles if c[0] + timeframe_ms <= stored_at_ms]
+    if not closed:
+        return None
+    newest = max(closed)
+    if newest < prev_latest:
+        return None
+    return stored_at_ms - (newest + timeframe_ms)
+
+
+class CandleLatency:
+    """Thread-safe per-timeframe samples of candle close -> stored latency (ms)."""
+
+    def __init__(self):
+        self._samples: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, timeframe: str, latency_ms: int) -> None:
+        with self._lock:
+            self._samples.setdefault(timeframe, []).append(latency_ms)
+
+    def drain(self) -> Dict[str, Dict[str, int]]:
+        """Return {timeframe: {count, p50, p95, max}} for samples since the last drain"""
+        with self._lock:
+            samples, self._samples = self._samples, {}
+        summary = {}
+        for tf, values in samples.items():
+            values.sort()
+            summary[tf] = {
+                "count": len(values),
+                "p50": values[len(values) // 2],
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1],
+            }
+        return summary
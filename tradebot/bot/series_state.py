@@ -0,0 +1,125 @@
+"""
+In-memory per-series state for the collector.
+
+Loaded once at startup: the latest stored timestamp of every collected
+(symbol, timeframe) comes from a single query, and the 1m candles of each
+open resample bucket are read once per (symbol, target timeframe). After
+that the collector updates the state in place from the candles it has
+committed (with the writer thread, from its commit callback), so a write
+that is rolled back never moves the fetch cursor. Steady-state cycles need
+no read queries: the fetch cursor comes from `latest_ts`, and resampled
+candles are rebuilt from the open buckets held here and written as plain
+upserts.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .db import Database
+
+logger = logging.getLogger(__name__)
+
+
+class SeriesStateCache:
+    """Latest stored open and open resample buckets per series."""
+
+    def __init__(self, resample_to: Sequence[str] = ()):
+        self.resample_to = list(resample_to)
+        self._latest: Dict[Tuple[str, str], Optional[int]] = {}
+        # (symbol, to_tf) -> {bucket_start: {open_ts: 1m candle}}; only the newest bucket stays open
+        self._buckets: Dict[Tuple[str, str], Dict[int, Dict[int, List]]] = {}
+        self._bucket_ms = {tf: Database._timeframe_to_ms(tf) for tf in self.resample_to}
+        self._seeded: set = set()
+
+    # -----------------------------
+    # Startup
+    # -----------------------------
+    def load(self, db: Database, series: Sequence[Tuple[str, str]]) -> None:
+        """Read the latest timestamp of every series with one query"""
+        start = time.perf_counter()
+        self._latest.update(db.get_latest_timestamps(list(series)))
+        logger.info(
+            f"[STATE] loaded series={len(series)} elapsed_ms={(time.perf_counter() - start) * 1000:.1f}"
+        )
+
+    def seed_resample(self, db: Database, symbol: str) -> None:
+        """Load the 1m candles of each open resample bucket (call once resampling is caught up)"""
+        latest_1m = self._latest.get((symbol, "1m"))
+        for to_tf in self.resample_to:
+            buckets: Dict[int, Dict[int, List]] = {}
+            if latest_1m is not None:
+                bucket_start = (latest_1m // self._bucket_ms[to_tf]) * self._bucket_ms[to_tf]
+                rows = db.get_ohlcv(symbol, "1m", start_time=bucket_start, include_archive=False)
+                buckets[bucket_start] = {
+                    int(r["timestamp"]): [int(r["timestamp"]), r["open"], r["high"], r["low"], r["close"], r["volume"]]
+                    for r in rows
+                }
+            self._buckets[(symbol, to_tf)] = buckets
+        self._seeded.add(symbol)
+
+    def is_seeded(self, symbol: str) -> bool:
+        return symbol in self._seeded
+
+    # -----------------------------
+    # Steady state
+    # -----------------------------
+    def latest_ts(self, symbol: str, timeframe: str) -> Optional[int]:
+        return self._latest.get((symbol, timeframe))
+
+    def record(self, symbol: str, timeframe: str, candles: Sequence[List]) -> None:
+        """Advance the fetch cursor after `candles` were committed (may run on the writer thread)"""
+        if not candles:
+            return
+        key = (symbol, timeframe)
+        newest = max(c[0] for c in candles)
+        if self._latest.get(key) is None or newest > self._latest[key]:
+            self._latest[key] = newest
+
+    def resample(self, symbol: str, candles: Sequence[List]) -> Optional[Dict[str, List[List]]]:
+        """
+        Fold new/updated 1m candles into the open buckets and return the changed bucket candles
+
+        Returns {to_tf: [[bucket_ts, open, high, low, close, volume], ...]}, or None if a
+        candle falls into a bucket that is already closed here (the caller must resample from
+        the DB and the symbol stops using the in-memory path).
+        """
+        if symbol not in self._seeded:
+            return None
+        changed: Dict[str, List[List]] = {}
+        for to_tf in self.resample_to:
+            bucket_ms = self._bucket_ms[to_tf]
+            buckets = self._buckets[(symbol, to_tf)]
+            oldest_open = min(buckets) if buckets else None
+            touched = set()
+            for c in candles:
+                bucket_start = (c[0] // bucket_ms) * bucket_ms
+                if oldest_open is not None and bucket_start < oldest_open:
+                    self._seeded.discard(symbol)
+                    logger.warning(
+                        f"[STATE] symbol={symbol} resample 1m->{to_tf} candle={c[0]} behind open bucket; "
+                        f"falling back to DB resampling"
+                    )
+                    return None
+                buckets.setdefault(bucket_start, {})[c[0]] = list(c)
+                touched.add(bucket_start)
+            changed[to_tf] = [self._aggregate(bucket_start, buckets[bucket_start]) for bucket_start in sorted(touched)]
+            # Everything but the newest bucket is complete and written; keep just that one open
+            newest = max(buckets) if buckets else None
+            for bucket_start in [b for b in buckets if b != newest]:
+                del buckets[bucket_start]
+        return changed
+
+    @staticmethod
+    def _aggregate(bucket_start: int, members: Dict[int, List]) -> List:
+        rows = [members[ts] for ts in sorted(members)]
+        return [
+            bucket_start,
+            float(rows[0][1]),
+            max(float(r[2]) for r in rows),
+            min(float(r[3]) for r in rows),
+            float(rows[-1][4]),
+            sum(float(r[5]) for r in rows),
+        ]
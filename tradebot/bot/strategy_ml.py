@@ -14,7 +14,7 @@ from typing import Dict, List, Any, Optional
 import joblib
 import numpy as np
 
-from .features import build_features, FEATURE_NAMES
+from .features import build_latest_features, live_rows, FEATURE_NAMES, OhlcvInput
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +49,7 @@ def compute_ml_signal(
     *,
     symbol: str,
     timeframe: str,
-    ohlcv_rows: List[Dict[str, Any]],
+    ohlcv_rows: OhlcvInput,
     model_path: Path,
     lookback: int = 60,
 ) -> MlSignal:
@@ -59,13 +59,49 @@ def compute_ml_signal(
     Args:
         symbol: Trading pair (for logging).
         timeframe: Timeframe (for logging).
-        ohlcv_rows: Full OHLCV rows (chronological), need at least lookback.
+        ohlcv_rows: Full OHLCV rows (chronological), need at least live_rows(lookback)
+            (the newest candle's features read the candles before it).
+            Dict rows or a structured array from Database.get_ohlcv_arrays.
         model_path: Path to .pkl model file.
         lookback: Feature lookback window (must match training).
 
     Returns:
         MlSignal with should_be_long, confidence (proba of class 1).
     """
+    if len(ohlcv_rows) < live_rows(lookback):
+        raise ValueError(f"Need at least {live_rows(lookback)} OHLCV rows, got {len(ohlcv_rows)}")
+    return compute_ml_signals(
+        timeframe=timeframe,
+        windows={symbol: ohlcv_rows},
+        model_path=model_path,
+        lookback=lookback,
+    )[symbol]
+
+
+def compute_ml_signals(
+    *,
+    timeframe: str,
+    windows: Dict[str, OhlcvInput],
+    model_path: Path,
+    lookback: int = 60,
+) -> Dict[str, MlSignal]:
+    """
+    Compute ML signals for many symbols with one model call.
+
+    The newest feature row of every symbol is stacked into one matrix and scored with a
+    single predict_proba; the predicted class is the argmax of the probabilities (what
+    clf.predict would return), so there is no second traversal of the forest.
+
+    Args:
+        timeframe: Timeframe (for logging).
+        windows: {symbol: chronological OHLCV rows}; each needs at least live_rows(lookback).
+            Only the newest candle's features are computed (build_latest_features).
+        model_path: Path to .pkl model file.
+        lookback: Feature lookback window (must match training).
+
+    Returns:
+        {symbol: MlSignal}, same order as windows.
+    """
     model_path = Path(model_path)
     if not model_path.exists():
         raise FileNotFoundError(f"Model file not found: {model_path}")
@@ -78,28 +114,33 @@ def compute_ml_signal(
         raise ValueError(
             f"Feature mismatch: model has {saved_features}, current features are {FEATURE_NAMES}"
         )
-
-    if len(ohlcv_rows) < lookback:
-        raise ValueError(f"Need at least {lookback} OHLCV rows, got {len(ohlcv_rows)}")
-
-    X, timestamps = build_features(ohlcv_rows, lookback=lookback)
-    if len(X) == 0:
-        raise ValueError("No feature rows produced")
-
-    last_row = X[-1:].astype(np.float64)
-    pred = int(clf.predict(last_row)[0])
-    proba = clf.predict_proba(last_row)[0]
+    if not windows:
+        return {}
+
+    symbols = list(windows)
+    X = np.empty((len(symbols), len(FEATURE_NAMES)), dtype=np.float64)
+    need = live_rows(lookback)
+    for i, symbol in enumerate(symbols):
+        rows = windows[symbol]
+        if len(rows) < need:
+            raise ValueError(f"{symbol}: need at least {need} OHLCV rows, got {len(rows)}")
+        X[i] = build_latest_features(rows, lookback=lookback)
+
+    proba = clf.predict_proba(X)
+    classes = list(clf.classes_)
+    pred = np.asarray(clf.classes_)[proba.argmax(axis=1)]
     # Class 1 = long
-    confidence = float(proba[1]) if len(proba) > 1 else float(proba[0])
-
-    latest_close = float(ohlcv_rows[-1]["close"])
-    latest_ts = int(ohlcv_rows[-1]["timestamp"])
-
-    return MlSignal(
-        symbol=symbol,
-        timeframe=timeframe,
-        should_be_long=(pred == 1),
-        confidence=confidence,
-        latest_close=latest_close,
-        latest_ts=latest_ts,
-    )
+    long_col = classes.index(1) if 1 in classes else 0
+
+    out: Dict[str, MlSignal] = {}
+    for i, symbol in enumerate(symbols):
+        rows = windows[symbol]
+        out[symbol] = MlSignal(
+            symbol=symbol,
+            timeframe=timeframe,
+            should_be_long=bool(pred[i] == 1),
+            confidence=float(proba[i, long_col]),
+            latest_close=float(rows[-1]["close"]),
+            latest_ts=int(rows[-1]["timestamp"]),
+        )
+    return out
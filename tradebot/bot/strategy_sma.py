@@ -4,6 +4,10 @@ Simple SMA crossover strategy utilities.
 v1 approach (intentionally simple):
 - Compute fast/slow SMA on recent closes from SQLite.
 - Desired state: long when fast_sma > slow_sma, otherwise flat.
+
+The trader reads the SMAs of all its symbols from streaming state
+(bot.indicators) and compares them as vectors; compute_sma_signal works on
+a close series.
 """
 
 from __future__ import annotations
@@ -46,12 +50,12 @@ def compute_sma_signal(
     Compute the SMA signal from close series.
 
     Args:
-        closes: chronological closes (oldest->newest)
+        closes: chronological closes (oldest->newest); list or NumPy array
         timestamps: matching chronological timestamps (ms)
     """
     if len(closes) != len(timestamps):
         raise ValueError("closes and timestamps length mismatch")
-    if not closes:
+    if len(closes) == 0:
         raise ValueError("no close data")
     if fast_window >= slow_window:
         raise ValueError("fast_window must be < slow_window")
@@ -70,8 +74,7 @@ def compute_sma_signal(
         slow_window=slow_window,
         fast_sma=float(fast),
         slow_sma=float(slow),
-        should_be_long=fast > slow,
+        should_be_long=bool(fast > slow),
         latest_close=latest_close,
         latest_ts=latest_ts,
     )
-
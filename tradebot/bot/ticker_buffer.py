@@ -0,0 +1,126 @@
+"""
+Buffered ticker sink for the collector.
+
+Tickers are queued in memory and written with one executemany + one commit,
+either when the queue reaches `max_rows` or when the oldest queued row is
+older than `max_age_s`. This turns N commits per cycle into one.
+With `skip_unchanged`, a ticker identical to the previous one queued for the
+same symbol (all fields but the timestamp) is dropped instead of stored.
+
+The sink is the Database (a flush is one commit) or the collector's
+IngestWriter (a flush only hands the rows to its queue; the writer reports
+the commit latency). The handoff_ms stats time whichever it is.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .db import Database
+
+logger = logging.getLogger(__name__)
+
+
+class TickerBuffer:
+    """Bounded in-memory queue of (symbol, ticker) rows flushed in a single transaction."""
+
+    def __init__(self, db: Database, max_rows: int = 200, max_age_s: float = 0.0,
+                 skip_unchanged: bool = False):
+        if max_rows <= 0:
+            raise ValueError("max_rows must be > 0")
+        self.db = db
+        self.max_rows = max_rows
+        self.max_age_s = max(0.0, max_age_s)
+        self.skip_unchanged = skip_unchanged
+        self._rows: List[tuple] = []
+        self._last_values: Dict[str, tuple] = {}  # symbol -> ticker fields minus timestamp
+        self._oldest_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self.flush_count = 0
+        self.rows_written = 0
+        self.last_handoff_ms: Optional[float] = None
+        self.max_handoff_ms = 0.0
+        self.skipped_unchanged = 0
+        self.dropped_rows = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._rows)
+
+    def add(self, symbol: str, ticker: Dict[str, Any]) -> bool:
+        """Queue a ticker; flushes immediately once the size threshold is reached.
+
+        Returns False if the ticker was skipped as unchanged.
+        """
+        if self.skip_unchanged:
+            values = Database._ticker_params(symbol, ticker)[2:]
+            if self._last_values.get(symbol) == values:
+                self.skipped_unchanged += 1
+                return False
+            self._last_values[symbol] = values
+        with self._lock:
+            if not self._rows:
+                self._oldest_at = time.monotonic()
+            self._rows.append((symbol, ticker))
+            full = len(self._rows) >= self.max_rows
+        if full:
+            self.flush()
+        return True
+
+    def maybe_flush(self) -> int:
+        """Flush if the oldest queued row has exceeded the age threshold."""
+        oldest = self._oldest_at
+        if oldest is None or time.monotonic() - oldest < self.max_age_s:
+            return 0
+        return self.flush()
+
+    def flush(self) -> int:
+        """Write every queued row in one transaction. Returns the number of rows written."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._oldest_at = None
+        if not rows:
+            return 0
+
+        start = time.perf_counter()
+        try:
+            written = self.db.insert_tickers(rows)
+        except Exception:
+            # Put the rows back (bounded) so a transient error does not lose them
+            with self._lock:
+                requeued = rows + self._rows
+                dropped = max(0, len(requeued) - self.max_rows)
+                self._rows = requeued[dropped:]
+                self._oldest_at = self._oldest_at or time.monotonic()
+            if dropped:
+                self.dropped_rows += dropped
+                logger.warning(
+                    f"[TICKERS] requeue exceeds max_rows={self.max_rows}; oldest rows dropped={dropped} "
+                    f"dropped_total={self.dropped_rows}"
+                )
+            raise
+        handoff_ms = (time.perf_counter() - start) * 1000
+        self.flush_count += 1
+        self.rows_written += written
+        self.last_handoff_ms = handoff_ms
+        self.max_handoff_ms = max(self.max_handoff_ms, handoff_ms)
+        logger.info(
+            f"[TICKERS] flushed={written} handoff_ms={handoff_ms:.1f} queue_depth={self.queue_depth} "
+            f"flushes={self.flush_count} skipped_unchanged={self.skipped_unchanged}"
+        )
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "flush_count": self.flush_count,
+            "rows_written": self.rows_written,
+            "last_handoff_ms": self.last_handoff_ms,
+            "max_handoff_ms": self.max_handoff_ms,
+            "skipped_unchanged": self.skipped_unchanged,
+            "dropped_rows": self.dropped_rows,
+        }
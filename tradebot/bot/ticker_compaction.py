@@ -0,0 +1,103 @@
+"""
+Ticker compaction: roll old raw tickers up into per-interval summaries.
+
+Raw tickers older than TICKER_COMPACT_AFTER_DAYS are read in pages of whole
+buckets, summarised (samples, first/last timestamp, first/last/min/max of
+bid, ask and last) into `ticker_summaries`, and deleted in the same short
+transaction. Each transaction touches at most `batch_size` rows, so the
+collector's writes never wait long on the lock.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+from .config import TICKER_COMPACT_AFTER_DAYS, TICKER_SUMMARY_INTERVAL
+from .db import Database
+
+logger = logging.getLogger(__name__)
+
+
+def _first_last_min_max(values: Sequence[Optional[float]]) -> tuple:
+    present = [v for v in values if v is not None]
+    return (
+        values[0],
+        values[-1],
+        min(present) if present else None,
+        max(present) if present else None,
+    )
+
+
+def summarize_tickers(rows: List[tuple], interval_ms: int) -> List[tuple]:
+    """
+    Summarise ascending (timestamp, bid, ask, last) rows per interval bucket
+
+    Returns tuples matching ticker_summaries columns after (symbol, interval_ms):
+    (bucket_start, samples, first_ts, last_ts, bid_first, bid_last, bid_min, bid_max, ask_..., last_...)
+    """
+    buckets: Dict[int, List[tuple]] = {}
+    for row in rows:
+        buckets.setdefault((row[0] // interval_ms) * interval_ms, []).append(row)
+    summaries = []
+    for bucket_start, bucket_rows in buckets.items():
+        summary = (bucket_start, len(bucket_rows), bucket_rows[0][0], bucket_rows[-1][0])
+        for col in (1, 2, 3):
+            summary += _first_last_min_max([r[col] for r in bucket_rows])
+        summaries.append(summary)
+    return summaries
+
+
+def compact_symbol(db: Database, symbol: str, cutoff_ms: int, interval_ms: int,
+                   batch_size: int = 5000, pause_s: float = 0.0) -> Dict[str, int]:
+    """Compact raw tickers of one symbol older than cutoff_ms (a bucket boundary)"""
+    deleted = buckets = 0
+    start: Optional[int] = None
+    while True:
+        rows = db.get_tickers_range(symbol, start_time=start, end_time=cutoff_ms - 1, limit=batch_size)
+        if not rows:
+            break
+        if len(rows) == batch_size:
+            # Only summarise whole buckets; the last one may continue past this page
+            last_bucket = (rows[-1][0] // interval_ms) * interval_ms
+            complete = [r for r in rows if r[0] < last_bucket]
+            if complete:
+                rows, end = complete, last_bucket - 1
+            else:
+                end = last_bucket + interval_ms - 1
+                rows = db.get_tickers_range(symbol, start_time=start, end_time=end)
+        else:
+            end = cutoff_ms - 1
+
+        summaries = summarize_tickers(rows, interval_ms)
+        deleted += db.replace_tickers_with_summaries(symbol, interval_ms, summaries, rows[0][0], end)
+        buckets += len(summaries)
+        start = end + 1
+        if pause_s > 0:
+            time.sleep(pause_s)
+    return {"deleted": deleted, "buckets": buckets}
+
+
+def compact_tickers(db: Database, older_than_days: int = TICKER_COMPACT_AFTER_DAYS,
+                    interval: str = TICKER_SUMMARY_INTERVAL, batch_size: int = 5000,
+                    pause_s: float = 0.0) -> Dict[str, int]:
+    """Compact raw tickers of every symbol older than `older_than_days` into `interval` summaries"""
+    started = time.time()
+    interval_ms = db._timeframe_to_ms(interval)
+    cutoff_ms = int((time.time() - older_than_days * 86400) * 1000)
+    cutoff_ms = (cutoff_ms // interval_ms) * interval_ms
+    totals = {"deleted": 0, "buckets": 0}
+    for symbol in db.get_ticker_symbols():
+        result = compact_symbol(db, symbol, cutoff_ms, interval_ms, batch_size, pause_s)
+        logger.info(
+            f"[TICKERS] compacted symbol={symbol} interval={interval} "
+            f"deleted={result['deleted']} buckets={result['buckets']}"
+        )
+        for key in totals:
+            totals[key] += result[key]
+    logger.info(
+        f"[TICKERS] compaction done deleted={totals['deleted']} buckets={totals['buckets']} "
+        f"elapsed_s={time.time() - started:.1f}"
+    )
+    return totals
@@ -12,12 +12,15 @@ import json
 import logging
 import signal
 import sys
+import threading
 import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Iterable
 
+import numpy as np
+
 from .config import (
     BASE_DIR,
     LOGS_DIR,
@@ -34,6 +37,9 @@ from .config import (
     SMA_FAST_WINDOW as ENV_SMA_FAST,
     SMA_SLOW_WINDOW as ENV_SMA_SLOW,
     TRADER_INTERVAL as ENV_TRADER_INTERVAL,
+    TRADER_TRIGGER as ENV_TRADER_TRIGGER,
+    TRADER_EVENT_POLL_MS,
+    TRADER_EVENT_FALLBACK_S,
     PAPER_FEE_RATE as ENV_PAPER_FEE_RATE,
     DAILY_BUDGET_QUOTE as ENV_DAILY_BUDGET_QUOTE,
     STRATEGY as ENV_STRATEGY,
@@ -41,12 +47,14 @@ from .config import (
     ML_LOOKBACK as ENV_ML_LOOKBACK,
     ML_CONFIDENCE_THRESHOLD as ENV_ML_CONFIDENCE_THRESHOLD,
 )
+from .candle_events import CandleEventListener
 from .db import Database
 from .exchange import Exchange
+from .features import live_rows
+from .indicators import IndicatorBook
 from .paper import paper_buy_fixed_quote, paper_sell_all
 from .risk import enforce_min_notional, fixed_quote_sizing
-from .strategy_sma import compute_sma_signal
-from .strategy_ml import compute_ml_signal
+from .strategy_ml import compute_ml_signals
 
 
 log_file = LOGS_DIR / f"trader_{datetime.now().strftime('%Y%m%d')}.log"
@@ -115,6 +123,7 @@ class TraderConfig:
     sma_fast: int
     sma_slow: int
     interval_s: int
+    trigger: str  # events | poll
     paper_fee_rate: float
     strategy: str  # sma | ml
     model_path: Optional[Path]  # required when strategy=ml
@@ -125,6 +134,7 @@ class TraderConfig:
 class Trader:
     def __init__(self, *, args: Optional[argparse.Namespace] = None, config_overrides: Optional[dict] = None):
         self.running = False
+        self._stop_event = threading.Event()
         self.exchange = Exchange()
         self.db = Database()
         self.setup_signal_handlers()
@@ -135,6 +145,8 @@ class Trader:
             raise SystemExit("No valid symbols to trade. Check your input / exchange.")
 
         self.db.create_tables()
+        # SMA state per symbol: seeded once, then advanced with only the new candles
+        self.indicators = IndicatorBook(sma_windows=(self.cfg.sma_fast, self.cfg.sma_slow))
 
     def setup_signal_handlers(self):
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -143,6 +155,7 @@ class Trader:
     def _signal_handler(self, signum, frame):
         logger.info(f"Received signal {signum}, shutting down gracefully...")
         self.running = False
+        self._stop_event.set()
 
     def _build_config(
         self, *, args: Optional[argparse.Namespace] = None, config_overrides: dict
@@ -198,6 +211,9 @@ class Trader:
         sma_slow = int(sma_slow)
         interval_s = _get("interval", "trader_interval", int(ENV_TRADER_INTERVAL), lambda: _prompt_int("Trader loop interval (seconds)", int(ENV_TRADER_INTERVAL)))
         interval_s = int(interval_s)
+        trigger = _get("trigger", "trader_trigger", ENV_TRADER_TRIGGER, lambda: _prompt_str("Trigger (events/poll)", ENV_TRADER_TRIGGER))
+        if isinstance(trigger, str):
+            trigger = trigger.lower()
         paper_fee_rate = _get("paper_fee_rate", "paper_fee_rate", float(ENV_PAPER_FEE_RATE), lambda: _prompt_float("Paper fee rate (e.g., 0.001 = 0.1%)", float(ENV_PAPER_FEE_RATE)))
         paper_fee_rate = float(paper_fee_rate)
 
@@ -242,6 +258,9 @@ class Trader:
         if order_type not in {"market", "limit"}:
             logger.warning(f"Invalid order_type '{order_type}', defaulting to market")
             order_type = "market"
+        if trigger not in {"events", "poll"}:
+            logger.warning(f"Invalid trigger '{trigger}', defaulting to poll")
+            trigger = "poll"
 
         # Timeframe validation: warn if not in RESAMPLE_TO or base TIMEFRAME
         valid_tfs = set(RESAMPLE_TO) | {ENV_TIMEFRAME}
@@ -271,6 +290,7 @@ class Trader:
             sma_fast=sma_fast,
             sma_slow=sma_slow,
             interval_s=interval_s,
+            trigger=trigger,
             paper_fee_rate=paper_fee_rate,
             strategy=strategy,
             model_path=model_path,
@@ -280,77 +300,96 @@ class Trader:
 
     def _validate_symbols(self, symbols: Iterable[str]) -> list[str]:
         out: list[str] = []
-        for s in symbols:
-            if self.exchange.validate_symbol(s):
+        for s, available in self.exchange.validate_symbols(symbols).items():
+            if available:
                 out.append(s)
                 logger.info(f"[TRADER] symbol={s} status=available")
             else:
                 logger.warning(f"[TRADER] symbol={s} status=unavailable exchange={EXCHANGE_NAME}")
         return out
 
-    def _ensure_has_data(self, symbol: str) -> bool:
-        need = self.cfg.ml_lookback if self.cfg.strategy == "ml" else self.cfg.sma_slow
-        if self.cfg.strategy == "ml":
-            rows = self.db.get_recent_ohlcv(symbol, self.cfg.timeframe, limit=need)
-        else:
-            rows = self.db.get_recent_closes(symbol, self.cfg.timeframe, limit=need)
-        if len(rows) < need:
-            logger.warning(
-                f"[TRADER] symbol={symbol} status=insufficient_data have={len(rows)} need={need} "
-                f"timeframe={self.cfg.timeframe}"
-            )
-            return False
-        return True
+    def _evaluate(self, symbols: list[str]) -> dict[str, tuple[bool, float, int]]:
+        """
+        Signals for all `symbols` from batched reads
 
-    def _desired_long(self, symbol: str) -> Optional[bool]:
+        Returns:
+            {symbol: (want_long, latest close, latest candle ts)}; symbols without enough data are absent
+        """
         if self.cfg.strategy == "sma":
-            rows = self.db.get_recent_closes(symbol, self.cfg.timeframe, limit=self.cfg.sma_slow)
-            if len(rows) < self.cfg.sma_slow:
-                return None
-            closes = [float(r["close"]) for r in rows]
-            tss = [int(r["timestamp"]) for r in rows]
-            sig = compute_sma_signal(
-                symbol=symbol,
-                timeframe=self.cfg.timeframe,
-                closes=closes,
-                timestamps=tss,
-                fast_window=self.cfg.sma_fast,
-                slow_window=self.cfg.sma_slow,
-            )
+            return self._evaluate_sma(symbols)
+        return self._evaluate_ml(symbols)
+
+    def _evaluate_sma(self, symbols: list[str]) -> dict[str, tuple[bool, float, int]]:
+        # One read advances the streaming SMA state of every symbol (seeding new ones)
+        states = self.indicators.update_many(self.db, symbols, self.cfg.timeframe)
+        ready: list[str] = []
+        for symbol in symbols:
+            state = states[symbol]
+            if state.count < self.cfg.sma_slow:
+                logger.warning(
+                    f"[TRADER] symbol={symbol} status=insufficient_data have={state.count} need={self.cfg.sma_slow} "
+                    f"timeframe={self.cfg.timeframe}"
+                )
+                continue
+            ready.append(symbol)
+        if not ready:
+            return {}
+
+        # The crossover itself, vectorized across symbols
+        fast = np.array([states[s].sma_value(self.cfg.sma_fast) for s in ready], dtype=np.float64)
+        slow = np.array([states[s].sma_value(self.cfg.sma_slow) for s in ready], dtype=np.float64)
+        close = np.array([states[s].last_close for s in ready], dtype=np.float64)
+        want = fast > slow
+
+        out: dict[str, tuple[bool, float, int]] = {}
+        for i, symbol in enumerate(ready):
             logger.info(
-                f"[SIGNAL] symbol={symbol} tf={self.cfg.timeframe} strategy=sma close={sig.latest_close:.6f} "
-                f"fast={sig.fast_sma:.6f} slow={sig.slow_sma:.6f} should_long={int(sig.should_be_long)}"
+                f"[SIGNAL] symbol={symbol} tf={self.cfg.timeframe} strategy=sma close={close[i]:.6f} "
+                f"fast={fast[i]:.6f} slow={slow[i]:.6f} should_long={int(want[i])}"
             )
-            return sig.should_be_long
+            out[symbol] = (bool(want[i]), float(close[i]), int(states[symbol].last_ts))
+        return out
 
-        # strategy == "ml"
-        rows = self.db.get_recent_ohlcv(symbol, self.cfg.timeframe, limit=self.cfg.ml_lookback)
-        if len(rows) < self.cfg.ml_lookback:
-            return None
-        sig = compute_ml_signal(
-            symbol=symbol,
+    def _evaluate_ml(self, symbols: list[str]) -> dict[str, tuple[bool, float, int]]:
+        # The newest candle's features read the candles before it (as in training)
+        need = live_rows(self.cfg.ml_lookback)
+        windows = self.db.get_recent_ohlcv_many(symbols, self.cfg.timeframe, limit=need)
+        ready: dict[str, np.ndarray] = {}
+        for symbol in symbols:
+            rows = windows.get(symbol)
+            have = 0 if rows is None else len(rows)
+            if have < need:
+                logger.warning(
+                    f"[TRADER] symbol={symbol} status=insufficient_data have={have} need={need} "
+                    f"timeframe={self.cfg.timeframe}"
+                )
+                continue
+            ready[symbol] = rows
+        if not ready:
+            return {}
+
+        # One predict_proba for every symbol
+        signals = compute_ml_signals(
             timeframe=self.cfg.timeframe,
-            ohlcv_rows=rows,
+            windows=ready,
             model_path=self.cfg.model_path,
             lookback=self.cfg.ml_lookback,
         )
-        logger.info(
-            f"[SIGNAL] symbol={symbol} tf={self.cfg.timeframe} strategy=ml close={sig.latest_close:.6f} "
-            f"confidence={sig.confidence:.4f} should_long={int(sig.should_be_long)}"
-        )
-        if not sig.should_be_long:
-            return False
-        if sig.confidence < self.cfg.ml_confidence_threshold:
+        out: dict[str, tuple[bool, float, int]] = {}
+        for symbol, sig in signals.items():
             logger.info(
-                f"[TRADER] symbol={symbol} action=skip confidence={sig.confidence:.4f} "
-                f"below threshold={self.cfg.ml_confidence_threshold}"
+                f"[SIGNAL] symbol={symbol} tf={self.cfg.timeframe} strategy=ml close={sig.latest_close:.6f} "
+                f"confidence={sig.confidence:.4f} should_long={int(sig.should_be_long)}"
             )
-            return False
-        return True
-
-    def _is_long(self, symbol: str) -> bool:
-        pos = self.db.get_position(mode=self.cfg.mode, exchange=EXCHANGE_NAME, symbol=symbol)
-        return bool(pos and float(pos.get("base_qty") or 0.0) > 0)
+            want_long = sig.should_be_long
+            if want_long and sig.confidence < self.cfg.ml_confidence_threshold:
+                logger.info(
+                    f"[TRADER] symbol={symbol} action=skip confidence={sig.confidence:.4f} "
+                    f"below threshold={self.cfg.ml_confidence_threshold}"
+                )
+                want_long = False
+            out[symbol] = (want_long, sig.latest_close, sig.latest_ts)
+        return out
 
     def _live_buy(self, *, symbol: str, quote_amount: float, price_hint: float, ts: int) -> None:
         enforce_min_notional(quote_amount=quote_amount)
@@ -515,79 +554,81 @@ class Trader:
 
         logger.info(f"[LIVE] symbol={symbol} side={side} status={status} exchange_order_id={exchange_order_id}")
 
-    def run_once(self):
-        for symbol in self.valid_symbols:
-            try:
-                if not self._ensure_has_data(symbol):
-                    continue
-
-                want_long = self._desired_long(symbol)
-                if want_long is None:
-                    continue
-
-                is_long = self._is_long(symbol)
-                latest = self.db.get_latest_close(symbol, self.cfg.timeframe)
-                if not latest:
-                    continue
-                price = float(latest["close"])
-                ts = int(latest["timestamp"])
-
-                if want_long and not is_long:
-                    if self.cfg.mode == "paper":
-                        enforce_min_notional(quote_amount=self.cfg.fixed_quote_amount)
-                        if ENV_DAILY_BUDGET_QUOTE is not None and ENV_DAILY_BUDGET_QUOTE > 0:
-                            spent_today = self.db.get_paper_spent_today()
-                            if spent_today + self.cfg.fixed_quote_amount > ENV_DAILY_BUDGET_QUOTE:
-                                logger.info(
-                                    f"[TRADER] symbol={symbol} action=skip_buy reason=daily_budget "
-                                    f"spent_today={spent_today:.2f} budget={ENV_DAILY_BUDGET_QUOTE}"
-                                )
-                                continue
-                        strat = "ml_crossover" if self.cfg.strategy == "ml" else "sma_crossover"
-                        reason = "ml_long" if self.cfg.strategy == "ml" else "sma_long"
-                        paper_buy_fixed_quote(
-                            db=self.db,
-                            exchange=EXCHANGE_NAME,
-                            symbol=symbol,
-                            quote_amount=self.cfg.fixed_quote_amount,
-                            price=price,
-                            fee_rate=self.cfg.paper_fee_rate,
-                            timeframe=self.cfg.timeframe,
-                            strategy=strat,
-                            signal="long",
-                            reason=reason,
-                            order_type=self.cfg.order_type,
-                            ts=ts,
-                        )
-                    else:
-                        self._live_buy(symbol=symbol, quote_amount=self.cfg.fixed_quote_amount, price_hint=price, ts=ts)
-
-                elif (not want_long) and is_long:
-                    if self.cfg.mode == "paper":
-                        strat = "ml_crossover" if self.cfg.strategy == "ml" else "sma_crossover"
-                        reason = "ml_flat" if self.cfg.strategy == "ml" else "sma_flat"
-                        paper_sell_all(
-                            db=self.db,
-                            exchange=EXCHANGE_NAME,
-                            symbol=symbol,
-                            price=price,
-                            fee_rate=self.cfg.paper_fee_rate,
-                            timeframe=self.cfg.timeframe,
-                            strategy=strat,
-                            signal="flat",
-                            reason=reason,
-                            order_type=self.cfg.order_type,
-                            ts=ts,
-                        )
-                    else:
-                        self._live_sell(symbol=symbol, price_hint=price, ts=ts)
-
-                else:
-                    logger.info(f"[TRADER] symbol={symbol} action=none want_long={int(want_long)} is_long={int(is_long)}")
+    def run_once(self, symbols: Optional[Iterable[str]] = None):
+        """Evaluate and act on `symbols` (default: every valid symbol)"""
+        symbols = list(self.valid_symbols if symbols is None else symbols)
+        if not symbols:
+            return
+        try:
+            signals = self._evaluate(symbols)
+            positions = self.db.get_positions(mode=self.cfg.mode, exchange=EXCHANGE_NAME, symbols=symbols)
+        except Exception as e:
+            logger.error(f"[TRADER] symbols={len(symbols)} error={e}", exc_info=True)
+            return
 
+        for symbol, (want_long, price, ts) in signals.items():
+            pos = positions.get(symbol)
+            is_long = bool(pos and float(pos.get("base_qty") or 0.0) > 0)
+            try:
+                self._act(symbol=symbol, want_long=want_long, is_long=is_long, price=price, ts=ts)
             except Exception as e:
                 logger.error(f"[TRADER] symbol={symbol} error={e}", exc_info=True)
 
+    def _act(self, *, symbol: str, want_long: bool, is_long: bool, price: float, ts: int) -> None:
+        """Place the order (if any) that moves `symbol` from is_long to want_long"""
+        if want_long and not is_long:
+            if self.cfg.mode == "paper":
+                enforce_min_notional(quote_amount=self.cfg.fixed_quote_amount)
+                if ENV_DAILY_BUDGET_QUOTE is not None and ENV_DAILY_BUDGET_QUOTE > 0:
+                    spent_today = self.db.get_paper_spent_today()
+                    if spent_today + self.cfg.fixed_quote_amount > ENV_DAILY_BUDGET_QUOTE:
+                        logger.info(
+                            f"[TRADER] symbol={symbol} action=skip_buy reason=daily_budget "
+                            f"spent_today={spent_today:.2f} budget={ENV_DAILY_BUDGET_QUOTE}"
+                        )
+                        return
+                strat = "ml_crossover" if self.cfg.strategy == "ml" else "sma_crossover"
+                reason = "ml_long" if self.cfg.strategy == "ml" else "sma_long"
+                paper_buy_fixed_quote(
+                    db=self.db,
+                    exchange=EXCHANGE_NAME,
+                    symbol=symbol,
+                    quote_amount=self.cfg.fixed_quote_amount,
+                    price=price,
+                    fee_rate=self.cfg.paper_fee_rate,
+                    timeframe=self.cfg.timeframe,
+                    strategy=strat,
+                    signal="long",
+                    reason=reason,
+                    order_type=self.cfg.order_type,
+                    ts=ts,
+                )
+            else:
+                self._live_buy(symbol=symbol, quote_amount=self.cfg.fixed_quote_amount, price_hint=price, ts=ts)
+
+        elif (not want_long) and is_long:
+            if self.cfg.mode == "paper":
+                strat = "ml_crossover" if self.cfg.strategy == "ml" else "sma_crossover"
+                reason = "ml_flat" if self.cfg.strategy == "ml" else "sma_flat"
+                paper_sell_all(
+                    db=self.db,
+                    exchange=EXCHANGE_NAME,
+                    symbol=symbol,
+                    price=price,
+                    fee_rate=self.cfg.paper_fee_rate,
+                    timeframe=self.cfg.timeframe,
+                    strategy=strat,
+                    signal="flat",
+                    reason=reason,
+                    order_type=self.cfg.order_type,
+                    ts=ts,
+                )
+            else:
+                self._live_sell(symbol=symbol, price_hint=price, ts=ts)
+
+        else:
+            logger.info(f"[TRADER] symbol={symbol} action=none want_long={int(want_long)} is_long={int(is_long)}")
+
     def run(self):
         logger.info("=" * 60)
         logger.info("Trader Starting")
@@ -603,18 +644,25 @@ class Trader:
         else:
             logger.info(f"ML model: {self.cfg.model_path}")
             logger.info(f"ML lookback: {self.cfg.ml_lookback} confidence_threshold: {self.cfg.ml_confidence_threshold}")
-        logger.info(f"Interval: {self.cfg.interval_s}s")
+        if self.cfg.trigger == "events":
+            logger.info(f"Trigger: candle closes (candle_events; full sweep after {TRADER_EVENT_FALLBACK_S}s without events)")
+        else:
+            logger.info(f"Interval: {self.cfg.interval_s}s")
         logger.info("=" * 60)
 
         self.running = True
         try:
+            if self.cfg.trigger == "events":
+                self._run_on_events()
+                return
             while self.running:
                 start = time.time()
                 self.run_once()
                 elapsed = time.time() - start
                 sleep_s = max(0.0, self.cfg.interval_s - elapsed)
                 if sleep_s > 0:
-                    time.sleep(sleep_s)
+                    if self._stop_event.wait(sleep_s):
+                        break
                 else:
                     logger.warning(f"Trader loop took {elapsed:.2f}s, longer than interval {self.cfg.interval_s}s")
         finally:
@@ -622,6 +670,36 @@ class Trader:
             logger.info("Trader stopped")
 
 
+    def _run_on_events(self):
+        """Evaluate a symbol when the collector logs a closed candle for it on the strategy timeframe"""
+        listener = CandleEventListener(self.db, self.cfg.timeframe, poll_s=TRADER_EVENT_POLL_MS / 1000.0)
+        tf_ms = self.db._timeframe_to_ms(self.cfg.timeframe)
+        # Closes from before startup: one sweep now
+        self.run_once()
+        last_run = time.time()
+        while self.running:
+            timeout = TRADER_EVENT_FALLBACK_S - (time.time() - last_run) if TRADER_EVENT_FALLBACK_S > 0 else 3600.0
+            closed = listener.wait(max(0.0, timeout), self._stop_event)
+            if not self.running:
+                break
+            symbols = [s for s in self.valid_symbols if s in closed]
+            if symbols:
+                now_ms = int(time.time() * 1000)
+                lag_ms = max(now_ms - (closed[s] + tf_ms) for s in symbols)
+                logger.info(
+                    f"[TRADER] trigger=candle_close tf={self.cfg.timeframe} symbols={','.join(symbols)} "
+                    f"close_to_eval_ms={lag_ms}"
+                )
+                self.run_once(symbols)
+                last_run = time.time()
+            elif TRADER_EVENT_FALLBACK_S > 0 and time.time() - last_run >= TRADER_EVENT_FALLBACK_S:
+                logger.warning(
+                    f"[TRADER] trigger=fallback no candle events for {TRADER_EVENT_FALLBACK_S}s; is the collector running?"
+                )
+                self.run_once()
+                last_run = time.time()
+
+
 def _parse_args():
     parser = argparse.ArgumentParser(description="Tradebot Stage B Trader (paper first, guarded live)")
     parser.add_argument("--symbols", type=str, help="Comma-separated symbols (e.g. BTC/USDT,ETH/USDT)")
@@ -633,7 +711,8 @@ def _parse_args():
     parser.add_argument("--fixed-quote", dest="fixed_quote", type=float, help="Fixed quote amount per BUY (USDT)")
     parser.add_argument("--sma-fast", dest="sma_fast", type=int, help="SMA fast window (candles)")
     parser.add_argument("--sma-slow", dest="sma_slow", type=int, help="SMA slow window (candles)")
-    parser.add_argument("--interval", type=int, help="Trader loop interval (seconds)")
+    parser.add_argument("--interval", type=int, help="Trader loop interval (seconds, trigger=poll)")
+    parser.add_argument("--trigger", type=str, choices=["events", "poll"], help="Run on candle-close events or every interval")
     parser.add_argument("--paper-fee-rate", dest="paper_fee_rate", type=float, help="Paper fee rate (e.g. 0.001)")
     parser.add_argument("--config", type=Path, help="Path to YAML/JSON config file")
     parser.add_argument("--no-prompt", dest="no_prompt", action="store_true", help="Use only env/config/CLI; exit if any required value missing")
@@ -1,9 +1,12 @@
 """
 Data validation script - checks data quality and completeness
 """
+import argparse
 import logging
 import sys
 from datetime import datetime, timedelta
+from typing import Optional
+import numpy as np
 from .db import Database
 from .config import SYMBOLS, TIMEFRAME, DB_PATH
 
@@ -53,63 +56,76 @@ class Validator:
         for row in cursor.fetchall():
             logger.info(f"[VALIDATOR] table=ohlcv symbol={row['symbol']} count={row['count']}")
     
-    def check_data_gaps(self, symbol: str, hours: int = 24):
-        """Check for gaps and regressions in data collection"""
+    def check_data_gaps(self, symbol: str, hours: Optional[int] = 24):
+        """Check for gaps and regressions in data collection (hours=None scans full history)"""
         self.db.connect()
-        cursor = self.db.conn.cursor()
         
         # Get timeframe in milliseconds
         timeframe_ms = self._timeframe_to_ms(TIMEFRAME)
         
         # Get data from last N hours
-        end_time = int(datetime.now().timestamp() * 1000)
-        start_time = end_time - (hours * 3600 * 1000)
+        start_time = None
+        if hours:
+            end_time = int(datetime.now().timestamp() * 1000)
+            start_time = end_time - (hours * 3600 * 1000)
+        window = f"window_hours={hours}" if hours else "window=all"
         
-        cursor.execute("""
-            SELECT timestamp 
-            FROM ohlcv 
-            WHERE symbol = ? AND timeframe = ? AND timestamp >= ?
-            ORDER BY timestamp ASC
-        """, (symbol, TIMEFRAME, start_time))
-        
-        timestamps = [row['timestamp'] for row in cursor.fetchall()]
+        # Stream timestamps page by page so years of 1m data fit in constant memory;
+        # only the count and the first 10 examples of each problem are kept.
+        gap_count = 0
+        regression_count = 0
+        gaps = []
+        regressions = []
+        prev_ts = None
+        seen = 0
+        for page in self.db.iter_ohlcv_arrays(symbol, TIMEFRAME, start_time=start_time):
+            timestamps = page['timestamp']
+            seen += len(timestamps)
+            if prev_ts is not None:
+                timestamps = np.concatenate(([prev_ts], timestamps))
+            prev_ts = int(timestamps[-1])
+            if len(timestamps) < 2:
+                continue
+            diffs = np.diff(timestamps)
+            # any gap bigger than one candle interval is suspicious
+            for i in np.flatnonzero(diffs > timeframe_ms):
+                gap_count += 1
+                if len(gaps) < 10:
+                    gap = int(diffs[i])
+                    gaps.append({
+                        'start': int(timestamps[i]),
+                        'end': int(timestamps[i + 1]),
+                        'gap_ms': gap,
+                        'gap_candles': gap / timeframe_ms
+                    })
+            for i in np.flatnonzero(diffs <= 0):
+                regression_count += 1
+                if len(regressions) < 10:
+                    regressions.append({
+                        'prev': int(timestamps[i]),
+                        'curr': int(timestamps[i + 1])
+                    })
         
-        if not timestamps:
-            logger.warning(f"[VALIDATOR] symbol={symbol} timeframe={TIMEFRAME} status=no_data window_hours={hours}")
+        if seen == 0:
+            logger.warning(f"[VALIDATOR] symbol={symbol} timeframe={TIMEFRAME} status=no_data {window}")
             return
         
-        gaps = []
-        regressions = []
-        for i in range(len(timestamps) - 1):
-            gap = timestamps[i + 1] - timestamps[i]
-            if gap > timeframe_ms:  # any gap bigger than one candle interval is suspicious
-                gaps.append({
-                    'start': timestamps[i],
-                    'end': timestamps[i + 1],
-                    'gap_ms': gap,
-                    'gap_candles': gap / timeframe_ms
-                })
-            if timestamps[i + 1] <= timestamps[i]:
-                regressions.append({
-                    'prev': timestamps[i],
-                    'curr': timestamps[i + 1]
-                })
-        
-        if gaps:
-            logger.warning(f"[VALIDATOR] symbol={symbol} timeframe={TIMEFRAME} gaps_detected={len(gaps)}")
-            for gap in gaps[:10]:  # Show first 10 gaps
+        if gap_count:
+            logger.warning(f"[VALIDATOR] symbol={symbol} timeframe={TIMEFRAME} gaps_detected={gap_count}")
+            for gap in gaps:  # Show first 10 gaps
                 start_dt = datetime.fromtimestamp(gap['start'] / 1000)
                 end_dt = datetime.fromtimestamp(gap['end'] / 1000)
                 logger.warning(
                     f"[VALIDATOR] symbol={symbol} gap_start={start_dt.isoformat()} gap_end={end_dt.isoformat()} "
                     f"missing_candles={gap['gap_candles']:.1f}"
                 )
+            logger.warning(f"[VALIDATOR] fill gaps with: python -m bot.backfill --repair --symbol {symbol} --timeframe {TIMEFRAME}")
         else:
             logger.info(f"[VALIDATOR] symbol={symbol} timeframe={TIMEFRAME} gaps_detected=0")
 
-        if regressions:
-            logger.error(f"[VALIDATOR] symbol={symbol} regressions_detected={len(regressions)} (timestamps not strictly increasing)")
-            for reg in regressions[:10]:
+        if regression_count:
+            logger.error(f"[VALIDATOR] symbol={symbol} regressions_detected={regression_count} (timestamps not strictly increasing)")
+            for reg in regressions:
                 prev_dt = datetime.fromtimestamp(reg['prev'] / 1000)
                 curr_dt = datetime.fromtimestamp(reg['curr'] / 1000)
                 logger.error(f"[VALIDATOR] symbol={symbol} regression prev={prev_dt.isoformat()} curr={curr_dt.isoformat()}")
@@ -204,7 +220,7 @@ class Validator:
         
         return value * multipliers.get(unit, 60 * 1000)
     
-    def run_all_checks(self):
+    def run_all_checks(self, gap_window_hours: Optional[int] = 24):
         """Run all validation checks"""
         logger.info("=" * 60)
         logger.info("Data Validation Report")
@@ -226,10 +242,10 @@ class Validator:
             symbol = symbol.strip()
             self.check_data_quality(symbol)
         
-        logger.info("[VALIDATOR] step=data_gaps window_hours=24")
+        logger.info(f"[VALIDATOR] step=data_gaps window_hours={gap_window_hours or 'all'}")
         for symbol in SYMBOLS:
             symbol = symbol.strip()
-            self.check_data_gaps(symbol, hours=24)
+            self.check_data_gaps(symbol, hours=gap_window_hours)
         
         self.db.close()
         logger.info("=" * 60)
@@ -238,8 +254,13 @@ class Validator:
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Validate collected market data")
+    parser.add_argument("--hours", type=int, default=24,
+                        help="Gap-check window in hours (0 = full history, streamed)")
+    args = parser.parse_args()
+    
     validator = Validator()
-    validator.run_all_checks()
+    validator.run_all_checks(gap_window_hours=args.hours or None)
 
 
 if __name__ == "__main__":
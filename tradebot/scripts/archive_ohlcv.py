@@ -0,0 +1,47 @@
+"""
+Move old candles out of SQLite into compressed per-month archive segments.
+
+Reads stay transparent (Database.get_ohlcv / get_ohlcv_arrays merge the archive),
+so this can run from cron next to the collector.
+Run from project root: python scripts/archive_ohlcv.py [--days 30] [--timeframes 1m] [--vacuum]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.db import Database
+from bot.archive import archive_old_candles
+from bot.config import ARCHIVE_AFTER_DAYS, ARCHIVE_TIMEFRAMES, ARCHIVE_CODEC
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive OHLCV older than N days into compressed segments")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="Archive complete months older than this")
+    parser.add_argument("--timeframes", type=str, default=",".join(ARCHIVE_TIMEFRAMES),
+                        help="Comma-separated timeframes to archive")
+    parser.add_argument("--codec", choices=["zlib", "lzma"], default=ARCHIVE_CODEC, help="Segment compression")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the DB file")
+    args = parser.parse_args()
+
+    timeframes = [t.strip() for t in args.timeframes.split(",") if t.strip()]
+    db = Database()
+    db.create_tables()
+    totals = archive_old_candles(db, older_than_days=args.days, timeframes=timeframes, codec=args.codec)
+    if args.vacuum and totals["moved"]:
+        db.conn.execute("VACUUM")
+        logger.info("[ARCHIVE] vacuum done")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Collector throughput benchmark against the offline replay exchange.
+
+Runs full collection cycles (OHLCV, resample, tickers) for N synthetic
+symbols with EXCHANGE_NAME=replay, so results are repeatable and need no
+network: the candles are a seeded random walk and request latency/errors are
+simulated. The first cycle is the initial fill; the rest are steady state.
+Run from project root:
+    python scripts/bench_collector.py --symbols 200 --cycles 5 --concurrency 8 --latency-ms 50
+Other settings (INGEST_WRITER, RESAMPLE_TO, TICKER_FETCH_MODE, ...) come from the environment / .env.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark collector cycles against the replay exchange")
+    parser.add_argument("--symbols", type=int, default=50, help="Number of synthetic symbols (SYN000/USDT, ...)")
+    parser.add_argument("--cycles", type=int, default=5, help="Collection cycles to run")
+    parser.add_argument("--timeframes", type=str, default="1m", help="Comma-separated timeframes to collect")
+    parser.add_argument("--concurrency", type=int, default=1, help="COLLECTOR_CONCURRENCY")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Latency jitter (+/-)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with a 429")
+    parser.add_argument("--seed", type=int, default=42, help="Replay seed (same seed = same candles)")
+    parser.add_argument("--db", type=Path, help="DB path (default: temporary file)")
+    parser.add_argument("--log-level", type=str, default="WARNING", help="Collector log level (console only)")
+    args = parser.parse_args()
+
+    db_path = args.db or Path(tempfile.mkdtemp(prefix="bench_collector_")) / "bench.sqlite"
+    # bot.config reads the environment at import time, so set the replay backend up first
+    os.environ.update({
+        "EXCHANGE_NAME": "replay",
+        "DB_PATH": str(db_path),
+        "REPLAY_MARKETS": str(args.symbols),
+        "REPLAY_SEED": str(args.seed),
+        "REPLAY_LATENCY_MS": str(args.latency_ms),
+        "REPLAY_LATENCY_JITTER_MS": str(args.jitter_ms),
+        "REPLAY_ERROR_RATE": str(args.error_rate),
+    })
+    os.environ.setdefault("RATE_LIMIT_SHARED", "false")
+    # Configured before bot.collector is imported: its basicConfig is then a no-op and no daily log file is created
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from bot.collector import Collector
+
+    symbols = [f"SYN{i:03d}/USDT" for i in range(args.symbols)]
+    timeframes = [t.strip() for t in args.timeframes.split(",") if t.strip()]
+    collector = Collector(symbols=symbols, timeframes=timeframes, concurrency=args.concurrency)
+    collector.db.create_tables()
+    replay = collector.exchange.exchange
+    print(f"[BENCH] db={db_path} symbols={len(collector.valid_symbols)} timeframes={','.join(timeframes)} "
+          f"concurrency={args.concurrency} latency_ms={args.latency_ms:g} error_rate={args.error_rate:g}")
+
+    steady = []
+    try:
+        for cycle in range(args.cycles):
+            requests_before = replay.stats()["requests"]
+            rows_before = collector.writer.rows_written if collector.writer else None
+            t0 = time.perf_counter()
+            collector.run_once(timeframes)
+            if collector.writer is not None:
+                # Wait for the writer so a cycle's time includes its commits
+                while collector.writer.queue_depth:
+                    time.sleep(0.005)
+            elapsed = time.perf_counter() - t0
+            requests = replay.stats()["requests"] - requests_before
+            rows = f" rows_written={collector.writer.rows_written - rows_before}" if collector.writer else ""
+            print(f"[BENCH] cycle={cycle} {'fill' if cycle == 0 else 'steady'} elapsed_s={elapsed:.3f} "
+                  f"requests={requests} req_per_s={requests / max(elapsed, 1e-9):.0f}{rows}")
+            if cycle:
+                steady.append(elapsed)
+    finally:
+        if collector.writer is not None:
+            collector.writer.close()
+        collector.db.close()
+
+    stats = replay.stats()
+    print(f"[BENCH] requests={stats['requests']} injected_errors={stats['injected_errors']} "
+          f"by_endpoint={stats['by_endpoint']}")
+    if steady:
+        steady.sort()
+        print(f"[BENCH] steady_cycles={len(steady)} p50_s={steady[len(steady) // 2]:.3f} max_s={steady[-1]:.3f} "
+              f"symbols_per_s={args.symbols / steady[len(steady) // 2]:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+ML inference latency: one predict_proba for all symbols vs per-symbol calls.
+
+Scores the newest candle of N synthetic symbols with the trained model, two ways:
+  per_symbol - what the trader did before: predict + predict_proba on a 1-row matrix per symbol
+  batched    - compute_ml_signals: one stacked matrix, one predict_proba
+and checks both give the same class and confidence. Run it on the target box (e.g. the Pi).
+Run from project root:
+    python scripts/bench_ml_inference.py --model models/ml_strategy_v1.pkl --symbols 10,50,200 --repeat 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.db import OHLCV_DTYPE
+from bot.features import build_features, live_rows
+from bot.strategy_ml import _load_model, compute_ml_signals
+
+
+def _synthetic_window(rng: np.random.Generator, n: int) -> np.ndarray:
+    rows = np.zeros(n, dtype=OHLCV_DTYPE)
+    closes = 100.0 * np.cumprod(1 + rng.normal(0, 0.003, n))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    rows["timestamp"] = 1_700_000_000_000 + np.arange(n, dtype=np.int64) * 60_000
+    rows["open"] = opens
+    rows["close"] = closes
+    rows["high"] = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.002, n))
+    rows["low"] = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.002, n))
+    rows["volume"] = rng.uniform(1, 100, n)
+    return rows
+
+
+def _per_symbol(clf, windows: dict, lookback: int) -> dict:
+    out = {}
+    for symbol, rows in windows.items():
+        X, _ = build_features(rows, lookback=lookback)
+        last_row = X[-1:].astype(np.float64)
+        pred = int(clf.predict(last_row)[0])
+        proba = clf.predict_proba(last_row)[0]
+        out[symbol] = (pred == 1, float(proba[1]) if len(proba) > 1 else float(proba[0]))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched vs per-symbol ML inference")
+    parser.add_argument("--model", type=Path, default=Path("models/ml_strategy_v1.pkl"), help="Model .pkl")
+    parser.add_argument("--symbols", type=str, default="10,50,200", help="Comma-separated symbol counts")
+    parser.add_argument("--lookback", type=int, default=60, help="Feature lookback (must match training)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per size (median reported)")
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed for the synthetic candles")
+    args = parser.parse_args()
+
+    if not args.model.exists():
+        print(f"[ERROR] Model not found: {args.model}")
+        sys.exit(1)
+
+    clf = _load_model(args.model)["model"]
+    rng = np.random.default_rng(args.seed)
+    print(f"[BENCH] model={args.model} estimators={getattr(clf, 'n_estimators', '?')} lookback={args.lookback}")
+
+    for n in [int(x) for x in args.symbols.split(",") if x.strip()]:
+        windows = {f"SYN{i:03d}/USDT": _synthetic_window(rng, live_rows(args.lookback)) for i in range(n)}
+        # Warm-up (model load, sklearn/joblib pools)
+        _per_symbol(clf, windows, args.lookback)
+        compute_ml_signals(timeframe="1m", windows=windows, model_path=args.model, lookback=args.lookback)
+
+        per_symbol, batched = [], []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            ref = _per_symbol(clf, windows, args.lookback)
+            per_symbol.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            signals = compute_ml_signals(timeframe="1m", windows=windows, model_path=args.model, lookback=args.lookback)
+            batched.append(time.perf_counter() - t0)
+
+        mismatches = sum(
+            ref[s][0] != sig.should_be_long or abs(ref[s][1] - sig.confidence) > 1e-12
+            for s, sig in signals.items()
+        )
+        a, b = statistics.median(per_symbol), statistics.median(batched)
+        print(f"[BENCH] symbols={n} per_symbol_ms={a * 1000:.1f} batched_ms={b * 1000:.1f} "
+              f"speedup={a / max(b, 1e-9):.1f}x mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark the Python and SQL resample engines against each other.
+
+Builds a throwaway SQLite DB with synthetic 1m candles, then times a full
+(cold watermark) resample into each target timeframe with both engines.
+Run from project root: python scripts/bench_resample.py --rows 1000000 --timeframes 5m,7m,30m
+Set RESAMPLE_ENGINE in .env to whichever engine wins on the target device.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.db import Database
+
+SYMBOL = "BENCH/USDT"
+ONE_MINUTE_MS = 60 * 1000
+
+
+def _populate(db: Database, rows: int, batch: int = 50000, seed: int = 42) -> None:
+    """Append `rows` synthetic 1m candles (random walk) after any already stored, using the bulk insert path."""
+    rng = random.Random(seed)
+    latest = db.get_latest_close(SYMBOL, "1m")
+    if latest:
+        price = float(latest["close"])
+        start_ts = int(latest["timestamp"]) + ONE_MINUTE_MS
+    else:
+        price = 100.0
+        start_ts = 1_600_000_000_000 - (1_600_000_000_000 % ONE_MINUTE_MS)
+    candles = []
+    for i in range(rows):
+        open_ = price
+        close = max(0.01, open_ * (1 + rng.gauss(0, 0.001)))
+        high = max(open_, close) * (1 + abs(rng.gauss(0, 0.0005)))
+        low = min(open_, close) * (1 - abs(rng.gauss(0, 0.0005)))
+        candles.append([start_ts + i * ONE_MINUTE_MS, open_, high, low, close, rng.random() * 10])
+        price = close
+        if len(candles) >= batch:
+            db.insert_ohlcv(SYMBOL, "1m", candles)
+            candles = []
+    if candles:
+        db.insert_ohlcv(SYMBOL, "1m", candles)
+
+
+def _reset_target(db: Database, to_tf: str) -> None:
+    """Drop resampled rows and watermark so each run starts cold."""
+    db.conn.execute("DELETE FROM ohlcv WHERE symbol = ? AND timeframe = ?", (SYMBOL, to_tf))
+    db.conn.execute("DELETE FROM resample_watermarks WHERE symbol = ? AND to_tf = ?", (SYMBOL, to_tf))
+    db.conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark python vs sql resample engines")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of synthetic 1m candles")
+    parser.add_argument("--timeframes", type=str, default="5m,7m,30m", help="Comma-separated target timeframes")
+    parser.add_argument("--db", type=Path, help="DB path (default: temporary file)")
+    parser.add_argument("--limit-1m", dest="limit_1m", type=int, default=5000, help="Page size for the python engine")
+    args = parser.parse_args()
+
+    db_path = args.db or Path(tempfile.mkdtemp(prefix="bench_resample_")) / "bench.sqlite"
+    db = Database(db_path)
+    db.create_tables()
+
+    have = db.conn.execute(
+        "SELECT COUNT(*) AS n FROM ohlcv WHERE symbol = ? AND timeframe = '1m'", (SYMBOL,)
+    ).fetchone()["n"]
+    if have < args.rows:
+        print(f"[BENCH] populating {args.rows - have} synthetic 1m rows into {db_path}")
+        t0 = time.perf_counter()
+        _populate(db, args.rows - have)
+        print(f"[BENCH] populate_s={time.perf_counter() - t0:.2f}")
+
+    timeframes = [t.strip() for t in args.timeframes.split(",") if t.strip()]
+    results = {}
+    for to_tf in timeframes:
+        for engine in ("python", "sql"):
+            _reset_target(db, to_tf)
+            t0 = time.perf_counter()
+            inserted, updated = db.resample_ohlcv(SYMBOL, "1m", to_tf, limit_1m=args.limit_1m, engine=engine)
+            elapsed = time.perf_counter() - t0
+            results[(to_tf, engine)] = elapsed
+            print(f"[BENCH] engine={engine} 1m->{to_tf} rows={args.rows} inserted={inserted} "
+                  f"updated={updated} elapsed_s={elapsed:.3f}")
+
+    for to_tf in timeframes:
+        py, sql = results[(to_tf, "python")], results[(to_tf, "sql")]
+        faster = "sql" if sql < py else "python"
+        print(f"[BENCH] 1m->{to_tf} faster={faster} speedup={max(py, sql) / max(min(py, sql), 1e-9):.2f}x")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,12 @@ Run from project root: python scripts/build_dataset.py --symbol BTC/USDT --timef
 
 import argparse
 import csv
+import os
 import sys
 from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -17,7 +21,7 @@ from bot.features import build_features, FEATURE_NAMES
 
 
 def generate_labels(
-    closes: list[float],
+    closes: Sequence[float],
     lookback: int,
     forward_candles: int,
     min_return: float,
@@ -43,6 +47,53 @@ def generate_labels(
     return labels
 
 
+def iter_labelled_features(
+    pages: Iterable[np.ndarray],
+    lookback: int,
+    forward_candles: int,
+    min_return: float,
+) -> Iterator[Tuple[np.ndarray, list[int], list[int]]]:
+    """
+    Stream (X, timestamps, labels) chunks over OHLCV structured-array pages.
+
+    Produces exactly the rows build_features + generate_labels would produce on
+    the concatenated history, but only keeps one page plus a carry of
+    lookback + forward + 1 rows in memory. The extra carried row gives the first
+    new row's volatility window a real return instead of the leading zero.
+    """
+    keep = lookback + forward_candles + 1
+    carry: Optional[np.ndarray] = None
+    base = 0  # absolute index of carry[0] / buf[0]
+    next_emit = lookback  # absolute index of the next row to emit
+    for page in pages:
+        buf = page if carry is None else np.concatenate((carry, page))
+        X, timestamps = build_features(buf, lookback=lookback)
+        y = generate_labels(buf["close"], lookback, forward_candles, min_return)
+        end = base + lookback + len(y)  # rows before `end` have a label
+        if end > next_emit:
+            lo = next_emit - base - lookback
+            hi = end - base - lookback
+            yield X[lo:hi], timestamps[lo:hi], y[lo:hi]
+            next_emit = end
+        if len(buf) > keep:
+            base += len(buf) - keep
+            buf = buf[-keep:]
+        carry = buf
+
+
+def _window_start(db: Database, symbol: str, timeframe: str, limit: int, need: int) -> Tuple[Optional[int], int]:
+    """
+    (start timestamp of the `limit` most recent candles, candles available from there)
+
+    Reads through the Database API, so archived candles count. With limit <= 0 (full history)
+    the start is None and the count stops at `need`: only "enough or not" matters.
+    """
+    if limit > 0:
+        window = db.get_ohlcv_arrays(symbol, timeframe, limit=limit, latest=True)
+        return (int(window["timestamp"][0]) if len(window) else None), len(window)
+    return None, len(db.get_ohlcv_arrays(symbol, timeframe, limit=need))
+
+
 def main():
     parser = argparse.ArgumentParser(description="Build ML training dataset from OHLCV")
     parser.add_argument("--symbol", type=str, default="BTC/USDT", help="Trading pair")
@@ -50,53 +101,46 @@ def main():
     parser.add_argument("--lookback", type=int, default=60, help="Feature lookback window")
     parser.add_argument("--forward", type=int, default=5, help="Forward candles for label")
     parser.add_argument("--min-return", type=float, default=0.001, help="Min price rise for long label (0.001=0.1%%)")
-    parser.add_argument("--limit", type=int, default=10000, help="Max OHLCV rows to fetch")
+    parser.add_argument("--limit", type=int, default=10000, help="Most recent OHLCV rows to use (0 = full history)")
+    parser.add_argument("--page-size", type=int, default=50000, help="Rows read per page while streaming")
     parser.add_argument("--output", type=Path, default=Path("data/training.csv"), help="Output CSV path")
     parser.add_argument("--symbols", type=str, help="Comma-separated symbols (overrides --symbol)")
     args = parser.parse_args()
 
     symbols = [s.strip() for s in args.symbols.split(",")] if args.symbols else [args.symbol]
     args.output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_output = args.output.with_name(args.output.name + ".tmp")
 
     db = Database()
     db.connect()
 
-    all_rows = []
-    for symbol in symbols:
-        rows = db.get_recent_ohlcv(symbol, args.timeframe, limit=args.limit)
-        if len(rows) < args.lookback + args.forward + 100:
-            print(f"[WARN] symbol={symbol} insufficient data: have={len(rows)} need={args.lookback + args.forward + 100}")
-            continue
-
-        closes = [float(r["close"]) for r in rows]
-        X, timestamps = build_features(rows, lookback=args.lookback)
-        y = generate_labels(closes, args.lookback, args.forward, args.min_return)
-
-        n_keep = min(len(X), len(y))
-        X = X[:n_keep]
-        timestamps = timestamps[:n_keep]
-        y = y[:n_keep]
-
-        for i in range(n_keep):
-            row = {fn: X[i, j] for j, fn in enumerate(FEATURE_NAMES)}
-            row["label"] = y[i]
-            row["timestamp"] = timestamps[i]
-            row["symbol"] = symbol
-            all_rows.append(row)
+    columns = ["symbol", "timestamp"] + FEATURE_NAMES + ["label"]
+    total_rows = 0
+    with open(tmp_output, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(columns)
+        for symbol in symbols:
+            need = args.lookback + args.forward + 100
+            start, have = _window_start(db, symbol, args.timeframe, args.limit, need)
+            if have < need:
+                print(f"[WARN] symbol={symbol} insufficient data: have={have} need={need}")
+                continue
+
+            pages = db.iter_ohlcv_arrays(symbol, args.timeframe, start_time=start, page_size=args.page_size)
+            for X, timestamps, y in iter_labelled_features(pages, args.lookback, args.forward, args.min_return):
+                for i in range(len(y)):
+                    w.writerow([symbol, timestamps[i]] + X[i].tolist() + [y[i]])
+                total_rows += len(y)
 
     db.close()
 
-    if len(all_rows) < 500:
-        print(f"[ERROR] Insufficient rows after processing: {len(all_rows)}. Need at least 500.")
+    if total_rows < 500:
+        os.remove(tmp_output)
+        print(f"[ERROR] Insufficient rows after processing: {total_rows}. Need at least 500.")
         sys.exit(1)
 
-    columns = ["symbol", "timestamp"] + FEATURE_NAMES + ["label"]
-    with open(args.output, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
-        w.writeheader()
-        w.writerows(all_rows)
-
-    print(f"[OK] Wrote {len(all_rows)} rows to {args.output}")
+    os.replace(tmp_output, args.output)
+    print(f"[OK] Wrote {total_rows} rows to {args.output}")
 
 
 if __name__ == "__main__":
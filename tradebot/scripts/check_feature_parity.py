@@ -0,0 +1,123 @@
+"""
+Check that the live feature path matches the training features bit for bit.
+
+For synthetic series (random walks plus edge cases: flat prices, zero closes,
+zero volume, SMA windows longer than the lookback) and optionally stored
+candles, asserts for many cut points k:
+  build_latest_features(rows[:k])                     == build_features(rows[:k])[0][-1]
+  build_latest_features(rows[k - live_rows(lb):k])    == build_features(rows)[0][k - 1 - lb]
+The second is what the trader feeds the model vs what training saw for that candle.
+Exits non-zero on any mismatch.
+Run from project root:
+    python scripts/check_feature_parity.py [--db-symbols BTC/USDT --timeframe 7m]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.db import Database, OHLCV_DTYPE
+from bot.features import FEATURE_NAMES, build_features, build_latest_features, live_rows
+
+
+def _walk(rng: np.random.Generator, n: int) -> np.ndarray:
+    rows = np.zeros(n, dtype=OHLCV_DTYPE)
+    closes = 100.0 * np.cumprod(1 + rng.normal(0, 0.01, n))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    rows["timestamp"] = 1_700_000_000_000 + np.arange(n, dtype=np.int64) * 60_000
+    rows["open"] = opens
+    rows["close"] = closes
+    rows["high"] = np.maximum(opens, closes) * (1 + rng.uniform(0, 0.003, n))
+    rows["low"] = np.minimum(opens, closes) * (1 - rng.uniform(0, 0.003, n))
+    rows["volume"] = rng.lognormal(3, 1, n)
+    return rows
+
+
+def _cases(rng: np.random.Generator, n: int) -> dict:
+    walk = _walk(rng, n)
+    flat = walk.copy()
+    for field in ("open", "high", "low", "close"):
+        flat[field] = 1.0
+    zeros = walk.copy()
+    zeros["close"][rng.choice(n, n // 10, replace=False)] = 0.0
+    no_volume = walk.copy()
+    no_volume["volume"][: n // 2] = 0.0
+    return {"walk": walk, "flat": flat, "zero_closes": zeros, "zero_volume": no_volume}
+
+
+def _check(name: str, rows: np.ndarray, lookback: int, fast: int, slow: int) -> int:
+    kw = dict(lookback=lookback, sma_fast_window=fast, sma_slow_window=slow)
+    X_full, _ = build_features(rows, **kw)
+    need = live_rows(lookback)
+    bad = 0
+    for k in range(lookback + 1, len(rows) + 1):
+        latest = build_latest_features(rows[:k], **kw)
+        X_prefix, _ = build_features(rows[:k], **kw)
+        if latest.tobytes() != X_prefix[-1].tobytes():
+            bad += 1
+            print(f"[PARITY] case={name} lookback={lookback} k={k} check=prefix latest={latest} ref={X_prefix[-1]}")
+        if k >= need:
+            live = build_latest_features(rows[k - need:k], **kw)
+            if live.tobytes() != X_full[k - 1 - lookback].tobytes():
+                bad += 1
+                print(f"[PARITY] case={name} lookback={lookback} k={k} check=training live={live} "
+                      f"ref={X_full[k - 1 - lookback]}")
+    return bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check live (latest-row) features against build_features")
+    parser.add_argument("--candles", type=int, default=250, help="Synthetic candles per case")
+    parser.add_argument("--seed", type=int, default=7, help="RNG seed")
+    parser.add_argument("--db-symbols", type=str, default="", help="Comma-separated stored symbols to check too")
+    parser.add_argument("--timeframe", type=str, default="7m", help="Timeframe for --db-symbols")
+    parser.add_argument("--db-candles", type=int, default=2000, help="Most recent stored candles per symbol")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    series = _cases(rng, args.candles)
+    symbols = [s.strip() for s in args.db_symbols.split(",") if s.strip()]
+    if symbols:
+        db = Database()
+        for symbol in symbols:
+            series[f"db:{symbol}"] = db.get_ohlcv_arrays(symbol, args.timeframe, limit=args.db_candles, latest=True)
+        db.close()
+
+    # (lookback, sma_fast, sma_slow): the default, SMAs longer than the lookback, tiny windows
+    params = [(60, 10, 30), (20, 10, 30), (5, 2, 3), (1, 1, 1)]
+    bad = checked = 0
+    for name, rows in series.items():
+        for lookback, fast, slow in params:
+            if len(rows) < live_rows(lookback):
+                continue
+            bad += _check(name, rows, lookback, fast, slow)
+            checked += len(rows) - lookback
+    print(f"[PARITY] series={len(series)} param_sets={len(params)} rows_checked={checked} mismatches={bad}")
+
+    # Cost of one live row vs the full matrix over the same window
+    rows = series["walk"]
+    for window in (live_rows(60), 1000):
+        if len(rows) < window:
+            rows = _walk(rng, window)
+        w = rows[-window:]
+        t0 = time.perf_counter()
+        for _ in range(200):
+            build_latest_features(w)
+        latest_us = (time.perf_counter() - t0) / 200 * 1e6
+        t0 = time.perf_counter()
+        for _ in range(20):
+            build_features(w)
+        full_us = (time.perf_counter() - t0) / 20 * 1e6
+        print(f"[PARITY] window={window} build_latest_features_us={latest_us:.0f} build_features_us={full_us:.0f} "
+              f"features={len(FEATURE_NAMES)}")
+
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()
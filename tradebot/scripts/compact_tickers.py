@@ -0,0 +1,46 @@
+"""
+Roll raw tickers older than N days up into per-interval summaries and delete them.
+
+Works in small transactions, so it is safe to run next to the collector (e.g. daily cron).
+Run from project root: python scripts/compact_tickers.py [--days 7] [--interval 1h] [--vacuum]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.db import Database
+from bot.ticker_compaction import compact_tickers
+from bot.config import TICKER_COMPACT_AFTER_DAYS, TICKER_SUMMARY_INTERVAL
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact old tickers into ticker_summaries")
+    parser.add_argument("--days", type=int, default=TICKER_COMPACT_AFTER_DAYS, help="Compact tickers older than this")
+    parser.add_argument("--interval", type=str, default=TICKER_SUMMARY_INTERVAL, help="Summary bucket (e.g. 15m, 1h)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Max raw rows per transaction")
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between transactions")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the DB file")
+    args = parser.parse_args()
+
+    db = Database()
+    db.create_tables()
+    totals = compact_tickers(db, older_than_days=args.days, interval=args.interval,
+                             batch_size=args.batch_size, pause_s=args.pause)
+    if args.vacuum and totals["deleted"]:
+        db.conn.execute("VACUUM")
+        logger.info("[TICKERS] vacuum done")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
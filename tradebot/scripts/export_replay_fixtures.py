@@ -0,0 +1,61 @@
+"""
+Export stored candles as replay-exchange fixtures.
+
+Writes <out>/<BASE-QUOTE>/<timeframe>.csv (timestamp,open,high,low,close,volume)
+for the chosen series, so EXCHANGE_NAME=replay with REPLAY_FIXTURES_DIR=<out>
+serves recorded market data instead of the synthetic walk.
+Run from project root:
+    python scripts/export_replay_fixtures.py --out fixtures [--symbols BTC/USDT] [--timeframes 1m] [--days 7]
+"""
+
+import argparse
+import csv
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.db import Database
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export OHLCV from the DB as replay fixtures (CSV)")
+    parser.add_argument("--out", type=Path, required=True, help="Fixtures directory (REPLAY_FIXTURES_DIR)")
+    parser.add_argument("--symbols", type=str, default="", help="Comma-separated symbols (default: all stored)")
+    parser.add_argument("--timeframes", type=str, default="1m", help="Comma-separated timeframes")
+    parser.add_argument("--days", type=float, default=0, help="Only the last N days (0 = everything)")
+    args = parser.parse_args()
+
+    symbols = {s.strip() for s in args.symbols.split(",") if s.strip()}
+    timeframes = {t.strip() for t in args.timeframes.split(",") if t.strip()}
+    start_time = int((time.time() - args.days * 86400) * 1000) if args.days > 0 else None
+
+    db = Database()
+    for symbol, timeframe in db.list_ohlcv_series():
+        if (symbols and symbol not in symbols) or timeframe not in timeframes:
+            continue
+        path = args.out / symbol.replace("/", "-") / f"{timeframe}.csv"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rows = 0
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["timestamp", "open", "high", "low", "close", "volume"])
+            for page in db.iter_ohlcv_arrays(symbol, timeframe, start_time=start_time):
+                writer.writerows(
+                    (int(r["timestamp"]), r["open"], r["high"], r["low"], r["close"], r["volume"]) for r in page
+                )
+                rows += len(page)
+        logger.info(f"[FIXTURES] symbol={symbol} timeframe={timeframe} candles={rows} path={path}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Migrate the ohlcv table to the compact storage layout (online, batched).
+
+The collector can keep running: writes during the copy are mirrored by triggers
+and writers switch to the new layout on their next write after the swap.
+Run from project root: python scripts/migrate_compact.py [--drop-legacy --vacuum]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.db import Database
+from bot.config import DB_PATH
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate ohlcv to the compact WITHOUT ROWID layout")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows copied per transaction")
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches")
+    parser.add_argument("--drop-legacy", action="store_true", help="Drop ohlcv_legacy after the swap")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM after dropping (needs free space ~ DB size)")
+    args = parser.parse_args()
+
+    size_before = DB_PATH.stat().st_size if DB_PATH.exists() else 0
+    db = Database()
+    db.create_tables()
+
+    start = time.time()
+    copied = db.migrate_ohlcv_to_compact(batch_size=args.batch_size, pause_s=args.pause)
+    logger.info(f"[MIGRATE] copied={copied} elapsed_s={time.time() - start:.1f}")
+
+    if args.drop_legacy:
+        db.drop_legacy_ohlcv(vacuum=args.vacuum)
+    db.close()
+
+    size_after = DB_PATH.stat().st_size if DB_PATH.exists() else 0
+    logger.info(f"[MIGRATE] db_size_before={size_before} db_size_after={size_after}")
+
+
+if __name__ == "__main__":
+    main()
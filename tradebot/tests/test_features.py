@@ -0,0 +1,50 @@
+"""
+Live feature row vs training features, on the synthetic series of scripts/check_feature_parity.py.
+Run from tradebot/ (or `python -m pytest -q tradebot/tests` from the repository root):
+    python -m pytest -q tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.features import build_features, build_latest_features, live_rows
+from scripts.check_feature_parity import _cases, _walk
+
+CANDLES = 120
+CASES = _cases(np.random.default_rng(7), CANDLES)
+# (lookback, sma_fast, sma_slow): the default, SMAs longer than the lookback, tiny windows
+PARAMS = [(60, 10, 30), (20, 10, 30), (5, 2, 3), (1, 1, 1)]
+
+
+@pytest.mark.parametrize("lookback,fast,slow", PARAMS)
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_latest_matches_last_training_row(case, lookback, fast, slow):
+    rows = CASES[case]
+    kw = dict(lookback=lookback, sma_fast_window=fast, sma_slow_window=slow)
+    for k in range(lookback + 1, len(rows) + 1):
+        X_prefix, _ = build_features(rows[:k], **kw)
+        assert build_latest_features(rows[:k], **kw).tobytes() == X_prefix[-1].tobytes(), f"k={k}"
+
+
+@pytest.mark.parametrize("lookback,fast,slow", PARAMS)
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_live_window_matches_training(case, lookback, fast, slow):
+    """What the trader feeds the model (live_rows candles) vs what training saw for that candle"""
+    rows = CASES[case]
+    kw = dict(lookback=lookback, sma_fast_window=fast, sma_slow_window=slow)
+    X_full, _ = build_features(rows, **kw)
+    need = live_rows(lookback)
+    for k in range(need, len(rows) + 1):
+        live = build_latest_features(rows[k - need:k], **kw)
+        assert live.tobytes() == X_full[k - 1 - lookback].tobytes(), f"k={k}"
+
+
+def test_default_params_on_long_walk():
+    rows = _walk(np.random.default_rng(11), 500)
+    X, _ = build_features(rows)
+    assert build_latest_features(rows).tobytes() == X[-1].tobytes()